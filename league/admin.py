@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Team, Gameweek, Player, Prediction, ActualStanding, Score, SiteState
+from .models import Team, Gameweek, Player, Prediction, ActualStanding, Score, Job, LeaderboardEntry, RankMatrix, RenderedPayload, SchedulerLease, SiteState
 
 
 @admin.register(Team)
@@ -10,7 +10,7 @@ class TeamAdmin(admin.ModelAdmin):
 
 @admin.register(Gameweek)
 class GameweekAdmin(admin.ModelAdmin):
-    list_display = ("id", "is_current", "finished", "data_checked")
+    list_display = ("id", "is_current", "finished", "data_checked", "deadline_time")
     list_filter = ("is_current", "finished", "data_checked")
 
 
@@ -49,8 +49,46 @@ class ScoreAdmin(admin.ModelAdmin):
     list_filter = ("season", "gameweek", "completed")
 
 
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "scope",
+        "position",
+        "username",
+        "gameweek",
+        "score_correct",
+        "score_deviation",
+        "curr_rank_correct_based",
+        "curr_rank_deviation_based",
+    )
+    list_filter = ("scope",)
+    search_fields = ("username",)
+
+
+@admin.register(RankMatrix)
+class RankMatrixAdmin(admin.ModelAdmin):
+    list_display = ("season", "players", "gameweeks", "built_at")
+
+
+@admin.register(RenderedPayload)
+class RenderedPayloadAdmin(admin.ModelAdmin):
+    list_display = ("key", "content_type", "built_at")
+    exclude = ("body", "gzip", "br")
+
+
 @admin.register(SiteState)
 class SiteStateAdmin(admin.ModelAdmin):
-    list_display = ("id", "last_computed")
+    list_display = ("id", "last_computed", "leaderboard_gameweek", "scheduler_phase", "scheduler_next_run")
+
+
+@admin.register(SchedulerLease)
+class SchedulerLeaseAdmin(admin.ModelAdmin):
+    list_display = ("id", "holder", "acquired_at", "heartbeat_at", "expires_at")
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "season", "trigger", "status", "attempts", "run_after", "finished_at", "worker")
+    list_filter = ("kind", "status", "trigger")
 
 # Register your models here.
@@ -5,4 +5,10 @@ class LeagueConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "league"
 
+    def ready(self):
+        # Connect the Team signals that invalidate the team registry, the
+        # Player signals that rebuild the leaderboard and the Prediction
+        # signals that mark stored scores stale
+        from . import leaderboard, scoring, teams  # noqa: F401
+
     # Removed automatic scheduler startup - will use PythonAnywhere scheduled tasks instead
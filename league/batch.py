@@ -0,0 +1,106 @@
+"""
+Histories and predictions of many players at once.
+
+Players are read in chunks of IN_CHUNK_SIZE (league/ingest.py) and each
+chunk's Score or Prediction rows come from a single player_id__in query, so
+a request costs two queries per chunk however many players it names, instead
+of two per player. Only
+one chunk is held in memory at a time; the batch views stream each player
+as one NDJSON line shaped like the single-player endpoint's payload.
+"""
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .ingest import IN_CHUNK_SIZE
+from .models import Player, Prediction, Score
+from .teams import team_registry
+
+
+# (id, username, player_type, custom_team_name)
+PlayerRow = Tuple[int, str, str, Optional[str]]
+
+PLAYER_FIELDS = ("id", "username", "player_type", "custom_team_name")
+HISTORY_FIELDS = ("gameweek", "score_correct", "score_deviation", "rank_correct", "rank_deviation", "completed")
+
+
+def player_chunks(usernames: Optional[List[str]] = None) -> Iterator[List[Tuple[str, Optional[PlayerRow]]]]:
+    """
+    Yield (username, player row or None) pairs in chunks of IN_CHUNK_SIZE.
+
+    Args:
+        usernames: Players to read, in output order; None reads every player
+            in id order
+    """
+    if usernames is None:
+        rows = Player.objects.order_by("id").values_list(*PLAYER_FIELDS).iterator(chunk_size=IN_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(rows, IN_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield [(row[1], row) for row in chunk]
+    for start in range(0, len(usernames), IN_CHUNK_SIZE):
+        names = usernames[start:start + IN_CHUNK_SIZE]
+        found = {row[1]: row for row in Player.objects.filter(username__in=names).values_list(*PLAYER_FIELDS)}
+        yield [(name, found.get(name)) for name in names]
+
+
+def iter_histories(season: str, usernames: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Score history per player, as served by UserHistoryView.
+
+    Unknown usernames yield an empty history; with usernames=None players
+    without a score in the season are left out.
+    """
+    for chunk in player_chunks(usernames):
+        results = defaultdict(list)
+        scores = (
+            Score.objects.filter(season=season, player_id__in=[player[0] for _, player in chunk if player])
+            .order_by("player_id", "gameweek")
+            .values_list("player_id", *HISTORY_FIELDS)
+        )
+        for player_id, *values in scores:
+            results[player_id].append(dict(zip(HISTORY_FIELDS, values)))
+        for username, player in chunk:
+            if player is None:
+                yield {"username": username, "results": []}
+                continue
+            player_id, username, player_type, team_name = player
+            if usernames is None and player_id not in results:
+                continue
+            yield {
+                "username": username,
+                "player_type": player_type,
+                "team_name": team_name or username,
+                "season": season,
+                "results": results.get(player_id, []),
+            }
+
+
+def iter_predictions(season: str, usernames: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Predicted table per player, as served by UserPredictionsView.
+
+    Unknown usernames yield no predictions; with usernames=None players
+    without predictions for the season are left out.
+    """
+    registry = team_registry()
+    for chunk in player_chunks(usernames):
+        predictions = defaultdict(list)
+        rows = (
+            Prediction.objects.filter(season=season, player_id__in=[player[0] for _, player in chunk if player])
+            .order_by("player_id", "predicted_rank")
+            .values_list("player_id", "team_id", "predicted_rank")
+        )
+        for player_id, team_id, predicted_rank in rows:
+            predictions[player_id].append(
+                {"team_id": team_id, "team_name": registry.name(team_id), "predicted_rank": predicted_rank}
+            )
+        for username, player in chunk:
+            if player is None:
+                yield {"username": username, "predictions": []}
+                continue
+            player_id, username = player[:2]
+            if usernames is None and player_id not in predictions:
+                continue
+            yield {"username": username, "season": season, "predictions": predictions.get(player_id, [])}
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the prediction league hot paths.
+"""
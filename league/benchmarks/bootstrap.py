@@ -0,0 +1,112 @@
+"""
+Benchmark streaming extraction of bootstrap-static against a full json.loads.
+"""
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from league.fpl import CHUNK_SIZE, SECTIONS, extract_sections
+from league.jsonstream import extract_keys
+
+
+def synthetic_payload(elements: int = 700, seed: int = 0) -> bytes:
+    """
+    Build a bootstrap-static-like document with the same section order as FPL.
+
+    Real payloads put "events" and "teams" before the large "elements" array.
+    """
+    rnd = random.Random(seed)
+    events = [
+        {
+            "id": gw,
+            "name": f"Gameweek {gw}",
+            "deadline_time": "2025-08-15T17:30:00Z",
+            "finished": False,
+            "data_checked": False,
+            "is_current": gw == 1,
+            "chip_plays": [{"chip_name": "bboost", "num_played": rnd.randint(0, 10**5)}],
+        }
+        for gw in range(1, 39)
+    ]
+    teams = [
+        {"id": t, "code": t, "name": f"Team {t}", "short_name": f"T{t:02d}", "position": t, "points": 0}
+        for t in range(1, 21)
+    ]
+    players = [
+        {
+            "id": i,
+            "web_name": f"Player {i}",
+            "team": rnd.randint(1, 20),
+            "news": "Knock - 75% chance of playing" if rnd.random() < 0.1 else "",
+            **{f"stat_{k}": round(rnd.random() * 100, 1) for k in range(80)},
+        }
+        for i in range(1, elements + 1)
+    ]
+    document = {
+        "chips": [],
+        "events": events,
+        "game_settings": {"league_join_private_max": 30},
+        "phases": [],
+        "teams": teams,
+        "total_players": 11_000_000,
+        "elements": players,
+        "element_stats": [],
+        "element_types": [],
+    }
+    return json.dumps(document).encode("utf-8")
+
+
+def _chunks(body: bytes, counter: Dict[str, int]) -> Iterator[bytes]:
+    for start in range(0, len(body), CHUNK_SIZE):
+        chunk = body[start:start + CHUNK_SIZE]
+        counter["bytes"] += len(chunk)
+        yield chunk
+
+
+def _measure(func: Callable[[], Dict], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run(body: bytes, repeat: int = 5) -> Dict:
+    """Compare both extraction strategies on one payload."""
+
+    def full():
+        return extract_sections(json.loads(body))
+
+    counter = {"bytes": 0}
+
+    def streaming():
+        counter["bytes"] = 0
+        return extract_keys(_chunks(body, counter), SECTIONS)
+
+    expected = full()
+    got = streaming()
+    if any(got.get(name, []) != expected[name] for name in SECTIONS):
+        raise AssertionError("Streaming extraction differs from json.loads")
+
+    return {
+        "payload_bytes": len(body),
+        "full": _measure(full, repeat),
+        "streaming": {**_measure(streaming, repeat), "bytes_read": counter["bytes"]},
+    }
+
+
+def load_payloads(paths: List[str]) -> Dict[str, bytes]:
+    return {path: Path(path).read_bytes() for path in paths}
+
+
+def run_all(paths: Optional[List[str]] = None, repeat: int = 5) -> List[Dict]:
+    payloads = load_payloads(paths) if paths else {"synthetic": synthetic_payload()}
+    return [{"payload": name, **run(body, repeat)} for name, body in payloads.items()]
@@ -0,0 +1,100 @@
+"""
+Deterministic synthetic league generator.
+
+Produces players, prediction rows in the predictions_formatted.csv layout
+(user_name,team_name,predicted_1,...,predicted_20,player_type where
+predicted_n is the team id predicted to finish n-th) and per-gameweek
+standings in the shape of the FPL bootstrap-static "teams" and "events"
+sections. The same (players, seed) always yields the same league.
+"""
+import csv
+import random
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+
+TEAM_COUNT = 20
+GAMEWEEKS = 38
+
+
+class LeagueGenerator:
+    def __init__(self, players: int, seed: int = 0, pundit_ratio: float = 0.1):
+        self.players = players
+        self.seed = seed
+        self.pundit_ratio = pundit_ratio
+        self._table = self._season_tables()
+
+    def _rng(self, *salt) -> random.Random:
+        return random.Random(f"{self.seed}:" + ":".join(str(s) for s in salt))
+
+    def team_ids(self) -> List[int]:
+        return list(range(1, TEAM_COUNT + 1))
+
+    def teams(self) -> List[Dict]:
+        return [
+            {"id": t, "code": t, "name": f"Team {t:02d}", "short_name": f"T{t:02d}"}
+            for t in self.team_ids()
+        ]
+
+    def username(self, index: int) -> str:
+        return f"player{index:07d}"
+
+    def prediction_rows(self) -> Iterator[List[str]]:
+        """Yield CSV rows in the predictions_formatted.csv layout."""
+        rng = self._rng("predictions")
+        for index in range(self.players):
+            order = self.team_ids()
+            rng.shuffle(order)
+            player_type = "pundit" if rng.random() < self.pundit_ratio else "normal"
+            username = self.username(index)
+            yield [username, f"{username} FC", *[str(t) for t in order], player_type]
+
+    def write_csv(self, path: Path) -> Path:
+        with Path(path).open("w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(self.prediction_rows())
+        return Path(path)
+
+    def _season_tables(self) -> List[List[int]]:
+        """Team order for every gameweek, drifting a few swaps per week."""
+        rng = self._rng("standings")
+        order = self.team_ids()
+        rng.shuffle(order)
+        tables = []
+        for _ in range(GAMEWEEKS):
+            for _ in range(rng.randint(0, 4)):
+                i = rng.randrange(TEAM_COUNT - 1)
+                order[i], order[i + 1] = order[i + 1], order[i]
+            tables.append(list(order))
+        return tables
+
+    def standings(self, gameweek: int) -> List[Dict]:
+        """The "teams" section as it would look during a gameweek."""
+        order = self._table[gameweek - 1]
+        return [
+            {
+                **team,
+                "position": order.index(team["id"]) + 1,
+                "points": (TEAM_COUNT - order.index(team["id"])) * gameweek // 7,
+                "win": 0,
+                "draw": 0,
+                "loss": 0,
+            }
+            for team in self.teams()
+        ]
+
+    def events(self, current: int) -> List[Dict]:
+        """The "events" section with gameweeks before current finished."""
+        return [
+            {
+                "id": gw,
+                "is_current": gw == current,
+                "finished": gw < current,
+                "data_checked": gw < current,
+                "deadline_time": f"2025-08-{1 + (gw - 1) % 28:02d}T17:30:00Z",
+            }
+            for gw in range(1, GAMEWEEKS + 1)
+        ]
+
+    def bootstrap(self, gameweek: int) -> Dict[str, List[Dict]]:
+        """Extracted bootstrap sections as fetched during a gameweek."""
+        return {"teams": self.standings(gameweek), "events": self.events(gameweek)}
@@ -0,0 +1,82 @@
+"""
+Benchmark the vectorized scoring engine against the per-prediction loop it replaced.
+"""
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from league.scoring import build_actual_vector, build_prediction_matrix, compute_scores
+
+
+TEAM_COUNT = 20
+
+
+def generate_rows(players: int, seed: int = 0) -> Tuple[np.ndarray, Dict[int, int]]:
+    """
+    Generate random predictions and an actual table.
+
+    Returns:
+        (rows, actual_ranks) where rows is an (players * 20) x 3 array of
+        (player_id, team_id, predicted_rank)
+    """
+    rng = np.random.default_rng(seed)
+    ranks = np.argsort(rng.random((players, TEAM_COUNT)), axis=1) + 1
+    player_ids = np.repeat(np.arange(1, players + 1), TEAM_COUNT)
+    team_ids = np.tile(np.arange(1, TEAM_COUNT + 1), players)
+    rows = np.column_stack([player_ids, team_ids, ranks.ravel()])
+    actual = rng.permutation(TEAM_COUNT) + 1
+    return rows, {team_id: int(rank) for team_id, rank in enumerate(actual, start=1)}
+
+
+def reference_scores(rows: List[Tuple[int, int, int]], actual_ranks: Dict[int, int]) -> Dict[int, Dict[str, int]]:
+    """The original per-prediction loop, kept for comparison."""
+    by_player: Dict[int, Dict[str, int]] = {}
+    for player_id, team_id, predicted_rank in rows:
+        actual_rank = actual_ranks.get(team_id)
+        if actual_rank is None:
+            continue
+        stats = by_player.setdefault(player_id, {"score_correct": 0, "score_deviation": 0})
+        if predicted_rank == actual_rank:
+            stats["score_correct"] += 1
+        stats["score_deviation"] += abs(predicted_rank - actual_rank)
+    return by_player
+
+
+def vectorized_scores(rows: np.ndarray, actual_ranks: Dict[int, int]):
+    matrix = build_prediction_matrix(rows)
+    actual, present = build_actual_vector(matrix.team_ids, actual_ranks)
+    return matrix.player_ids, compute_scores(matrix.ranks, actual, present)
+
+
+def run(players: int, include_reference: bool = True, seed: int = 0) -> Dict:
+    """
+    Time both implementations for a league of the given size.
+
+    The matrix build is included in the vectorized timing since it replaces the
+    row iteration of the loop.
+    """
+    rows, actual_ranks = generate_rows(players, seed=seed)
+    result = {"players": players}
+
+    start = time.perf_counter()
+    player_ids, (correct, deviation, _) = vectorized_scores(rows, actual_ranks)
+    result["vectorized_s"] = time.perf_counter() - start
+
+    if include_reference:
+        row_tuples = [tuple(r) for r in rows.tolist()]
+        start = time.perf_counter()
+        expected = reference_scores(row_tuples, actual_ranks)
+        result["reference_s"] = time.perf_counter() - start
+        result["speedup"] = result["reference_s"] / result["vectorized_s"]
+
+        sample = player_ids[:: max(1, players // 100)].tolist()
+        index = {pid: i for i, pid in enumerate(player_ids.tolist())}
+        for pid in sample:
+            stats = expected[pid]
+            if (stats["score_correct"], stats["score_deviation"]) != (
+                int(correct[index[pid]]),
+                int(deviation[index[pid]]),
+            ):
+                raise AssertionError(f"Score mismatch for player {pid}")
+    return result
@@ -0,0 +1,260 @@
+"""
+Benchmark suite for ingestion, scoring, ranking and the API endpoints.
+
+Runs against a throwaway test database populated by LeagueGenerator and
+returns plain dicts so results can be written as JSON and compared between
+commits.
+"""
+import io
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+
+from league.fpl import Snapshot, content_hash
+from league.ingest import upsert_gameweeks, upsert_teams
+from league.jobs import work
+from league.leaderboard import build_leaderboard
+from league.models import Job, SiteState
+from league.pipeline import ingest_bootstrap
+
+from .generator import LeagueGenerator
+
+
+SEASON = "2025/26"
+
+GROUPS = ("ingestion", "scoring", "ranking", "api")
+
+
+@contextmanager
+def benchmark_database():
+    """Create a test database for the duration of the block."""
+    with override_settings(DEBUG=False):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+
+def measure(func: Callable[[], object], repeat: int = 3, memory: bool = True) -> Dict[str, float]:
+    """
+    Time func over several runs and record queries and peak allocations.
+
+    Timings exclude the tracemalloc run, which is made once more at the end.
+    """
+    queries = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    timings = []
+    for _ in range(repeat):
+        queries = 0
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    result = {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "queries": queries,
+    }
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_kib"] = peak / 1024
+    return result
+
+
+def _snapshot(sections: Dict) -> Snapshot:
+    return Snapshot(hash=content_hash(sections), fetched_at="", **sections)
+
+
+def _bench_ingestion(gen: LeagueGenerator, gameweeks: int, repeat: int) -> Dict[str, Dict]:
+    results = {}
+    bootstrap = gen.bootstrap(gameweeks)
+
+    def reference_data():
+        with transaction.atomic():
+            upsert_teams(bootstrap["teams"])
+            upsert_gameweeks(bootstrap["events"])
+
+    results["ingestion.teams_gameweeks"] = measure(reference_data, repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = gen.write_csv(Path(tmp) / "predictions.csv")
+        results["ingestion.init_predictions"] = measure(
+            lambda: call_command("init_predictions", str(csv_path), season=SEASON, stdout=io.StringIO()),
+            repeat=1,
+        )
+    return results
+
+
+def _load_scores(gen: LeagueGenerator, gameweeks: int) -> None:
+    for gameweek in range(1, gameweeks + 1):
+        ingest_bootstrap(gen.bootstrap(gameweek), SEASON, full=True)
+
+
+def _bench_scoring(gen: LeagueGenerator, gameweeks: int, repeat: int) -> Dict[str, Dict]:
+    results = {}
+    for gameweek in range(1, gameweeks):
+        ingest_bootstrap(gen.bootstrap(gameweek), SEASON, full=True)
+
+    current = gen.bootstrap(gameweeks)
+    results["scoring.full"] = measure(lambda: ingest_bootstrap(current, SEASON, full=True), repeat)
+
+    # Same gameweek, next week's table: only the moved teams are rescored
+    moved = {"teams": gen.standings(gameweeks + 1), "events": current["events"]}
+    state = {"flip": False}
+
+    def delta():
+        state["flip"] = not state["flip"]
+        ingest_bootstrap(moved if state["flip"] else current, SEASON)
+
+    results["scoring.delta"] = measure(delta, repeat)
+    results["scoring.unchanged"] = measure(lambda: ingest_bootstrap(current, SEASON), repeat)
+    ingest_bootstrap(current, SEASON)
+    return results
+
+
+def _bench_ranking(gen: LeagueGenerator, gameweeks: int, repeat: int) -> Dict[str, Dict]:
+    def rebuild():
+        with transaction.atomic():
+            build_leaderboard()
+
+    return {"ranking.leaderboard": measure(rebuild, repeat)}
+
+
+def _bench_api(gen: LeagueGenerator, gameweeks: int, repeat: int) -> Dict[str, Dict]:
+    client = Client()
+    username = gen.username(gen.players // 2)
+    deep_page = max(1, gen.players // settings.REST_FRAMEWORK.get("PAGE_SIZE", 25))
+    endpoints = {
+        "api.standings_current": "/api/standings/current/",
+        "api.standings_current_pundit": "/api/standings/current/?player_type=pundit",
+        "api.scores_first_page": "/api/scores/",
+        "api.scores_deep_page": f"/api/scores/?page={deep_page}",
+        "api.user_history": f"/api/user_history/{username}/",
+        "api.user_predictions": f"/api/user_predictions/{username}/",
+    }
+
+    results = {}
+    for name, url in endpoints.items():
+        def get(url=url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise AssertionError(f"{url} returned {response.status_code}")
+
+        results[name] = measure(get, repeat)
+
+    upstream = _snapshot(gen.bootstrap(gameweeks + 1))
+
+    def post_update() -> None:
+        response = client.post("/api/update_scores/", {"season": SEASON}, content_type="application/json")
+        if response.status_code != 202:
+            raise AssertionError(f"update_scores returned {response.status_code}")
+
+    # The request only queues a job (merged into the pending one after the first run)
+    results["api.update_scores_enqueue"] = measure(post_update, repeat)
+    Job.objects.all().delete()
+
+    def update_scores():
+        SiteState.objects.filter(id=1).update(last_computed=None, bootstrap_hash="")
+        post_update()
+        with mock.patch("league.pipeline.fetch_bootstrap", return_value=upstream):
+            if work(once=True) != 1:
+                raise AssertionError("update_scores queued no job")
+        job = Job.objects.latest("id")
+        if job.status != "done":
+            raise AssertionError(f"update_scores job {job.status}: {job.error}")
+
+    # The request plus the worker running the update it queued
+    results["api.update_scores"] = measure(update_scores, repeat)
+    return results
+
+
+BENCHMARKS = {
+    "ingestion": _bench_ingestion,
+    "scoring": _bench_scoring,
+    "ranking": _bench_ranking,
+    "api": _bench_api,
+}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(
+    players: int,
+    gameweeks: int = 3,
+    repeat: int = 3,
+    seed: int = 0,
+    groups: Iterable[str] = GROUPS,
+) -> Dict:
+    """
+    Generate a league and run the selected benchmark groups in order.
+
+    Groups build on each other's data (api needs scores, scores need
+    predictions), so ingestion always runs first and scores are loaded
+    untimed when the scoring group is not selected.
+    """
+    gen = LeagueGenerator(players, seed=seed)
+    groups = [g for g in GROUPS if g in set(groups) | {"ingestion"}]
+    results: Dict[str, Dict] = {}
+    with benchmark_database():
+        for group in groups:
+            if group == "ingestion" and "scoring" not in groups:
+                results.update(_bench_ingestion(gen, gameweeks, repeat))
+                _load_scores(gen, gameweeks)
+            else:
+                results.update(BENCHMARKS[group](gen, gameweeks, repeat))
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "players": players,
+            "gameweeks": gameweeks,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, metric: str = "median_s") -> List[Dict]:
+    """Pair up results by name with the current/baseline ratio of a metric."""
+    rows = []
+    for name, stats in current["results"].items():
+        before = baseline.get("results", {}).get(name, {}).get(metric)
+        after = stats.get(metric)
+        rows.append({
+            "name": name,
+            "baseline": before,
+            "current": after,
+            "ratio": (after / before) if before and after is not None else None,
+        })
+    return rows
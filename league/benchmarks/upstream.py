@@ -0,0 +1,119 @@
+"""
+Local stand-in for the FPL API and a load test of the FPL-backed views.
+
+StandInUpstream serves a synthetic bootstrap-static with a fixed delay per
+request. run_load_test points the views at it with the upstream cache
+disabled, so every request waits on the upstream, and compares:
+
+- sync: /api/standings/pl/ on a fixed pool of worker threads, as under WSGI
+- async: /api/async/standings/pl/ as concurrent requests on one event loop
+"""
+import asyncio
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from django.test import AsyncClient, Client, override_settings
+
+from .bootstrap import synthetic_payload
+
+
+class StandInUpstream:
+    """
+    Serve a bootstrap-static payload on localhost after a fixed delay.
+
+    Usage:
+        with StandInUpstream(latency=0.5) as upstream:
+            requests.get(upstream.url)
+    """
+
+    def __init__(self, payload: bytes = None, latency: float = 0.0):
+        self.payload = payload if payload is not None else synthetic_payload(elements=50)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "StandInUpstream":
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with upstream._lock:
+                    upstream.requests += 1
+                time.sleep(upstream.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(upstream.payload)))
+                self.end_headers()
+                self.wfile.write(upstream.payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/bootstrap-static/"
+
+
+def _summary(name: str, requests: int, latency: float, elapsed: float, statuses: list) -> Dict:
+    return {
+        "mode": name,
+        "requests": requests,
+        "errors": sum(1 for status in statuses if status != 200),
+        "seconds": elapsed,
+        # how many upstream waits overlapped on average
+        "concurrency": requests * latency / elapsed if elapsed else None,
+    }
+
+
+def _run_sync(requests: int, latency: float, workers: int) -> Dict:
+    def get(_):
+        return Client().get("/api/standings/pl/").status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = list(pool.map(get, range(requests)))
+    return _summary(f"sync ({workers} threads)", requests, latency, time.perf_counter() - start, statuses)
+
+
+def _run_async(requests: int, latency: float) -> Dict:
+    async def run():
+        client = AsyncClient()
+        responses = await asyncio.gather(*(client.get("/api/async/standings/pl/") for _ in range(requests)))
+        return [response.status_code for response in responses]
+
+    start = time.perf_counter()
+    statuses = asyncio.run(run())
+    return _summary("async (1 event loop)", requests, latency, time.perf_counter() - start, statuses)
+
+
+def run_load_test(requests: int = 40, latency: float = 0.5, workers: int = 4) -> Dict:
+    """Drive both variants against a stand-in with the given upstream latency."""
+    caches = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "disabled": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    }
+    with tempfile.TemporaryDirectory() as tmp, StandInUpstream(latency=latency) as upstream:
+        with override_settings(
+            FPL_BOOTSTRAP_URL=upstream.url,
+            FPL_SNAPSHOT_DIR=tmp,
+            CACHES=caches,
+            UPSTREAM_CACHE="disabled",
+        ):
+            results = [_run_sync(requests, latency, workers), _run_async(requests, latency)]
+        return {"latency": latency, "upstream_requests": upstream.requests, "results": results}
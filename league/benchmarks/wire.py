@@ -0,0 +1,92 @@
+"""
+Bytes on the wire and CPU per request for /api/standings/current/.
+
+Each league size gets a throwaway database with a generated league
+(predictions, scored gameweeks, built leaderboard). The endpoint is then
+requested through the test client, with the full middleware stack, in
+these modes:
+
+- before: the old path; rows read from LeaderboardEntry and rendered by
+  DRF's JSONRenderer on every request, sent uncompressed
+- dynamic-*: rows read and rendered by ORJSONRenderer, then compressed by
+  CompressionMiddleware per request (the paged and fallback path)
+- stored-*: the RenderedPayload bytes written by build_leaderboard, served
+  in the requested encoding as-is
+
+CPU is process time per request (time.process_time), which includes the
+SQLite work done in-process; the median over the repeats is reported.
+"""
+import io
+import statistics
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from league.pipeline import ingest_bootstrap
+from league.views import ScoreCurrentView
+
+from .generator import LeagueGenerator
+from .suite import SEASON, benchmark_database
+
+
+URL = "/api/standings/current/"
+
+# name -> (Accept-Encoding, serve the stored payload, renderer override)
+MODES = {
+    "before": ("", False, JSONRenderer),
+    "dynamic-gzip": ("gzip", False, None),
+    "dynamic-br": ("br", False, None),
+    "stored-identity": ("", True, None),
+    "stored-gzip": ("gzip", True, None),
+    "stored-br": ("br", True, None),
+}
+
+
+def load_league(players: int, gameweeks: int = 3, seed: int = 0) -> None:
+    gen = LeagueGenerator(players, seed=seed)
+    ingest_bootstrap(gen.bootstrap(1), SEASON)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = gen.write_csv(Path(tmp) / "predictions.csv")
+        call_command("init_predictions", str(csv_path), season=SEASON, stdout=io.StringIO())
+    for gameweek in range(1, gameweeks + 1):
+        ingest_bootstrap(gen.bootstrap(gameweek), SEASON, full=True)
+
+
+def measure_mode(mode: str, repeat: int) -> Dict:
+    accept_encoding, stored, renderer = MODES[mode]
+    client = Client()
+    headers = {"HTTP_ACCEPT_ENCODING": accept_encoding} if accept_encoding else {}
+    with ExitStack() as stack:
+        if not stored:
+            stack.enter_context(mock.patch("league.views.stored_response", return_value=None))
+        if renderer is not None:
+            stack.enter_context(mock.patch.object(ScoreCurrentView, "renderer_classes", [renderer]))
+        cpu, wall = [], []
+        for _ in range(repeat):
+            start_cpu, start_wall = time.process_time(), time.perf_counter()
+            response = client.get(URL, **headers)
+            wall.append(time.perf_counter() - start_wall)
+            cpu.append(time.process_time() - start_cpu)
+            if response.status_code != 200:
+                raise AssertionError(f"{URL} returned {response.status_code} in mode {mode}")
+    return {
+        "mode": mode,
+        "encoding": response.get("Content-Encoding", "identity"),
+        "bytes": len(response.content),
+        "cpu_ms": statistics.median(cpu) * 1000,
+        "wall_ms": statistics.median(wall) * 1000,
+    }
+
+
+def run(players: int, repeat: int = 5, gameweeks: int = 3, seed: int = 0) -> List[Dict]:
+    """Load a league of the given size and measure every mode."""
+    with benchmark_database():
+        load_league(players, gameweeks=gameweeks, seed=seed)
+        return [dict(measure_mode(mode, repeat), players=players) for mode in MODES]
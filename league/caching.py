@@ -0,0 +1,325 @@
+"""
+HTTP caching helpers for the league API.
+
+Everything served from Score, Prediction and the leaderboard only changes when
+the update pipeline stamps SiteState.last_computed or when something bumps the
+data version (imports, player edits), so the two together (plus the season
+and the request's path and query) are a complete validator for conditional
+GETs.
+
+Per-player payloads are also cached server side with VersionedCache, keyed
+by a data version the pipeline bumps after every write, so a compute retires
+all of them at once without deleting anything.
+
+Responses derived from the upstream FPL feed are instead cached with
+UpstreamCache: stale-while-revalidate with a single-flight refresh.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import SiteState
+
+
+DEFAULT_SEASON = "2025/26"
+
+
+def _last_computed(request) -> Optional[datetime]:
+    # etag_func and last_modified_func both need it; read SiteState once
+    if not hasattr(request, "_league_last_computed"):
+        state = SiteState.objects.filter(id=1).only("last_computed").first()
+        request._league_last_computed = state.last_computed if state else None
+    return request._league_last_computed
+
+
+def data_etag(request, *args, **kwargs) -> Optional[str]:
+    last_computed = _last_computed(request)
+    if last_computed is None:
+        return None
+    season = request.GET.get("season", DEFAULT_SEASON)
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.GET.items()))
+    # Imports change predictions without a compute stamping last_computed
+    key = f"{last_computed.isoformat()}|{data_version()}|{season}|{request.path}|{query}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def data_last_modified(request, *args, **kwargs) -> Optional[datetime]:
+    return _last_computed(request)
+
+
+def conditional_on_data(view_func):
+    """
+    Answer GETs with 304 Not Modified while the computed data is unchanged.
+
+    Responses carry ETag/Last-Modified validators and Cache-Control: no-cache
+    so browsers revalidate on every poll instead of reusing stale data. Other
+    methods run the view as is: the validators cover the path and query, not
+    a request body (e.g. the usernames POSTed to a batch view).
+    """
+    conditional = condition(etag_func=data_etag, last_modified_func=data_last_modified)(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            response = conditional(request, *args, **kwargs)
+        else:
+            response = view_func(request, *args, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    return wrapper
+
+
+DATA_VERSION_KEY = "league:data-version"
+
+
+def _response_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE", "default")]
+
+
+def data_version() -> str:
+    """Stamp of the computed data; moves whenever bump_data_version() runs."""
+    # Kept in "default", which holds too few keys to cull, not with the
+    # entries it versions
+    cache = caches["default"]
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # First use (or the cache was cleared) starts a new stamp
+        cache.add(DATA_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version or ""
+
+
+def bump_data_version() -> None:
+    """Retire every VersionedCache entry once the current transaction commits."""
+    transaction.on_commit(lambda: caches["default"].set(DATA_VERSION_KEY, uuid.uuid4().hex, timeout=None))
+
+
+class VersionedCache:
+    """
+    Read-through cache for payloads built from Score, Prediction and Player.
+
+    Keys embed data_version(), so entries written before a bump are never read
+    again and simply age out after `timeout`. The backend is RESPONSE_CACHE
+    (default "default"); a shared one such as the file cache lets every
+    worker process reuse an entry built by any of them. It may cull entries
+    freely: the version stamp itself is kept in "default".
+
+    Usage:
+        history_cache = VersionedCache("user_history")
+        payload = history_cache.get_or_build((username, season), build_history)
+    """
+
+    def __init__(self, name: str, timeout: float = 24 * 3600):
+        self.name = name
+        self.timeout = timeout
+
+    def key(self, parts: Iterable[Any]) -> str:
+        raw = "|".join(str(part) for part in parts)
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return f"versioned:{self.name}:{data_version()}:{digest}"
+
+    def get_or_build(self, parts: Iterable[Any], build: Callable[[], Any]) -> Any:
+        cache = _response_cache()
+        key = self.key(parts)
+        payload = cache.get(key)
+        if payload is None:
+            payload = build()
+            cache.set(key, payload, timeout=self.timeout)
+        return payload
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamCache:
+    """
+    Stale-while-revalidate cache for values loaded from an upstream service.
+
+    - Within fresh_for seconds of the last load the cached value is served.
+    - Within the following stale_for seconds the stale value is served at
+      once and one background refresh is started.
+    - Past that the caller loads synchronously; if the load fails the last
+      good value is served instead, however old.
+
+    Only the holder of the refresh lock loads, so an expiry costs one
+    upstream request rather than one per waiting request. The lock is a
+    cache.add() on the configured backend (UPSTREAM_CACHE, default
+    "default"), which makes it cross-process when the backend is shared.
+
+    Async views pass an aloader coroutine function and call aget(); their
+    background refresh still runs on a thread with the sync loader, since
+    the event loop may not outlive the request.
+
+    Usage:
+        standings = UpstreamCache("pl_standings", load_pl_standings, fresh_for=600)
+        data = standings.get()
+    """
+
+    def __init__(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        aloader: Optional[Callable[[], Awaitable[Any]]] = None,
+        fresh_for: float = 600,
+        stale_for: float = 3600,
+        lock_timeout: float = 60,
+        wait_for: float = 20,
+    ):
+        self.key = f"upstream:{key}"
+        self.lock_key = f"upstream-lock:{key}"
+        self.loader = loader
+        self.aloader = aloader
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.lock_timeout = lock_timeout
+        self.wait_for = wait_for
+        self._local_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "UPSTREAM_CACHE", "default")]
+
+    def _freshness(self, entry: Optional[dict]) -> str:
+        if entry is None:
+            return "missing"
+        age = time.time() - entry["loaded_at"]
+        if age < self.fresh_for:
+            return "fresh"
+        if age < self.fresh_for + self.stale_for:
+            return "stale"
+        return "expired"
+
+    def _is_newer(self, latest: Optional[dict], entry: Optional[dict]) -> bool:
+        return latest is not None and (entry is None or latest["loaded_at"] > entry["loaded_at"])
+
+    def get(self) -> Any:
+        entry = self.cache.get(self.key)
+        freshness = self._freshness(entry)
+        if freshness == "fresh":
+            return entry["value"]
+        if freshness == "stale":
+            self.refresh_in_background()
+            return entry["value"]
+        return self._get_blocking(entry)
+
+    def _get_blocking(self, entry: Optional[dict]) -> Any:
+        token = self._acquire()
+        if token is None:
+            # Another request is loading: wait for its result
+            deadline = time.monotonic() + self.wait_for
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                latest = self.cache.get(self.key)
+                if self._is_newer(latest, entry):
+                    return latest["value"]
+                if self.cache.get(self.lock_key) is None:
+                    break
+            token = self._acquire()
+        try:
+            return self._load()
+        except Exception:
+            if entry is None:
+                raise
+            logger.warning(f"Upstream load for {self.key} failed; serving last good value", exc_info=True)
+            return entry["value"]
+        finally:
+            if token is not None:
+                self._release(token)
+
+    def refresh_in_background(self) -> bool:
+        """Start a refresh thread unless one is already running anywhere."""
+        token = self._acquire()
+        if token is None:
+            return False
+
+        def run():
+            try:
+                self._load()
+            except Exception:
+                logger.warning(f"Background refresh of {self.key} failed", exc_info=True)
+            finally:
+                self._release(token)
+
+        threading.Thread(target=run, name=f"refresh {self.key}", daemon=True).start()
+        return True
+
+    async def aget(self) -> Any:
+        """Async get(), loading with aloader."""
+        entry = await self.cache.aget(self.key)
+        freshness = self._freshness(entry)
+        if freshness == "fresh":
+            return entry["value"]
+        if freshness == "stale":
+            await self.arefresh_in_background()
+            return entry["value"]
+        return await self._aget_blocking(entry)
+
+    async def _aget_blocking(self, entry: Optional[dict]) -> Any:
+        token = await sync_to_async(self._acquire)()
+        if token is None:
+            deadline = time.monotonic() + self.wait_for
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+                latest = await self.cache.aget(self.key)
+                if self._is_newer(latest, entry):
+                    return latest["value"]
+                if await self.cache.aget(self.lock_key) is None:
+                    break
+            token = await sync_to_async(self._acquire)()
+        try:
+            return await self._aload()
+        except Exception:
+            if entry is None:
+                raise
+            logger.warning(f"Upstream load for {self.key} failed; serving last good value", exc_info=True)
+            return entry["value"]
+        finally:
+            if token is not None:
+                await sync_to_async(self._release)(token)
+
+    async def arefresh_in_background(self) -> bool:
+        """
+        Async refresh_in_background.
+
+        The refresh runs on refresh_in_background's thread with the sync
+        loader rather than as a task: under WSGI the running loop belongs to
+        the request (async_to_sync) and would cancel the task when it ends.
+        """
+        return await sync_to_async(self.refresh_in_background)()
+
+    async def _aload(self) -> Any:
+        value = await self.aloader()
+        await self.cache.aset(self.key, {"value": value, "loaded_at": time.time()}, timeout=None)
+        return value
+
+    def _load(self) -> Any:
+        value = self.loader()
+        # No expiry: the entry doubles as the last good value
+        self.cache.set(self.key, {"value": value, "loaded_at": time.time()}, timeout=None)
+        return value
+
+    def _acquire(self) -> Optional[str]:
+        token = uuid.uuid4().hex
+        # Serialize within the process too: not every backend's add() is atomic
+        with self._local_lock:
+            acquired = self.cache.add(self.lock_key, token, timeout=self.lock_timeout)
+        return token if acquired else None
+
+    def _release(self, token: str) -> None:
+        # Best effort: do not drop a lock that expired and was taken by another
+        if self.cache.get(self.lock_key) == token:
+            self.cache.delete(self.lock_key)
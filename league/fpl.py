@@ -0,0 +1,273 @@
+"""
+FPL bootstrap-static client and local snapshot store.
+
+Only the "teams" and "events" sections of bootstrap-static are used, so each
+fetch is reduced to those and stored on disk gzip-compressed, keyed by a hash
+of the fields the update pipeline reads (HASHED_FIELDS). Upstream data that
+only moved in other fields (transfer counts, chip plays, ...) hashes the
+same, which lets the pipeline skip, and the latest stored copy lets every
+command run offline. Only the newest FPL_SNAPSHOT_KEEP files are kept, plus
+the one LATEST points at.
+
+Web requests fetch with store=False: they neither write files nor move the
+pipeline's LATEST pointer.
+
+afetch_bootstrap is the async counterpart for async views: a slow upstream
+holds a connection, not a worker thread. Each fetch opens and closes its own
+httpx.AsyncClient, since under WSGI every async view runs on an event loop
+that async_to_sync creates for the request and tears down after it.
+"""
+import gzip
+import hashlib
+import json
+import os
+import ssl
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .jsonstream import extract_keys
+
+
+FPL_BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+
+SECTIONS = ("teams", "events")
+
+LATEST_POINTER = "LATEST"
+
+# What the pipeline reads of each section (see league/ingest.py)
+HASHED_FIELDS = {
+    "teams": ("id", "name", "short_name", "code", "position", "points"),
+    "events": ("id", "is_current", "finished", "data_checked", "deadline_time"),
+}
+
+# Stored snapshots kept by default, newest first; a few KB each
+DEFAULT_SNAPSHOT_KEEP = 1000
+
+CHUNK_SIZE = 64 * 1024
+
+
+class SnapshotNotFound(Exception):
+    """Raised when offline mode is requested but no snapshot is stored."""
+
+
+@dataclass
+class Snapshot:
+    hash: str
+    fetched_at: str
+    teams: List[Dict] = field(default_factory=list)
+    events: List[Dict] = field(default_factory=list)
+
+    @property
+    def data(self) -> Dict[str, List[Dict]]:
+        """The sections in the shape of the bootstrap-static document."""
+        return {"teams": self.teams, "events": self.events}
+
+
+def snapshot_dir() -> Path:
+    return Path(getattr(settings, "FPL_SNAPSHOT_DIR", settings.BASE_DIR / "snapshots"))
+
+
+def extract_sections(data: Dict) -> Dict[str, List[Dict]]:
+    """Keep only the bootstrap-static sections the league uses."""
+    return {name: data.get(name, []) for name in SECTIONS}
+
+
+def snapshot_keep() -> Optional[int]:
+    return getattr(settings, "FPL_SNAPSHOT_KEEP", DEFAULT_SNAPSHOT_KEEP)
+
+
+def content_hash(sections: Dict[str, List[Dict]]) -> str:
+    """Stable SHA-256 of the HASHED_FIELDS of the extracted sections."""
+    hashed = {
+        name: [{key: item.get(key) for key in HASHED_FIELDS[name]} for item in sections.get(name, [])]
+        for name in SECTIONS
+    }
+    canonical = json.dumps(hashed, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_snapshot(sections: Dict[str, List[Dict]]) -> Snapshot:
+    return Snapshot(
+        hash=content_hash(sections),
+        fetched_at=timezone.now().isoformat(),
+        teams=sections.get("teams", []),
+        events=sections.get("events", []),
+    )
+
+
+def save_snapshot(sections: Dict[str, List[Dict]], directory: Optional[Path] = None) -> Snapshot:
+    """
+    Store sections as <hash>.json.gz, point LATEST at it and prune old files.
+
+    A payload whose hash is already stored is not rewritten, only marked as
+    the most recent.
+    """
+    directory = directory or snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    snapshot = make_snapshot(sections)
+
+    path = directory / f"{snapshot.hash}.json.gz"
+    if path.exists():
+        os.utime(path)
+    else:
+        tmp = _tmp_path(path)
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"hash": snapshot.hash, "fetched_at": snapshot.fetched_at, **sections}, f)
+        os.replace(tmp, path)
+
+    pointer = directory / LATEST_POINTER
+    tmp = _tmp_path(pointer)
+    tmp.write_text(snapshot.hash, encoding="utf-8")
+    os.replace(tmp, pointer)
+    prune_snapshots(directory)
+    return snapshot
+
+
+def prune_snapshots(directory: Optional[Path] = None, keep: Optional[int] = None) -> int:
+    """
+    Delete all but the newest stored snapshots and the one LATEST points at.
+
+    Args:
+        keep: Snapshots to keep (default FPL_SNAPSHOT_KEEP); None keeps all
+
+    Returns:
+        Number of files deleted
+    """
+    directory = directory or snapshot_dir()
+    keep = snapshot_keep() if keep is None else keep
+    if keep is None:
+        return 0
+    pointer = directory / LATEST_POINTER
+    latest = pointer.read_text(encoding="utf-8").strip() if pointer.exists() else None
+    stored = []
+    for path in directory.glob("*.json.gz"):
+        try:
+            stored.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    stored.sort(reverse=True)
+    deleted = 0
+    for _, path in stored[keep:]:
+        if path.name == f"{latest}.json.gz":
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            # Pruned by a concurrent writer
+            continue
+        deleted += 1
+    return deleted
+
+
+def _tmp_path(path: Path) -> Path:
+    # Unique per writer: concurrent fetches may store the same snapshot
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def load_snapshot_file(path: Path) -> Snapshot:
+    """Read a stored snapshot file."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    sections = extract_sections(payload)
+    return Snapshot(
+        hash=payload.get("hash") or content_hash(sections),
+        fetched_at=payload.get("fetched_at", ""),
+        **sections,
+    )
+
+
+def load_snapshot(snapshot_hash: str, directory: Optional[Path] = None) -> Snapshot:
+    """Read a stored snapshot by hash."""
+    path = (directory or snapshot_dir()) / f"{snapshot_hash}.json.gz"
+    if not path.exists():
+        raise SnapshotNotFound(f"No snapshot stored for {snapshot_hash}")
+    return load_snapshot_file(path)
+
+
+def latest_snapshot(directory: Optional[Path] = None) -> Optional[Snapshot]:
+    """Read the most recently stored snapshot, if any."""
+    pointer = (directory or snapshot_dir()) / LATEST_POINTER
+    if not pointer.exists():
+        return None
+    return load_snapshot(pointer.read_text(encoding="utf-8").strip(), directory)
+
+
+def fetch_bootstrap(timeout: int = 20, offline: bool = False, store: bool = True) -> Snapshot:
+    """
+    Fetch bootstrap-static, store the extracted snapshot and return it.
+
+    Args:
+        timeout: HTTP timeout in seconds
+        offline: Skip the network and return the latest stored snapshot
+        store: Save the snapshot and move LATEST; the web tier passes False
+
+    Raises:
+        SnapshotNotFound: offline was requested and nothing is stored
+    """
+    if offline:
+        snapshot = latest_snapshot()
+        if snapshot is None:
+            raise SnapshotNotFound(f"No FPL snapshot stored in {snapshot_dir()}")
+        return snapshot
+
+    sections = stream_sections(bootstrap_url(), timeout=timeout)
+    return save_snapshot(sections) if store else make_snapshot(sections)
+
+
+def bootstrap_url() -> str:
+    # Overridable so tests and load tests can point at a local stand-in
+    return getattr(settings, "FPL_BOOTSTRAP_URL", FPL_BOOTSTRAP_URL)
+
+
+def stream_sections(url: str, timeout: int = 20) -> Dict[str, List[Dict]]:
+    """
+    Download bootstrap-static and decode only the sections we use.
+
+    The body is parsed incrementally and the connection is closed as soon as
+    both sections have been read, so the player data that follows them is
+    neither materialized nor, usually, downloaded.
+    """
+    with requests.get(url, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        found = extract_keys(resp.iter_content(chunk_size=CHUNK_SIZE), SECTIONS)
+    return {name: found.get(name, []) for name in SECTIONS}
+
+
+@lru_cache(maxsize=None)
+def _ssl_context() -> ssl.SSLContext:
+    # Loading the CA bundle takes ~0.2s and would block the loop on every fetch
+    return httpx.create_ssl_context()
+
+
+async def astream_sections(url: str, timeout: int = 20) -> Dict[str, List[Dict]]:
+    """
+    Async stream_sections.
+
+    The body is read without blocking the event loop and then parsed in a
+    worker thread, so unlike the sync path the whole document is downloaded.
+    """
+    async with httpx.AsyncClient(verify=_ssl_context(), follow_redirects=True) as client:
+        async with client.stream("GET", url, timeout=timeout) as resp:
+            resp.raise_for_status()
+            body = await resp.aread()
+    found = await sync_to_async(extract_keys, thread_sensitive=False)([body], SECTIONS)
+    return {name: found.get(name, []) for name in SECTIONS}
+
+
+async def afetch_bootstrap(timeout: int = 20, offline: bool = False, store: bool = True) -> Snapshot:
+    """Async fetch_bootstrap: fetch, store the extracted snapshot and return it."""
+    if offline:
+        return await sync_to_async(fetch_bootstrap)(offline=True)
+    sections = await astream_sections(bootstrap_url(), timeout=timeout)
+    if not store:
+        return make_snapshot(sections)
+    return await sync_to_async(save_snapshot)(sections)
@@ -0,0 +1,336 @@
+"""
+Streaming importer for prediction CSV files.
+
+Rows use the predictions_formatted.csv layout:
+user_name,team_name,predicted_1,...,predicted_20,player_type where
+predicted_n is the id of the team predicted to finish n-th (0 = no
+prediction). Each row is validated in memory against the team ids loaded
+once up front, and valid rows are written in chunks, each chunk in its own
+transaction with bulk statements. Invalid rows are reported and skipped
+without aborting the file.
+
+Large files can instead be split into byte-range shards that are parsed
+and validated on a process pool (PredictionImporter.run_sharded).
+"""
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.db import DatabaseError, transaction
+
+from .caching import bump_data_version
+from .ingest import insert_prediction_rows
+from .leaderboard import rebuild_standings
+from .models import Player, Prediction, SiteState
+from .teams import team_registry
+from .workers import init_worker
+
+
+COLUMNS = 23
+RANKS = 20
+PLAYER_TYPES = {value for value, _ in Player.PLAYER_TYPES}
+
+
+class RowError(Exception):
+    """A CSV row that cannot be imported."""
+
+    def __init__(self, line: int, username: str, message: str):
+        super().__init__(message)
+        self.line = line
+        self.username = username
+        self.message = message
+
+    def __reduce__(self):
+        # Picklable for results returned from worker processes
+        return (RowError, (self.line, self.username, self.message))
+
+    def as_row(self) -> List[str]:
+        return [str(self.line), self.username, self.message]
+
+
+@dataclass
+class PredictionRow:
+    line: int
+    username: str
+    team_name: str
+    team_ids: List[int]
+    player_type: str
+
+    def missing_ranks(self) -> List[int]:
+        return [rank for rank, team_id in enumerate(self.team_ids, start=1) if team_id == 0]
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    players_created: int = 0
+    players_updated: int = 0
+    predictions: int = 0
+    errors: List[RowError] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+def parse_row(row: List[str], line: int, team_ids: Set[int]) -> PredictionRow:
+    """
+    Validate one CSV row as a (possibly partial) permutation of known teams.
+
+    Raises:
+        RowError: the row is malformed, references an unknown team or
+            predicts the same team twice
+    """
+    username = row[0].strip() if row else ""
+    if len(row) < COLUMNS:
+        raise RowError(line, username, f"Row does not have {COLUMNS} columns (got {len(row)})")
+    if not username:
+        raise RowError(line, username, "Missing user name")
+
+    try:
+        predicted = [int(x.strip()) for x in row[2:2 + RANKS]]
+    except ValueError as e:
+        raise RowError(line, username, f"Invalid team id: {e}")
+
+    seen = set()
+    for rank, team_id in enumerate(predicted, start=1):
+        if team_id == 0:
+            continue
+        if team_id not in team_ids:
+            raise RowError(line, username, f"Team ID {team_id} at rank {rank} not found in database")
+        if team_id in seen:
+            raise RowError(line, username, f"Team ID {team_id} predicted more than once")
+        seen.add(team_id)
+
+    player_type = row[22].strip() or "normal"
+    if player_type not in PLAYER_TYPES:
+        raise RowError(line, username, f"Unknown player_type {player_type!r}")
+
+    return PredictionRow(
+        line=line,
+        username=username,
+        team_name=row[1].strip(),  # This is the user's prediction alias/entry name
+        team_ids=predicted,
+        player_type=player_type,
+    )
+
+
+def iter_csv_rows(path: Path) -> Iterator[Tuple[int, List[str]]]:
+    """Yield (line number, row) for every non-empty, non-comment CSV row."""
+    with Path(path).open(newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row or row[0].startswith("#"):
+                continue
+            yield reader.line_num, row
+
+
+def shard_ranges(path: Path, shards: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges that start and end on line boundaries.
+
+    Assumes one CSV record per line (no quoted newlines), which holds for the
+    prediction layout.
+    """
+    size = Path(path).stat().st_size
+    if size == 0:
+        return []
+    offsets = [0]
+    with Path(path).open("rb") as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards, offsets[-1]))
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                f.readline()  # finish the line the cut landed in
+            offsets.append(min(f.tell(), size))
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+
+
+def validate_shard(
+    path: str, start: int, end: int, team_ids: Set[int]
+) -> Tuple[List[PredictionRow], List[RowError], int, int]:
+    """
+    Parse and validate the rows in one byte range of a CSV file.
+
+    Line numbers are relative to the shard; the caller offsets them.
+
+    Returns:
+        (valid rows, errors, rows read, physical lines in the shard)
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    lines = text.splitlines(keepends=True)
+    valid: List[PredictionRow] = []
+    errors: List[RowError] = []
+    rows = 0
+    reader = csv.reader(lines)
+    for row in reader:
+        if not row or row[0].startswith("#"):
+            continue
+        rows += 1
+        try:
+            valid.append(parse_row(row, reader.line_num, team_ids))
+        except RowError as e:
+            errors.append(e)
+    return valid, errors, rows, len(lines)
+
+
+def load_team_ids() -> Set[int]:
+    return set(team_registry().ids)
+
+
+class PredictionImporter:
+    """
+    Write validated prediction rows in chunked bulk transactions.
+
+    Usage:
+        importer = PredictionImporter(season="2025/26", team_ids=load_team_ids())
+        result = importer.run(iter_csv_rows(path))
+    """
+
+    def __init__(
+        self,
+        season: str,
+        team_ids: Set[int],
+        chunk_size: int = 500,
+        progress: Optional[Callable[[ImportResult], None]] = None,
+    ):
+        self.season = season
+        self.team_ids = team_ids
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.result = ImportResult()
+
+    def run(self, rows: Iterable[Tuple[int, List[str]]]) -> ImportResult:
+        """Parse, validate and write every row."""
+        def parsed() -> Iterator[PredictionRow]:
+            for line, row in rows:
+                self.result.rows += 1
+                try:
+                    yield parse_row(row, line, self.team_ids)
+                except RowError as e:
+                    self.result.errors.append(e)
+
+        return self.write(parsed())
+
+    def run_sharded(self, path: Path, workers: int, shards_per_worker: int = 4) -> ImportResult:
+        """
+        Parse and validate byte-range shards of a CSV across a process pool.
+
+        Shards are merged back in file order before writing, so rows, chunks
+        and the error report match a single-process run of the same file.
+        """
+        ranges = shard_ranges(path, workers * shards_per_worker)
+
+        def merged() -> Iterator[PredictionRow]:
+            line_offset = 0
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                results = pool.map(
+                    validate_shard,
+                    [str(path)] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges],
+                    [self.team_ids] * len(ranges),
+                )
+                for valid, errors, rows, lines in results:
+                    self.result.rows += rows
+                    for error in errors:
+                        error.line += line_offset
+                        self.result.errors.append(error)
+                    for row in valid:
+                        row.line += line_offset
+                        yield row
+                    line_offset += lines
+
+        return self.write(merged())
+
+    def write(self, rows: Iterable[PredictionRow]) -> ImportResult:
+        """
+        Write already validated rows in chunks.
+
+        Stored scores were computed from the predictions this replaces, so
+        SiteState.scores_stale makes the next update recompute them in full.
+        Renamed teams reach the leaderboard and rank matrix at once; new
+        players and predictions reach them with that recompute.
+        """
+        chunk: List[PredictionRow] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk)
+        if self.result.predictions:
+            SiteState.objects.update_or_create(id=1, defaults={"scores_stale": True})
+        if self.result.players_updated:
+            rebuild_standings(self.season)
+        bump_data_version()
+        return self.result
+
+    def _write_chunk(self, chunk: List[PredictionRow]) -> None:
+        # A username repeated in the file: the last row wins
+        by_username = {row.username: row for row in chunk}
+        rows = list(by_username.values())
+        try:
+            with transaction.atomic():
+                created, updated = self._write_players(rows)
+                predictions = self._write_predictions(rows)
+        except DatabaseError as e:
+            self.result.errors.extend(RowError(row.line, row.username, f"Database error: {e}") for row in rows)
+        else:
+            self.result.players_created += created
+            self.result.players_updated += updated
+            self.result.predictions += predictions
+            for row in rows:
+                for rank in row.missing_ranks():
+                    self.result.warnings.append(
+                        f"User {row.username} has no prediction for rank {rank}"
+                    )
+        if self.progress:
+            self.progress(self.result)
+
+    def _write_players(self, rows: List[PredictionRow]) -> Tuple[int, int]:
+        existing = {
+            p.username: p
+            for p in Player.objects.filter(username__in=[row.username for row in rows])
+        }
+        new = [
+            Player(username=row.username, player_type=row.player_type, custom_team_name=row.team_name)
+            for row in rows
+            if row.username not in existing
+        ]
+        Player.objects.bulk_create(new)
+
+        # Update custom_team_name if it changed
+        changed = []
+        for row in rows:
+            player = existing.get(row.username)
+            if player and player.custom_team_name != row.team_name:
+                player.custom_team_name = row.team_name
+                changed.append(player)
+        Player.objects.bulk_update(changed, ["custom_team_name"])
+        return len(new), len(changed)
+
+    def _write_predictions(self, rows: List[PredictionRow]) -> int:
+        player_ids = dict(
+            Player.objects.filter(username__in=[row.username for row in rows]).values_list("username", "id")
+        )
+        # The row is the full prediction for the season: replace what is stored
+        Prediction.objects.filter(season=self.season, player_id__in=player_ids.values()).delete()
+        return insert_prediction_rows(
+            (self.season, player_ids[row.username], team_id, rank)
+            for row in rows
+            for rank, team_id in enumerate(row.team_ids, start=1)
+            if team_id != 0
+        )
+
+
+def write_error_report(errors: Iterable[RowError], path: Path) -> Path:
+    """Write errors as a line,user_name,error CSV."""
+    with Path(path).open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["line", "user_name", "error"])
+        writer.writerows(e.as_row() for e in sorted(errors, key=lambda e: e.line))
+    return Path(path)
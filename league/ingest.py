@@ -0,0 +1,235 @@
+"""
+Bulk ingestion of FPL data and computed scores.
+
+Each writer upserts a whole model in one or a few INSERT ... ON CONFLICT
+statements instead of an update_or_create (SELECT + INSERT/UPDATE) per row.
+Callers are expected to wrap a full run in transaction.atomic().
+"""
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+from .models import ActualStanding, Gameweek, Prediction, Score, Team
+from .teams import teams_changed
+
+
+BATCH_SIZE = 5000
+
+# Ids per IN (...) lookup, kept under SQLite's bound-parameter limit.
+IN_CHUNK_SIZE = 900
+
+
+def upsert_teams(teams: Iterable[Dict]) -> int:
+    """
+    Upsert Team rows from the FPL "teams" section.
+
+    Teams already stored with the same name, short name and code are left
+    alone, so a poll that changes no team leaves the team registry valid.
+
+    Returns:
+        Number of teams written
+    """
+    stored = {row[0]: row[1:] for row in Team.objects.values_list("id", "name", "short_name", "code")}
+    objs = [
+        Team(
+            id=t["id"],
+            name=t.get("name", ""),
+            short_name=t.get("short_name", ""),
+            code=t.get("code", 0),
+        )
+        for t in teams
+    ]
+    objs = [team for team in objs if stored.get(team.id) != (team.name, team.short_name, team.code)]
+    if not objs:
+        return 0
+    Team.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["id"],
+        update_fields=["name", "short_name", "code"],
+        batch_size=BATCH_SIZE,
+    )
+    # bulk_create sends no post_save, so invalidate the registry here
+    teams_changed()
+    return len(objs)
+
+
+def upsert_gameweeks(events: Iterable[Dict]) -> List[Gameweek]:
+    """
+    Upsert Gameweek rows from the FPL "events" section.
+
+    Returns:
+        The written Gameweek objects, in input order
+    """
+    objs = [
+        Gameweek(
+            id=ev["id"],
+            is_current=ev.get("is_current", False),
+            finished=ev.get("finished", False),
+            data_checked=ev.get("data_checked", False),
+            deadline_time=parse_datetime(ev["deadline_time"]) if ev.get("deadline_time") else None,
+        )
+        for ev in events
+    ]
+    Gameweek.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["id"],
+        update_fields=["is_current", "finished", "data_checked", "deadline_time"],
+        batch_size=BATCH_SIZE,
+    )
+    return objs
+
+
+def upsert_standings(season: str, gameweek: int, teams: Iterable[Dict]) -> int:
+    """
+    Upsert ActualStanding rows for one gameweek from the FPL "teams" section.
+
+    Returns:
+        Number of standings written
+    """
+    objs = [
+        ActualStanding(
+            season=season,
+            gameweek=gameweek,
+            team_id=t["id"],
+            actual_rank=t.get("position", 0) or 0,
+            points=t.get("points", 0) or 0,
+        )
+        for t in teams
+    ]
+    ActualStanding.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["season", "gameweek", "team"],
+        update_fields=["actual_rank", "points", "updated_time"],
+        batch_size=BATCH_SIZE,
+    )
+    return len(objs)
+
+
+def upsert_scores(scores: List[Score]) -> int:
+    """
+    Upsert Score rows keyed on (season, gameweek, player).
+
+    Returns:
+        Number of scores written
+    """
+    Score.objects.bulk_create(
+        scores,
+        update_conflicts=True,
+        unique_fields=["season", "gameweek", "player"],
+        update_fields=["score_correct", "score_deviation", "rank_correct", "rank_deviation", "completed"],
+        batch_size=BATCH_SIZE,
+    )
+    return len(scores)
+
+
+def upsert_score_rows(rows: Iterable[Tuple]) -> int:
+    """
+    Upsert Score rows given as plain tuples, skipping model instantiation.
+
+    Each tuple is (season, gameweek, player_id, score_correct,
+    score_deviation, completed). Intended for bulk rebuilds with millions of
+    rows, where creating Score objects would dominate the run.
+
+    Returns:
+        Number of rows written
+    """
+    table = connection.ops.quote_name(Score._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (season, gameweek, player_id, score_correct, score_deviation, "
+        "rank_correct, rank_deviation, completed) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (season, gameweek, player_id) DO UPDATE SET "
+        "score_correct = EXCLUDED.score_correct, score_deviation = EXCLUDED.score_deviation, "
+        "rank_correct = EXCLUDED.rank_correct, rank_deviation = EXCLUDED.rank_deviation, "
+        "completed = EXCLUDED.completed"
+    )
+    count = 0
+    batch = []
+    with connection.cursor() as cursor:
+        for season, gameweek, player_id, correct, deviation, completed in rows:
+            batch.append((season, gameweek, player_id, correct, deviation, correct, deviation, completed))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def insert_prediction_rows(rows: Iterable[Tuple]) -> int:
+    """
+    Insert Prediction rows given as (season, player_id, team_id, predicted_rank).
+
+    Rows are validated by the caller; existing predictions for the same
+    players must have been removed first.
+
+    Returns:
+        Number of rows written
+    """
+    table = connection.ops.quote_name(Prediction._meta.db_table)
+    sql = f"INSERT INTO {table} (season, player_id, team_id, predicted_rank) VALUES (%s, %s, %s, %s)"
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany(sql, rows[start:start + BATCH_SIZE])
+    return len(rows)
+
+
+class QueryReport:
+    """
+    Count SQL statements and time per named stage of an ingestion run.
+
+    Usage:
+        report = QueryReport()
+        with report.stage("teams"):
+            upsert_teams(...)
+        print(report.format())
+    """
+
+    def __init__(self):
+        self.stages: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+
+    @contextmanager
+    def stage(self, name: str):
+        stats = self.stages.setdefault(name, {"queries": 0, "seconds": 0.0})
+
+        def counter(execute, sql, params, many, context):
+            stats["queries"] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            yield
+        stats["seconds"] += time.perf_counter() - start
+
+    @property
+    def total_queries(self) -> int:
+        return sum(int(s["queries"]) for s in self.stages.values())
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {name: dict(stats) for name, stats in self.stages.items()}
+
+    def format(self) -> str:
+        lines = [f"{'stage':<12} {'queries':>8} {'seconds':>9}"]
+        for name, stats in self.stages.items():
+            lines.append(f"{name:<12} {int(stats['queries']):>8} {stats['seconds']:>9.3f}")
+        lines.append(f"{'total':<12} {self.total_queries:>8}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def maybe_stage(report: Optional[QueryReport], name: str):
+    """Run a block under report.stage(name) when a report is given."""
+    if report is None:
+        yield
+    else:
+        with report.stage(name):
+            yield
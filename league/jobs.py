@@ -0,0 +1,263 @@
+"""
+Table-backed job queue for work that must not run inside a web request.
+
+The web tier only enqueues: UpdateScoresView inserts a Job row and answers
+202 with its id. The run_worker command claims due jobs one at a time and
+runs them. Identical pending jobs (same kind, season and trigger) are
+collapsed into one by a partial unique constraint, their params merged.
+Failed attempts are retried with exponential backoff until max_attempts.
+
+Claiming is a conditional UPDATE on status, so several workers can poll the
+same table without running a job twice. While a job runs, a thread in its
+worker touches heartbeat_at every HEARTBEAT_INTERVAL; a job whose heartbeat
+is older than STALE_AFTER belonged to a worker that died and is requeued,
+however long the job itself takes.
+
+A failed attempt records only a one-line summary of the exception on the
+job, since the status endpoint is public; the traceback goes to the log.
+Finished jobs are deleted by the worker KEEP_FINISHED after they finished.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .leaderboard import rebuild_standings
+from .models import Job
+from .pipeline import run_update
+from .workers import periodic
+
+logger = logging.getLogger(__name__)
+
+
+BACKOFF_BASE = timedelta(seconds=30)
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+# Missed heartbeats before a running job is presumed orphaned; long enough to
+# ride out a write lock held by a long SQLite transaction
+STALE_AFTER = timedelta(minutes=5)
+# Done and failed jobs are kept this long for the status endpoint
+KEEP_FINISHED = timedelta(days=14)
+PURGE_INTERVAL = timedelta(hours=1)
+
+
+def _update_scores(job: Job) -> Dict:
+    return run_update(
+        job.season,
+        force=job.params.get("force", False),
+        full=job.params.get("full", False),
+        debounce=job.params.get("debounce", True),
+    )
+
+
+def _build_leaderboard(job: Job) -> Dict:
+    return {"status": "ok", "season": job.season, "entries": rebuild_standings(job.season)}
+
+
+HANDLERS: Dict[str, Callable[[Job], Dict]] = {
+    "update_scores": _update_scores,
+    "build_leaderboard": _build_leaderboard,
+}
+
+
+def enqueue(kind: str, season: str, trigger: str, params: Optional[Dict] = None) -> Tuple[Job, bool]:
+    """
+    Queue a job unless an identical one is already pending.
+
+    A pending job takes on the params it lacks (e.g. full=True), so merging
+    never drops a request; params only ever hold non-default flags.
+
+    Returns:
+        (job, created): the new job, or the pending one it was merged into
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    params = params or {}
+    pending = Job.objects.filter(kind=kind, season=season, trigger=trigger, status="pending")
+    while True:
+        job = pending.first()
+        if job is None:
+            try:
+                with transaction.atomic():
+                    return Job.objects.create(kind=kind, season=season, trigger=trigger, params=params), True
+            except IntegrityError:
+                # Lost a race with a concurrent enqueue of the same job
+                continue
+        merged = {**job.params, **params}
+        if merged == job.params:
+            return job, False
+        # Only while still pending; if it was claimed meanwhile, queue anew
+        if Job.objects.filter(id=job.id, status="pending").update(params=merged):
+            job.params = merged
+            return job, False
+
+
+def enqueue_update(
+    season: str, trigger: str, force: bool = False, full: bool = False, debounce: bool = True
+) -> Tuple[Job, bool]:
+    params = {key: True for key, value in (("force", force), ("full", full)) if value}
+    if not debounce:
+        params["debounce"] = False
+    return enqueue("update_scores", season, trigger, params)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def requeue_stale(now=None) -> int:
+    """Return jobs stuck in "running" by a dead worker to the queue."""
+    now = now or timezone.now()
+    cutoff = now - STALE_AFTER
+    requeued = 0
+    stale = Job.objects.filter(status="running").filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    for job in stale:
+        requeued += _fail(job, f"Worker {job.worker or '?'} stopped responding", now)
+    return requeued
+
+
+def claim(worker: str) -> Optional[Job]:
+    """Claim the next due job, or None when nothing is due."""
+    now = timezone.now()
+    candidates = Job.objects.filter(status="pending", run_after__lte=now).order_by("run_after", "id")
+    for job_id in candidates.values_list("id", flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status="pending").update(
+            status="running", worker=worker, started_at=now, heartbeat_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def touch(job: Job) -> bool:
+    """Record a heartbeat; False when the job is no longer ours to run."""
+    return bool(
+        Job.objects.filter(id=job.id, status="running", worker=job.worker).update(heartbeat_at=timezone.now())
+    )
+
+
+def heartbeat(job: Job):
+    """Touch the job every HEARTBEAT_INTERVAL from a thread while the block runs."""
+
+    def beat() -> bool:
+        if touch(job):
+            return True
+        logger.warning(f"Job {job} was taken from worker {job.worker}")
+        return False
+
+    return periodic(HEARTBEAT_INTERVAL.total_seconds(), beat, f"heartbeat job {job.id}")
+
+
+def run_job(job: Job) -> Job:
+    """Run a claimed job and record its outcome."""
+    try:
+        with heartbeat(job):
+            result = HANDLERS[job.kind](job)
+    except Exception as e:
+        logger.exception(f"Job {job} failed")
+        _fail(job, error_summary(e), timezone.now())
+    else:
+        job.status = "done"
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "result", "error", "finished_at"])
+    return job
+
+
+def error_summary(error: Exception) -> str:
+    """One line naming the exception, without paths or a traceback."""
+    lines = f"{type(error).__name__}: {error}".splitlines()
+    return lines[0] if lines else type(error).__name__
+
+
+def _fail(job: Job, error: str, now) -> int:
+    """Schedule a retry with backoff, or mark the job failed for good."""
+    job.error = error
+    if job.attempts < job.max_attempts:
+        job.status = "pending"
+        job.run_after = now + BACKOFF_BASE * (2 ** max(job.attempts - 1, 0))
+        try:
+            with transaction.atomic():
+                job.save(update_fields=["status", "run_after", "error"])
+            return 1
+        except IntegrityError:
+            # An identical job was queued meanwhile; it will do the retry
+            job.error += "; superseded by a newer pending job"
+    job.status = "failed"
+    job.finished_at = now
+    job.save(update_fields=["status", "error", "finished_at"])
+    return 0
+
+
+def purge_finished(now=None) -> int:
+    """Delete done and failed jobs that finished more than KEEP_FINISHED ago."""
+    now = now or timezone.now()
+    deleted, _ = Job.objects.filter(status__in=["done", "failed"], finished_at__lt=now - KEEP_FINISHED).delete()
+    return deleted
+
+
+def work(
+    worker: Optional[str] = None,
+    once: bool = False,
+    poll_interval: float = 5.0,
+    max_jobs: Optional[int] = None,
+) -> int:
+    """
+    Run jobs until stopped.
+
+    Args:
+        worker: Name recorded on claimed jobs (default host:pid)
+        once: Exit when no job is due instead of polling
+        poll_interval: Seconds to sleep when the queue is empty
+        max_jobs: Exit after running this many jobs
+
+    Returns:
+        Number of jobs run
+    """
+    worker = worker or worker_id()
+    done = 0
+    purged_at = None
+    while max_jobs is None or done < max_jobs:
+        if purged_at is None or time.monotonic() - purged_at >= PURGE_INTERVAL.total_seconds():
+            purge_finished()
+            purged_at = time.monotonic()
+        requeue_stale()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        logger.info(f"Running job {job} (attempt {job.attempts}/{job.max_attempts})")
+        run_job(job)
+        done += 1
+    return done
+
+
+def job_payload(job: Job) -> Dict:
+    """Job state as served by the job status endpoint."""
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "season": job.season,
+        "trigger": job.trigger,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at,
+        "run_after": job.run_after,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at,
+        "result": job.result,
+        # Rows written before errors were summarised may hold a traceback
+        "error": job.error.splitlines()[0] if job.error else "",
+    }
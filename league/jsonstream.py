@@ -0,0 +1,163 @@
+"""
+Incremental extraction of selected top-level keys from a streamed JSON object.
+
+Used for bootstrap-static, where we need two small arrays ("teams" and
+"events") out of a multi-megabyte document. Wanted values are decoded with
+json.loads once their text has been buffered; every other value is scanned
+for its end and discarded without building Python objects, so memory stays
+bounded by the largest wanted value plus one chunk.
+"""
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+
+_WHITESPACE = " \t\r\n"
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[,}\]\s]")
+_KEY = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+
+class _Reader:
+    """Text buffer over an iterable of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+
+    def fill(self) -> None:
+        """Append the next chunk to the buffer; raise at end of input."""
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buf += text
+                return
+        raise ValueError("Unexpected end of JSON input")
+
+    def discard(self) -> None:
+        """Drop everything before the current position."""
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.discard()
+            self.fill()
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def read_key(self) -> str:
+        if self.peek() != '"':
+            raise ValueError(f"Expected object key at offset {self.pos}")
+        while True:
+            m = _KEY.match(self.buf, self.pos)
+            if m:
+                self.pos = m.end()
+                return json.loads(m.group())
+            self.fill()
+
+    def scan_value(self, keep: bool) -> Optional[str]:
+        """
+        Advance past one JSON value starting at the current position.
+
+        Returns:
+            The value's text when keep is set, otherwise None
+        """
+        self.peek()
+        start = self.pos
+        first = self.buf[start]
+
+        if first not in '[{"':
+            while True:
+                m = _SCALAR_END.search(self.buf, self.pos)
+                if m:
+                    self.pos = m.start()
+                    return self.buf[start:self.pos] if keep else None
+                self.pos = len(self.buf)
+                if not keep:
+                    self.discard()
+                    start = 0
+                self.fill()
+
+        depth = 0
+        in_string = False
+        while True:
+            pattern = _STRING_SPECIAL if in_string else _STRUCTURAL
+            m = pattern.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+            else:
+                char = m.group()
+                if char == "\\":
+                    if m.end() >= len(self.buf):
+                        # escape split across chunks: rescan it with more data
+                        self.pos = m.start()
+                        m = None
+                    else:
+                        self.pos = m.end() + 1
+                        continue
+                elif char == '"':
+                    in_string = not in_string
+                    self.pos = m.end()
+                    if not in_string and depth == 0:
+                        return self.buf[start:self.pos] if keep else None
+                    continue
+                else:
+                    depth += 1 if char in "[{" else -1
+                    self.pos = m.end()
+                    if depth == 0:
+                        return self.buf[start:self.pos] if keep else None
+                    continue
+            if not keep:
+                self.discard()
+                start = 0
+            self.fill()
+
+
+def iter_object_items(chunks: Iterable[bytes], keys: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, value) for the wanted top-level keys of a streamed JSON object.
+
+    Stops reading as soon as every wanted key has been seen, so the rest of
+    the document is never downloaded.
+
+    Args:
+        chunks: Byte chunks of a JSON document whose root is an object
+        keys: Top-level keys to decode
+    """
+    reader = _Reader(chunks)
+    remaining = set(keys)
+    reader.expect("{")
+    while remaining:
+        char = reader.peek()
+        if char == "}":
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        key = reader.read_key()
+        reader.expect(":")
+        if key in remaining:
+            remaining.discard(key)
+            yield key, json.loads(reader.scan_value(keep=True))
+        else:
+            reader.scan_value(keep=False)
+        reader.discard()
+
+
+def extract_keys(chunks: Iterable[bytes], keys: Iterable[str]) -> Dict[str, Any]:
+    """Collect iter_object_items into a dict."""
+    return dict(iter_object_items(chunks, keys))
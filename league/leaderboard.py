@@ -0,0 +1,284 @@
+"""
+Materialized leaderboard for the current standings endpoint.
+
+The ranks ScoreCurrentView serves (correct-based and deviation-based, for the
+current and previous gameweek, per player_type filter) are computed once per
+update run and stored in LeaderboardEntry. Ranking itself runs in the
+database as RANK() window expressions, which ScoreListView reuses.
+
+The rank progression of every player across the season is likewise built
+once per update into a RankMatrix row. Both are also stored rendered and
+compressed (RenderedPayload), so the common requests skip serialization.
+
+Both copy player names and types, so they are also rebuilt when those change
+without any score moving: after a prediction import (PredictionImporter.write)
+and, through a build_leaderboard job, after a Player is saved or deleted.
+"""
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import Rank
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import DEFAULT_SEASON, bump_data_version
+from .compression import store_payloads
+from .models import Gameweek, LeaderboardEntry, Player, RankMatrix, Score, SiteState
+from .renderers import dumps
+
+
+SCOPES = ("all", "normal", "pundit")
+
+BATCH_SIZE = 5000
+
+# correct-based: most correct first, then smallest deviation
+ORDER_CORRECT = (F("score_correct").desc(), F("score_deviation").asc())
+# deviation-based: smallest deviation first, then most correct
+ORDER_DEVIATION = (F("score_deviation").asc(), F("score_correct").desc())
+
+
+def rank_correct(partition_by: Sequence = ()) -> Window:
+    """Competition rank ("1224") by (score_correct desc, score_deviation asc)."""
+    return Window(Rank(), partition_by=list(partition_by) or None, order_by=list(ORDER_CORRECT))
+
+
+def rank_deviation(partition_by: Sequence = ()) -> Window:
+    """Competition rank ("1224") by (score_deviation asc, score_correct desc)."""
+    return Window(Rank(), partition_by=list(partition_by) or None, order_by=list(ORDER_DEVIATION))
+
+
+def leaderboard_gameweeks() -> Tuple[Optional[Gameweek], Optional[Gameweek]]:
+    """
+    Pick the gameweek shown on the leaderboard and the one it is compared with.
+
+    The current gameweek is the latest finished+checked one, else is_current;
+    the previous one is the latest finished+checked gameweek before it.
+    """
+    gw = (
+        Gameweek.objects.filter(finished=True, data_checked=True).order_by("-id").first()
+        or Gameweek.objects.filter(is_current=True).order_by("-id").first()
+    )
+    prev_gw = None
+    if gw:
+        prev_gw = (
+            Gameweek.objects.filter(id__lt=gw.id, finished=True, data_checked=True)
+            .order_by("-id")
+            .first()
+        )
+    return gw, prev_gw
+
+
+def ranked_scores(gw: Optional[Gameweek]) -> List[Dict]:
+    """
+    Score rows for a gameweek with league-wide and per-player_type ranks.
+
+    Each row carries all_correct/all_deviation (over every player) and
+    type_correct/type_deviation (within the player's player_type).
+    """
+    if not gw:
+        return []
+    by_type = [F("player__player_type")]
+    return list(
+        Score.objects.filter(gameweek=gw.id)
+        .annotate(
+            all_correct=rank_correct(),
+            all_deviation=rank_deviation(),
+            type_correct=rank_correct(by_type),
+            type_deviation=rank_deviation(by_type),
+        )
+        .order_by("id")
+        .values(
+            "player_id",
+            "player__username",
+            "player__player_type",
+            "player__custom_team_name",
+            "gameweek",
+            "score_correct",
+            "score_deviation",
+            "all_correct",
+            "all_deviation",
+            "type_correct",
+            "type_deviation",
+        )
+    )
+
+
+def build_leaderboard() -> int:
+    """
+    Rebuild every LeaderboardEntry for the current leaderboard gameweek.
+
+    Should run inside the caller's transaction so readers never see a
+    half-built table.
+
+    Returns:
+        Number of entries written
+    """
+    gw, prev_gw = leaderboard_gameweeks()
+    current = ranked_scores(gw)
+    previous = {row["player_id"]: row for row in ranked_scores(prev_gw)}
+
+    entries = []
+    for scope in SCOPES:
+        prefix = "all" if scope == "all" else "type"
+        rows = [r for r in current if scope == "all" or r["player__player_type"] == scope]
+        for position, row in enumerate(rows, start=1):
+            last = previous.get(row["player_id"], {})
+            entries.append(
+                LeaderboardEntry(
+                    scope=scope,
+                    position=position,
+                    player_id=row["player_id"],
+                    username=row["player__username"],
+                    player_type=row["player__player_type"],
+                    team_name=row["player__custom_team_name"] or row["player__username"],
+                    gameweek=row["gameweek"],
+                    score_correct=row["score_correct"],
+                    score_deviation=row["score_deviation"],
+                    curr_rank_correct_based=row[f"{prefix}_correct"],
+                    curr_rank_deviation_based=row[f"{prefix}_deviation"],
+                    last_rank_correct_based=last.get(f"{prefix}_correct"),
+                    last_rank_deviation_based=last.get(f"{prefix}_deviation"),
+                )
+            )
+
+    LeaderboardEntry.objects.all().delete()
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    SiteState.objects.update_or_create(id=1, defaults={"leaderboard_gameweek": gw.id if gw else None})
+    store_leaderboard_payloads(entries, gw.id if gw else None)
+    return len(entries)
+
+
+def leaderboard_key(scope: str) -> str:
+    return f"standings_current:{scope}"
+
+
+def store_leaderboard_payloads(entries: List[LeaderboardEntry], gameweek: Optional[int]) -> None:
+    """Render the ScoreCurrentView response of every scope from the new entries."""
+    bodies = {}
+    for scope in SCOPES:
+        results = [
+            {field: getattr(entry, field) for field in LEADERBOARD_FIELDS} for entry in entries if entry.scope == scope
+        ]
+        bodies[leaderboard_key(scope)] = dumps({"gameweek": gameweek, "results": results})
+    store_payloads(bodies)
+
+
+LEADERBOARD_FIELDS = (
+    "username",
+    "player_type",
+    "team_name",
+    "gameweek",
+    "score_correct",
+    "score_deviation",
+    "curr_rank_correct_based",
+    "curr_rank_deviation_based",
+    "last_rank_correct_based",
+    "last_rank_deviation_based",
+)
+
+
+def leaderboard_scope(player_type: Optional[str]) -> str:
+    return player_type if player_type in {"normal", "pundit"} else "all"
+
+
+def leaderboard_queryset(player_type: Optional[str]) -> QuerySet:
+    """Stored leaderboard rows for a player_type filter, in position order."""
+    scope = leaderboard_scope(player_type)
+    return LeaderboardEntry.objects.filter(scope=scope).order_by("position").values(*LEADERBOARD_FIELDS)
+
+
+def leaderboard_gameweek() -> Optional[int]:
+    state = SiteState.objects.filter(id=1).first()
+    return state.leaderboard_gameweek if state else None
+
+
+def leaderboard_payload(player_type: Optional[str]) -> Dict:
+    """Serve the stored leaderboard in the ScoreCurrentView response shape."""
+    return {"gameweek": leaderboard_gameweek(), "results": list(leaderboard_queryset(player_type))}
+
+
+def rank_matrix(season: str) -> Dict:
+    """
+    League-wide ranks of every player at every scored gameweek of a season.
+
+    Columnar: players are listed once (in id order) and each gameweek holds
+    one rank per player in that order, 0 where the player has no score.
+    Ranks are competition ranks over all players, as in ScoreListView.
+
+    Returns:
+        {"season", "gameweeks", "usernames", "player_types",
+         "rank_correct": [[rank per player] per gameweek], "rank_deviation": ...}
+    """
+    by_gameweek = [F("gameweek")]
+    rows = (
+        Score.objects.filter(season=season)
+        .annotate(correct=rank_correct(by_gameweek), deviation=rank_deviation(by_gameweek))
+        .values_list("player_id", "gameweek", "correct", "deviation")
+    )
+    data = np.fromiter(chain.from_iterable(rows.iterator(chunk_size=10000)), dtype=np.int64).reshape(-1, 4)
+    player_ids, player_pos = np.unique(data[:, 0], return_inverse=True)
+    gameweeks, gameweek_pos = np.unique(data[:, 1], return_inverse=True)
+    correct = np.zeros((len(gameweeks), len(player_ids)), dtype=np.int64)
+    deviation = np.zeros_like(correct)
+    correct[gameweek_pos, player_pos] = data[:, 2]
+    deviation[gameweek_pos, player_pos] = data[:, 3]
+
+    # One pass over Player beats chunked id__in lookups for a whole league
+    wanted = set(player_ids.tolist())
+    players = {
+        player_id: (username, player_type)
+        for player_id, username, player_type in Player.objects.order_by("id").values_list(
+            "id", "username", "player_type"
+        )
+        if player_id in wanted
+    }
+    return {
+        "season": season,
+        "gameweeks": gameweeks.tolist(),
+        "usernames": [players[player_id][0] for player_id in player_ids.tolist()],
+        "player_types": [players[player_id][1] for player_id in player_ids.tolist()],
+        "rank_correct": correct.tolist(),
+        "rank_deviation": deviation.tolist(),
+    }
+
+
+def rank_matrix_key(season: str) -> str:
+    return f"rank_matrix:{season}"
+
+
+def build_rank_matrix(season: str) -> RankMatrix:
+    """Recompute and store the season's rank matrix, rendered for serving."""
+    matrix = rank_matrix(season)
+    body = dumps(matrix)
+    with transaction.atomic():
+        store_payloads({rank_matrix_key(season): body})
+        stored, _ = RankMatrix.objects.update_or_create(
+            season=season,
+            defaults={"players": len(matrix["usernames"]), "gameweeks": len(matrix["gameweeks"])},
+        )
+    return stored
+
+
+def rebuild_standings(season: str) -> int:
+    """
+    Rebuild the leaderboard and the season's rank matrix from stored scores.
+
+    Returns:
+        Number of leaderboard entries written
+    """
+    with transaction.atomic():
+        count = build_leaderboard()
+        build_rank_matrix(season)
+        bump_data_version()
+    return count
+
+
+@receiver([post_save, post_delete], sender=Player, dispatch_uid="league_player_leaderboard")
+def _on_player_change(sender, **kwargs) -> None:
+    # Off the request: one queued job covers any number of edits
+    from .jobs import enqueue
+
+    transaction.on_commit(lambda: enqueue("build_leaderboard", DEFAULT_SEASON, trigger="player"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from league.benchmarks.bootstrap import run_all
+
+
+class Command(BaseCommand):
+    help = "Compare memory and latency of streaming bootstrap-static extraction with json.loads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "payloads",
+            nargs="*",
+            help="Recorded bootstrap-static JSON files (default: a synthetic payload)",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for result in run_all(options["payloads"], repeat=options["repeat"]):
+            self.stdout.write(f"{result['payload']} ({result['payload_bytes'] / 1024:.0f} KiB)")
+            for name in ("full", "streaming"):
+                stats = result[name]
+                line = f"  {name:<10} {stats['seconds'] * 1000:8.1f} ms  peak {stats['peak_bytes'] / 1024:8.0f} KiB"
+                if "bytes_read" in stats:
+                    line += f"  read {stats['bytes_read'] / 1024:.0f} KiB"
+                self.stdout.write(line)
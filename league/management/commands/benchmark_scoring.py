@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from league.benchmarks.scoring import run
+
+
+class Command(BaseCommand):
+    help = "Benchmark the vectorized scoring engine against the original per-prediction loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--players",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000, 1_000_000],
+            help="League sizes to benchmark (default: 10000 100000 1000000)",
+        )
+        parser.add_argument(
+            "--skip-reference",
+            action="store_true",
+            help="Only time the vectorized engine",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'players':>10} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+        for players in options["players"]:
+            result = run(players, include_reference=not options["skip_reference"], seed=options["seed"])
+            reference = f"{result['reference_s']:.3f}" if "reference_s" in result else "-"
+            speedup = f"{result['speedup']:.1f}x" if "speedup" in result else "-"
+            self.stdout.write(
+                f"{players:>10} {reference:>10} {result['vectorized_s']:>15.3f} {speedup:>8}"
+            )
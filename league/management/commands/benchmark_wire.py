@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from league.benchmarks.wire import run
+
+
+class Command(BaseCommand):
+    help = "Measure bytes on the wire and CPU per request of /api/standings/current/ before and after compression"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--players",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000, 100_000],
+            help="League sizes to benchmark (default: 1000 10000 100000)",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", type=str, help="Write JSON results to this file")
+
+    def handle(self, *args, **options):
+        results = []
+        self.stdout.write(f"{'players':>8} {'mode':<16} {'encoding':<9} {'bytes':>11} {'cpu ms':>9} {'wall ms':>9}")
+        for players in options["players"]:
+            for row in run(players, repeat=options["repeat"], seed=options["seed"]):
+                results.append(row)
+                self.stdout.write(
+                    f"{players:>8} {row['mode']:<16} {row['encoding']:<9} {row['bytes']:>11,} "
+                    f"{row['cpu_ms']:>9.2f} {row['wall_ms']:>9.2f}"
+                )
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
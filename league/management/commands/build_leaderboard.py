@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from league.leaderboard import rebuild_standings
+from league.models import RankMatrix
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized leaderboard and rank matrix from stored scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--season",
+            type=str,
+            default="2025/26",
+            help="Season of the rank matrix (default: 2025/26)"
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_standings(options["season"])
+        matrix = RankMatrix.objects.get(season=options["season"])
+        self.stdout.write(self.style.SUCCESS(f"Built {count} leaderboard entries"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Built rank matrix: {matrix.players} players x {matrix.gameweeks} gameweeks")
+        )
@@ -1,5 +1,15 @@
 from django.core.management.base import BaseCommand
-from league.scheduler import start_scheduler, stop_scheduler, is_scheduler_running
+from django.utils import timezone
+
+from league.models import SiteState
+from league.scheduler import (
+    current_leader,
+    plan_next_run,
+    scheduler,
+    start_scheduler,
+    stop_scheduler,
+    is_scheduler_running,
+)
 
 
 class Command(BaseCommand):
@@ -8,13 +18,20 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             "action",
-            choices=["start", "stop", "status"],
-            help="Action to perform: start, stop, or check status"
+            choices=["start", "stop", "status", "run"],
+            help="Action to perform: start, stop, check status, or run in the foreground"
+        )
+        parser.add_argument(
+            "--season",
+            type=str,
+            default="2025/26",
+            help="Season to update scores for (default: 2025/26)"
         )
 
     def handle(self, *args, **options):
         action = options["action"]
-        
+        scheduler.season = options["season"]
+
         if action == "start":
             if is_scheduler_running():
                 self.stdout.write(
@@ -25,7 +42,7 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS("Scheduler started successfully")
                 )
-                
+
         elif action == "stop":
             if not is_scheduler_running():
                 self.stdout.write(
@@ -36,7 +53,15 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS("Scheduler stopped successfully")
                 )
-                
+
+        elif action == "run":
+            self.stdout.write(self.style.SUCCESS("Scheduler running (Ctrl+C to stop)"))
+            start_scheduler()
+            try:
+                scheduler.thread.join()
+            except KeyboardInterrupt:
+                stop_scheduler()
+
         elif action == "status":
             if is_scheduler_running():
                 self.stdout.write(
@@ -46,3 +71,43 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.ERROR("Scheduler is STOPPED")
                 )
+            self.show_leader()
+            self.show_plan()
+
+    def show_leader(self):
+        # "RUNNING"/"STOPPED" above is this process only; the lease is deployment-wide
+        leader = current_leader()
+        if leader is None:
+            self.stdout.write(self.style.WARNING("Leader: none (no process holds the scheduler lease)"))
+            return
+        now = timezone.now()
+        self.stdout.write(
+            f"Leader: {leader.holder} since {leader.acquired_at:%Y-%m-%d %H:%M} UTC, "
+            f"last heartbeat {int((now - leader.heartbeat_at).total_seconds())}s ago, "
+            f"lease expires {self.describe_delay(leader.expires_at - now)}"
+        )
+
+    def show_plan(self):
+        now = timezone.now()
+        state = SiteState.objects.filter(id=1).first()
+        if state and state.scheduler_next_run:
+            self.stdout.write(
+                f"Planned next run: {state.scheduler_next_run:%Y-%m-%d %H:%M} UTC "
+                f"({self.describe_delay(state.scheduler_next_run - now)}) "
+                f"[{state.scheduler_phase}] {state.scheduler_reason}"
+            )
+        plan = plan_next_run(now)
+        self.stdout.write(
+            f"Plan from current data: {plan.phase}, next run {plan.next_run:%Y-%m-%d %H:%M} UTC "
+            f"({self.describe_delay(plan.next_run - now)}) - {plan.reason}"
+        )
+
+    @staticmethod
+    def describe_delay(delta) -> str:
+        seconds = int(delta.total_seconds())
+        if seconds <= 0:
+            return "due"
+        if seconds < 60:
+            return f"in {seconds}s"
+        hours, rest = divmod(seconds, 3600)
+        return f"in {hours}h {rest // 60:02d}m"
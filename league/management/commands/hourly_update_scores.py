@@ -1,13 +1,10 @@
-import json
-import requests
 from django.core.management.base import BaseCommand
-from django.test import RequestFactory
-from django.contrib.auth.models import AnonymousUser
-from league.views import UpdateScoresView
+
+from league.jobs import claim, enqueue_update, run_job, worker_id
 
 
 class Command(BaseCommand):
-    help = "Hourly job to update scores by calling UpdateScoresView"
+    help = "Hourly job to queue a score update and, unless --enqueue-only, run it"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -19,7 +16,12 @@ class Command(BaseCommand):
         parser.add_argument(
             "--dry-run",
             action="store_true",
-            help="Don't actually make the request, just show what would be done"
+            help="Don't actually queue the job, just show what would be done"
+        )
+        parser.add_argument(
+            "--enqueue-only",
+            action="store_true",
+            help="Only queue the job and leave it to a running run_worker"
         )
 
     def handle(self, *args, **options):
@@ -27,50 +29,36 @@ class Command(BaseCommand):
         dry_run = options["dry_run"]
 
         self.stdout.write(f"Starting hourly score update for season: {season}")
-        
+
         if dry_run:
-            self.stdout.write("DRY RUN - No actual requests will be made")
+            self.stdout.write("DRY RUN - No job will be queued")
             return
 
-        try:
-            # Create a mock request to call the UpdateScoresView
-            factory = RequestFactory()
-            request = factory.post(
-                "/update_scores/",
-                data={"season": season},
-                content_type="application/json"
-            )
-            request.user = AnonymousUser()
-
-            # Call the view
-            view = UpdateScoresView.as_view()
-            response = view(request)
+        job, created = enqueue_update(season, trigger="hourly")
+        if not created:
+            self.stdout.write(self.style.WARNING(f"Job {job.id} for this update is already pending"))
+        if options["enqueue_only"]:
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.id}"))
+            return
 
-            if response.status_code == 200:
-                response_data = response.data
-                if response_data.get("status") == "skipped_recent_run":
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"Update skipped - last run was within 24 hours"
-                        )
-                    )
-                else:
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Successfully updated scores for season: {season}"
-                        )
-                    )
-            else:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f"Update failed with status code: {response.status_code}"
-                    )
-                )
+        # Drain whatever is due, this job included, with no separate worker running
+        worker = worker_id()
+        while True:
+            claimed = claim(worker)
+            if claimed is None:
+                break
+            self.report(run_job(claimed))
 
-        except Exception as e:
+    def report(self, job):
+        if job.status == "pending":
             self.stdout.write(
-                self.style.ERROR(
-                    f"Error during hourly update: {str(e)}"
-                )
+                self.style.ERROR(f"Job {job.id} failed, retry {job.attempts}/{job.max_attempts} at {job.run_after:%H:%M} UTC")
             )
-            raise
+        elif job.status == "failed":
+            self.stdout.write(self.style.ERROR(f"Job {job.id} failed: {job.error.splitlines()[-1] if job.error else ''}"))
+        elif job.result.get("status") == "skipped_recent_run":
+            self.stdout.write(self.style.WARNING("Update skipped - last run was within 24 hours"))
+        elif job.result.get("status") == "skipped_unchanged":
+            self.stdout.write(self.style.WARNING("Update skipped - FPL data unchanged since last run"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Job {job.id}: updated scores for season {job.season}"))
@@ -1,30 +1,25 @@
-import requests
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from league.models import Gameweek
-
-
-FPL_BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+from league.fpl import SnapshotNotFound, fetch_bootstrap
+from league.ingest import upsert_gameweeks
 
 
 class Command(BaseCommand):
     help = "Fetch events from FPL and upsert Gameweek rows"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Use the latest stored FPL snapshot instead of fetching",
+        )
+
     def handle(self, *args, **options):
-        resp = requests.get(FPL_BOOTSTRAP_URL, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-        count = 0
-        for ev in data.get("events", []):
-            Gameweek.objects.update_or_create(
-                id=ev["id"],
-                defaults={
-                    "is_current": ev.get("is_current", False),
-                    "finished": ev.get("finished", False),
-                    "data_checked": ev.get("data_checked", False),
-                },
-            )
-            count += 1
+        try:
+            data = fetch_bootstrap(offline=options["offline"]).data
+        except SnapshotNotFound as e:
+            raise CommandError(str(e))
+        with transaction.atomic():
+            count = len(upsert_gameweeks(data.get("events", [])))
         self.stdout.write(self.style.SUCCESS(f"Upserted {count} gameweeks"))
-
-
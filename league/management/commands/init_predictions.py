@@ -1,11 +1,8 @@
-import csv
 from pathlib import Path
-from typing import Dict, List
 
 from django.core.management.base import BaseCommand, CommandError
 
-from league.models import Player, Prediction, Team
-from league.utils import get_teams_lookup
+from league.importers import ImportResult, PredictionImporter, iter_csv_rows, load_team_ids, write_error_report
 
 
 class Command(BaseCommand):
@@ -17,72 +14,70 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("csv_path", type=str)
         parser.add_argument("--season", type=str, default="2025/26")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows written per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Validate byte-range shards of the file on this many processes (default: 1)",
+        )
+        parser.add_argument(
+            "--error-report",
+            type=str,
+            help="Write rejected rows to this CSV file (line,user_name,error)",
+        )
 
     def handle(self, *args, **options):
         csv_path = Path(options["csv_path"]).expanduser()
         if not csv_path.exists():
             raise CommandError(f"CSV not found: {csv_path}")
 
-        season: str = options["season"]
-        created_players = 0
-        created_predictions = 0
+        team_ids = load_team_ids()
+        if len(team_ids) < 20:
+            raise CommandError("Expected at least 20 teams in DB. Run init_teams first.")
 
-        with csv_path.open(newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if not row or row[0].startswith("#"):
-                    continue
-                if len(row) < 23:
-                    raise CommandError("Row does not have 23 columns (got %d): %s" % (len(row), row))
-                username = row[0].strip()
-                team_name = row[1].strip()  # This is the user's prediction alias/entry name
-                predicted_ranks = [int(x.strip()) for x in row[2:22]]
-                player_type = row[22].strip() or "normal"
+        verbosity = options["verbosity"]
 
-                # Ensure player
-                player, created = Player.objects.get_or_create(
-                    username=username,
-                    defaults={"player_type": player_type, "custom_team_name": team_name},
+        def progress(result: ImportResult):
+            if verbosity >= 2:
+                self.stdout.write(
+                    f"  {result.rows} rows read, {result.predictions} predictions written, "
+                    f"{len(result.errors)} errors"
                 )
-                if created:
-                    created_players += 1
-                else:
-                    # Update custom_team_name if it changed
-                    if player.custom_team_name != team_name:
-                        player.custom_team_name = team_name
-                        player.save(update_fields=["custom_team_name"])
 
-                # The CSV contains: predicted_ranks[i] = team ID that should be in position (i+1)
-                # So predicted_ranks[0] = team ID for 1st place, predicted_ranks[1] = team ID for 2nd place, etc.
-                teams_lookup = get_teams_lookup()
-                if len(teams_lookup) < 20:
-                    raise CommandError("Expected at least 20 teams in DB. Run init_teams first.")
-                
-                # Create predictions for each rank position
-                for rank_position in range(1, 21):  # Ranks 1-20
-                    team_id = predicted_ranks[rank_position - 1]  # Get team ID for this rank position
-                    
-                    if team_id == 0:
-                        self.stdout.write(f"Warning: User {username} has no prediction for rank {rank_position}")
-                        continue
-                        
-                    if team_id not in teams_lookup:
-                        raise CommandError(f"Team ID {team_id} not found in database for user {username}")
-                    
-                    team = Team.objects.get(id=team_id)
-                    
-                    Prediction.objects.update_or_create(
-                        season=season,
-                        player=player,
-                        team=team,
-                        defaults={"predicted_rank": rank_position},
-                    )
-                    created_predictions += 1
+        importer = PredictionImporter(
+            season=options["season"],
+            team_ids=team_ids,
+            chunk_size=options["chunk_size"],
+            progress=progress,
+        )
+        if options["workers"] > 1:
+            result = importer.run_sharded(csv_path, workers=options["workers"])
+        else:
+            result = importer.run(iter_csv_rows(csv_path))
+        self.report(result, options)
+
+    def report(self, result: ImportResult, options):
+        if options["verbosity"] >= 1:
+            for warning in result.warnings:
+                self.stdout.write(f"Warning: {warning}")
+        for error in sorted(result.errors, key=lambda e: e.line):
+            self.stderr.write(f"Line {error.line} ({error.username or '-'}): {error.message}")
+        if options["error_report"] and result.errors:
+            path = write_error_report(result.errors, Path(options["error_report"]))
+            self.stderr.write(f"Wrote {len(result.errors)} errors to {path}")
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Processed predictions. players={created_players}, predictions={created_predictions}"
+                f"Processed predictions. players={result.players_created}, predictions={result.predictions}"
             )
         )
-
-
+        if result.errors:
+            self.stdout.write(
+                self.style.WARNING(f"Skipped {len(result.errors)} of {result.rows} rows with errors")
+            )
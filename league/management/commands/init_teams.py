@@ -1,30 +1,25 @@
-import requests
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
-from league.models import Team
-
-
-FPL_BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+from league.fpl import SnapshotNotFound, fetch_bootstrap
+from league.ingest import upsert_teams
 
 
 class Command(BaseCommand):
     help = "Fetch teams from FPL and upsert into DB"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Use the latest stored FPL snapshot instead of fetching",
+        )
+
     def handle(self, *args, **options):
-        resp = requests.get(FPL_BOOTSTRAP_URL, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-        count = 0
-        for t in data.get("teams", []):
-            Team.objects.update_or_create(
-                id=t["id"],
-                defaults={
-                    "name": t.get("name", ""),
-                    "short_name": t.get("short_name", ""),
-                    "code": t.get("code", 0),
-                },
-            )
-            count += 1
+        try:
+            data = fetch_bootstrap(offline=options["offline"]).data
+        except SnapshotNotFound as e:
+            raise CommandError(str(e))
+        with transaction.atomic():
+            count = upsert_teams(data.get("teams", []))
         self.stdout.write(self.style.SUCCESS(f"Upserted {count} teams"))
-
-
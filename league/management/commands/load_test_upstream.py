@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from league.benchmarks.upstream import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync and async PL standings views against a local stand-in "
+        "FPL server with a fixed upstream latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=40)
+        parser.add_argument("--latency", type=float, default=0.5, help="Upstream delay per request in seconds")
+        parser.add_argument("--workers", type=int, default=4, help="Threads serving the sync view")
+
+    def handle(self, *args, **options):
+        result = run_load_test(options["requests"], latency=options["latency"], workers=options["workers"])
+        self.stdout.write(
+            f"{options['requests']} requests, upstream latency {result['latency']:.2f}s, "
+            f"{result['upstream_requests']} upstream calls"
+        )
+        for row in result["results"]:
+            self.stdout.write(
+                f"  {row['mode']:<22} {row['seconds']:7.2f}s  concurrency {row['concurrency']:5.1f}  "
+                f"errors {row['errors']}"
+            )
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from league.ingest import QueryReport
+from league.replay import replay_season
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every ActualStanding and Score row for a season from a directory "
+        "of archived bootstrap snapshots (one per gameweek)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive_dir", type=str)
+        parser.add_argument("--season", type=str, default="2025/26")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Scoring processes (default: CPU count, 1 to score in-process)",
+        )
+        parser.add_argument(
+            "--report-queries",
+            action="store_true",
+            help="Print the number of SQL statements issued by each stage",
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options["archive_dir"]).expanduser()
+        if not directory.is_dir():
+            raise CommandError(f"Archive directory not found: {directory}")
+
+        report = QueryReport() if options["report_queries"] else None
+        counts = replay_season(directory, options["season"], workers=options["workers"], report=report)
+        if not counts["gameweeks"]:
+            raise CommandError(f"No gameweek snapshots found in {directory}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {counts['gameweeks']} gameweeks: "
+                f"standings={counts['standings']}, scores={counts['scores']}"
+            )
+        )
+        if report is not None:
+            self.stdout.write(report.format())
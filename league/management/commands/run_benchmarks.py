@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from league.benchmarks.generator import GAMEWEEKS
+from league.benchmarks.suite import GROUPS, compare, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the ingestion, scoring, ranking and API benchmarks against a generated "
+        "league in a throwaway test database and emit JSON results"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=1000)
+        parser.add_argument("--gameweeks", type=int, default=3, help="Gameweeks to score before timing")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            choices=GROUPS,
+            default=list(GROUPS),
+            help="Benchmark groups to run (ingestion always runs to load data)",
+        )
+        parser.add_argument("--output", type=str, help="Write JSON results to this file")
+        parser.add_argument("--compare", type=str, help="Baseline JSON results to compare against")
+
+    def handle(self, *args, **options):
+        # Scoring and API benchmarks move on to the gameweek after the last scored one
+        if not 1 <= options["gameweeks"] < GAMEWEEKS:
+            raise CommandError(f"--gameweeks must be between 1 and {GAMEWEEKS - 1}")
+
+        result = run_suite(
+            options["players"],
+            gameweeks=options["gameweeks"],
+            repeat=options["repeat"],
+            seed=options["seed"],
+            groups=options["only"],
+        )
+        payload = json.dumps(result, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(payload, encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+        if options["compare"]:
+            baseline = json.loads(Path(options["compare"]).read_text(encoding="utf-8"))
+            self.stdout.write(f"\n{'benchmark':<32} {'baseline':>10} {'current':>10} {'ratio':>7}")
+            for row in compare(baseline, result):
+                before = f"{row['baseline']:.4f}" if row["baseline"] is not None else "-"
+                ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+                self.stdout.write(f"{row['name']:<32} {before:>10} {row['current']:>10.4f} {ratio:>7}")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from league.jobs import work, worker_id
+
+
+class Command(BaseCommand):
+    help = "Run queued jobs (score updates triggered via /api/update_scores/)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when the queue is empty instead of polling"
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls of an empty queue (default: 5)"
+        )
+        parser.add_argument(
+            "--max-jobs",
+            type=int,
+            default=None,
+            help="Exit after running this many jobs"
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_id()
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} started (Ctrl+C to stop)"))
+        try:
+            done = work(
+                worker=worker,
+                once=options["once"],
+                poll_interval=options["poll_interval"],
+                max_jobs=options["max_jobs"],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} ran {done} job(s)"))
@@ -1,7 +1,8 @@
-from django.core.management.base import BaseCommand
-from django.test import RequestFactory
+from django.core.management.base import BaseCommand, CommandError
 
-from league.views import UpdateScoresView
+from league.fpl import SnapshotNotFound
+from league.ingest import QueryReport
+from league.pipeline import run_update
 
 
 class Command(BaseCommand):
@@ -9,11 +10,39 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--season", type=str, default="2025/26")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run even if the last run was recent or FPL data is unchanged",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute every player's score instead of only those affected by table changes",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Use the latest stored FPL snapshot instead of fetching",
+        )
+        parser.add_argument(
+            "--report-queries",
+            action="store_true",
+            help="Print the number of SQL statements issued by each stage",
+        )
 
     def handle(self, *args, **options):
-        rf = RequestFactory()
-        request = rf.post("/api/update_scores/", data={"season": options["season"]})
-        response = UpdateScoresView.as_view()(request)
-        self.stdout.write(self.style.SUCCESS(f"Status: {response.data}"))
-
-
+        report = QueryReport() if options["report_queries"] else None
+        try:
+            result = run_update(
+                options["season"],
+                force=options["force"],
+                full=options["full"],
+                offline=options["offline"],
+                report=report,
+            )
+        except SnapshotNotFound as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Status: {result}"))
+        if report is not None:
+            self.stdout.write(report.format())
@@ -0,0 +1,188 @@
+"""
+Process-local request metrics in Prometheus text format.
+
+MetricsMiddleware records, per request, the wall time, the number of SQL
+statements and the time spent in them, and the response size, labelled by
+the resolved URL pattern and method. Values go into in-memory histograms
+served at /api/metrics/.
+
+Each worker process keeps its own registry, so with several workers every
+scrape sees one process; Prometheus aggregates across scrapes by instance.
+Metrics are off unless METRICS_ENABLED is set; the middleware is then left
+out of the stack entirely. Route labels and timings describe the deployment,
+so only staff users and scrapers sending "Authorization: Bearer
+<METRICS_TOKEN>" may read them.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.crypto import constant_time_compare
+
+
+def metrics_enabled() -> bool:
+    return getattr(settings, "METRICS_ENABLED", False)
+
+
+def metrics_allowed(request) -> bool:
+    """Whether the request may read the metrics: a staff user or the scrape token."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    token = getattr(settings, "METRICS_TOKEN", "")
+    scheme, _, credentials = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and constant_time_compare(credentials.strip(), token)
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+REQUEST_DURATION = Histogram(
+    "league_request_duration_seconds", "Wall time spent handling the request", DURATION_BUCKETS
+)
+SQL_QUERIES = Histogram("league_request_sql_queries", "SQL statements run per request", QUERY_BUCKETS)
+SQL_DURATION = Histogram(
+    "league_request_sql_duration_seconds", "Time spent in SQL statements per request", DURATION_BUCKETS
+)
+RESPONSE_SIZE = Histogram("league_response_size_bytes", "Response body size", SIZE_BUCKETS)
+
+HISTOGRAMS = (REQUEST_DURATION, SQL_QUERIES, SQL_DURATION, RESPONSE_SIZE)
+
+
+def render_metrics() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+class _SQLTimer:
+    """execute_wrapper counting statements and the time spent in them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+def route_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match.route if match is not None else "<unresolved>"
+
+
+class MetricsMiddleware:
+    """
+    Record request timing, SQL and size metrics by URL pattern.
+
+    Runs natively in both sync and async stacks so async views keep their
+    event loop. In the async stack queries run on executor threads the
+    wrapper cannot see, so the SQL series are only recorded for sync views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = _SQLTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, elapsed: float, timer: Optional[_SQLTimer] = None) -> None:
+        labels = (("route", route_label(request)), ("method", request.method))
+        REQUEST_DURATION.observe(labels, elapsed)
+        if timer is not None:
+            SQL_QUERIES.observe(labels, timer.queries)
+            SQL_DURATION.observe(labels, timer.seconds)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0007_add_team_unique_constraint"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="prediction",
+            index=models.Index(
+                fields=["season", "team", "player", "predicted_rank"],
+                name="league_pred_season_9db1b1_idx",
+            ),
+        ),
+    ]
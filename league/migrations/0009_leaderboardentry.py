@@ -0,0 +1,82 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0008_prediction_team_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitestate",
+            name="leaderboard_gameweek",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("all", "All"),
+                            ("normal", "Normal"),
+                            ("pundit", "Pundit"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("username", models.CharField(max_length=100)),
+                ("player_type", models.CharField(max_length=10)),
+                ("team_name", models.CharField(max_length=100)),
+                ("gameweek", models.PositiveSmallIntegerField()),
+                ("score_correct", models.PositiveSmallIntegerField(default=0)),
+                ("score_deviation", models.PositiveIntegerField(default=0)),
+                (
+                    "curr_rank_correct_based",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "curr_rank_deviation_based",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "last_rank_correct_based",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "last_rank_deviation_based",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "player",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="league.player"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["scope", "position"],
+                        name="league_lead_scope_14a2ca_idx",
+                    )
+                ],
+                "unique_together": {("scope", "player")},
+            },
+        ),
+    ]
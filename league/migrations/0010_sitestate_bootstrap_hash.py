@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0009_leaderboardentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitestate",
+            name="bootstrap_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0010_sitestate_bootstrap_hash"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="score",
+            index=models.Index(
+                fields=[
+                    "season",
+                    "gameweek",
+                    "-score_correct",
+                    "score_deviation",
+                    "player",
+                ],
+                name="league_scor_season_0666d0_idx",
+            ),
+        ),
+    ]
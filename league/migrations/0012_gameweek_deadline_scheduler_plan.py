@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0011_score_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gameweek",
+            name="deadline_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="sitestate",
+            name="scheduler_next_run",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="sitestate",
+            name="scheduler_phase",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="sitestate",
+            name="scheduler_reason",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0012_gameweek_deadline_scheduler_plan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SchedulerLease",
+            fields=[
+                (
+                    "id",
+                    models.PositiveSmallIntegerField(
+                        default=1, primary_key=True, serialize=False
+                    ),
+                ),
+                ("holder", models.CharField(blank=True, default="", max_length=100)),
+                ("acquired_at", models.DateTimeField(blank=True, null=True)),
+                ("heartbeat_at", models.DateTimeField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Scheduler Lease",
+                "verbose_name_plural": "Scheduler Lease",
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0014_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RankMatrix",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("season", models.CharField(max_length=9, unique=True)),
+                ("players", models.PositiveIntegerField(default=0)),
+                ("gameweeks", models.PositiveSmallIntegerField(default=0)),
+                ("payload", models.BinaryField()),
+                ("built_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
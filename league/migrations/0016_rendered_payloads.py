@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-17 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0015_rankmatrix"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RenderedPayload",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100, unique=True)),
+                (
+                    "content_type",
+                    models.CharField(default="application/json", max_length=100),
+                ),
+                ("body", models.BinaryField()),
+                ("gzip", models.BinaryField()),
+                ("br", models.BinaryField(null=True)),
+                ("built_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name="rankmatrix",
+            name="payload",
+        ),
+    ]
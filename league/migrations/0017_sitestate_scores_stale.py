@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0016_rendered_payloads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitestate",
+            name="scores_stale",
+            field=models.BooleanField(default=False),
+        ),
+    ]
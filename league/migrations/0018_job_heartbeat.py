@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-17 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("league", "0017_sitestate_scores_stale"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
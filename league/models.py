@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 class Team(models.Model):
@@ -20,6 +21,7 @@ class Gameweek(models.Model):
     is_current = models.BooleanField(default=False)
     finished = models.BooleanField(default=False)
     data_checked = models.BooleanField(default=False)
+    deadline_time = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["id"]
@@ -57,6 +59,8 @@ class Prediction(models.Model):
         ]
         indexes = [
             models.Index(fields=["season", "player"]),
+            # team -> (player, predicted_rank) lookup for delta scoring
+            models.Index(fields=["season", "team", "player", "predicted_rank"]),
         ]
 
     def clean(self):
@@ -100,15 +104,149 @@ class Score(models.Model):
         unique_together = ("season", "gameweek", "player")
         indexes = [
             models.Index(fields=["season", "gameweek"]),
+            # Keyset pagination order for ScoreListView (league/pagination.py)
+            models.Index(fields=["season", "gameweek", "-score_correct", "score_deviation", "player"]),
         ]
 
 
+class LeaderboardEntry(models.Model):
+    """Precomputed row of the current standings, one per player and scope.
+
+    Filled by the update pipeline so ScoreCurrentView can serve a single read.
+    """
+
+    SCOPES = (
+        ("all", "All"),
+        ("normal", "Normal"),
+        ("pundit", "Pundit"),
+    )
+
+    scope = models.CharField(max_length=10, choices=SCOPES)
+    position = models.PositiveIntegerField()
+    player = models.ForeignKey(Player, on_delete=models.CASCADE)
+    username = models.CharField(max_length=100)
+    player_type = models.CharField(max_length=10)
+    team_name = models.CharField(max_length=100)
+    gameweek = models.PositiveSmallIntegerField()
+    score_correct = models.PositiveSmallIntegerField(default=0)
+    score_deviation = models.PositiveIntegerField(default=0)
+    curr_rank_correct_based = models.PositiveIntegerField(null=True, blank=True)
+    curr_rank_deviation_based = models.PositiveIntegerField(null=True, blank=True)
+    last_rank_correct_based = models.PositiveIntegerField(null=True, blank=True)
+    last_rank_deviation_based = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("scope", "player")
+        indexes = [
+            models.Index(fields=["scope", "position"]),
+        ]
+
+
+class RankMatrix(models.Model):
+    """League-wide ranks of every player at every gameweek of a season.
+
+    Built by the update pipeline (league/leaderboard.py); the rendered matrix
+    is stored as the RenderedPayload keyed by rank_matrix_key(season).
+    """
+
+    season = models.CharField(max_length=9, unique=True)
+    players = models.PositiveIntegerField(default=0)
+    gameweeks = models.PositiveSmallIntegerField(default=0)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Rank matrix {self.season}"
+
+
+class RenderedPayload(models.Model):
+    """A response body rendered ahead of time, with its compressed encodings.
+
+    Written when the data it is derived from is rebuilt (league/compression.py).
+    """
+
+    key = models.CharField(max_length=100, unique=True)
+    content_type = models.CharField(max_length=100, default="application/json")
+    body = models.BinaryField()
+    gzip = models.BinaryField()
+    br = models.BinaryField(null=True)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.key
+
+
 class SiteState(models.Model):
     id = models.PositiveSmallIntegerField(primary_key=True, default=1)
     last_computed = models.DateTimeField(null=True, blank=True)
+    leaderboard_gameweek = models.PositiveSmallIntegerField(null=True, blank=True)
+    bootstrap_hash = models.CharField(max_length=64, blank=True, default="")
+    # Predictions were imported since the last compute; the next one is full
+    scores_stale = models.BooleanField(default=False)
+    # Plan of the adaptive scheduler (league/scheduler.py), for status checks
+    scheduler_phase = models.CharField(max_length=16, blank=True, default="")
+    scheduler_next_run = models.DateTimeField(null=True, blank=True)
+    scheduler_reason = models.CharField(max_length=200, blank=True, default="")
 
     class Meta:
         verbose_name = "Site State"
         verbose_name_plural = "Site State"
 
+
+class Job(models.Model):
+    """A queued background task, run by the run_worker command (league/jobs.py)."""
+
+    STATUSES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    kind = models.CharField(max_length=32)
+    season = models.CharField(max_length=9, default="2025/26")
+    trigger = models.CharField(max_length=16)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker while the job runs; a stale one means it died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+        constraints = [
+            # At most one identical job waiting at a time
+            models.UniqueConstraint(
+                fields=["kind", "season", "trigger"],
+                condition=models.Q(status="pending"),
+                name="league_job_unique_pending",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.season} ({self.trigger}) #{self.pk}"
+
+
+class SchedulerLease(models.Model):
+    """Singleton lease naming the one process allowed to run the scheduler loop."""
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    holder = models.CharField(max_length=100, blank=True, default="")
+    acquired_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Scheduler Lease"
+        verbose_name_plural = "Scheduler Lease"
+
 # Create your models here.
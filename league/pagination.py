@@ -0,0 +1,124 @@
+"""
+Keyset (cursor) pagination for ranked Score listings.
+
+Pages are read in (score_correct desc, score_deviation asc, player_id asc)
+order, which the Score index on (season, gameweek, -score_correct,
+score_deviation, player) serves directly once season and gameweek are
+filtered. The key is only unique within one gameweek, so ScoreListView
+refuses a cursor without both filters. The cursor holds the last row's
+key, so each page is an index seek to the cursor's score_correct group plus
+LIMIT, with no COUNT(*) or OFFSET: page N costs about the same as page 1.
+
+The cursor also carries the last row's position and correct-based rank,
+which lets rank_correct_based continue across pages without a window over
+the whole gameweek. rank_deviation_based is not available in this order
+and is returned as null.
+"""
+import base64
+import binascii
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Score
+
+
+KEYSET_ORDER = ("-score_correct", "score_deviation", "player_id")
+
+
+class Cursor(NamedTuple):
+    score_correct: int
+    score_deviation: int
+    player_id: int
+    position: int
+    rank: int
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    raw = ".".join(str(value) for value in cursor)
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(encoded: str) -> Cursor:
+    """
+    Raises:
+        ValueError: the cursor is not one produced by encode_cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+        values = [int(value) for value in raw.split(".")]
+        return Cursor(*values)
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise ValueError(f"Invalid cursor {encoded!r}")
+
+
+def after(cursor: Cursor) -> Q:
+    """Rows strictly after the cursor in KEYSET_ORDER."""
+    # The leading score_correct bound lets the index seek past earlier
+    # score groups instead of filtering them row by row.
+    return Q(score_correct__lte=cursor.score_correct) & (
+        Q(score_correct__lt=cursor.score_correct)
+        | Q(score_correct=cursor.score_correct, score_deviation__gt=cursor.score_deviation)
+        | Q(
+            score_correct=cursor.score_correct,
+            score_deviation=cursor.score_deviation,
+            player_id__gt=cursor.player_id,
+        )
+    )
+
+
+class ScoreKeysetPagination(BasePagination):
+    """
+    Cursor pagination over Score rows keyed on the ranking tuple.
+
+    Start with ?cursor= (empty) and follow the "next" links.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE", 25)
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> List[Score]:
+        self.request = request
+        encoded = request.query_params.get(self.cursor_query_param)
+        cursor = None
+        if encoded:
+            try:
+                cursor = decode_cursor(encoded)
+            except ValueError:
+                raise NotFound("Invalid cursor")
+            queryset = queryset.filter(after(cursor))
+
+        rows = list(queryset.order_by(*KEYSET_ORDER)[: self.page_size + 1])
+        has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        position, rank = (cursor.position, cursor.rank) if cursor else (0, 0)
+        last_key = (cursor.score_correct, cursor.score_deviation) if cursor else None
+        for score in rows:
+            position += 1
+            key = (score.score_correct, score.score_deviation)
+            if key != last_key:
+                rank, last_key = position, key
+            score.rank_correct_based = rank
+            score.rank_deviation_based = None
+
+        self.next_cursor: Optional[Cursor] = None
+        if has_next:
+            last = rows[-1]
+            self.next_cursor = Cursor(last.score_correct, last.score_deviation, last.player_id, position, rank)
+        return rows
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_cursor))
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
@@ -0,0 +1,185 @@
+"""
+Score update pipeline: fetch FPL data, upsert it and recompute scores.
+
+Shared by UpdateScoresView and the management commands so every entry point
+writes through the same bulk ingestion path.
+"""
+from datetime import timedelta
+from typing import Dict, NamedTuple, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_data_version
+from .fpl import Snapshot, fetch_bootstrap
+from .ingest import QueryReport, maybe_stage, upsert_gameweeks, upsert_standings, upsert_teams
+from .leaderboard import build_leaderboard, build_rank_matrix, leaderboard_gameweeks
+from .models import ActualStanding, Gameweek, RankMatrix, SiteState
+from .scoring import update_scores_for_gameweek
+
+
+DEBOUNCE = timedelta(hours=24)
+
+GAMEWEEK_FIELDS = ("id", "is_current", "finished", "data_checked", "deadline_time")
+
+
+class IngestResult(NamedTuple):
+    gameweek: Optional[Gameweek]
+    # "full", "delta", "unchanged" or "none"
+    mode: str
+    # Whether anything served by the API was written or rebuilt
+    changed: bool
+
+
+def ingest_bootstrap(
+    data: Dict, season: str, full: bool = False, report: Optional[QueryReport] = None
+) -> IngestResult:
+    """
+    Upsert teams, gameweeks and actual standings, then update scores.
+
+    The new standings are diffed against the stored snapshot for the same
+    gameweek so unchanged tables skip scoring and small changes only touch the
+    affected players. Runs in a single transaction; the season's rank matrix
+    is rebuilt after it commits. The data version is only bumped when
+    something changed, so an idle poll keeps every cached response and ETag.
+
+    Returns:
+        IngestResult of the scored gameweek, the scoring mode and whether
+        anything changed
+    """
+    teams = data.get("teams", [])
+    mode = "none"
+    with transaction.atomic():
+        # One run at a time: a delta diffed against standings another run is
+        # about to replace would apply the same rank change twice. Backends
+        # with row locks queue on SiteState; SQLite refuses the later writer.
+        SiteState.objects.select_for_update().get_or_create(id=1)
+        with maybe_stage(report, "teams"):
+            changed = bool(upsert_teams(teams))
+
+        with maybe_stage(report, "gameweeks"):
+            stored = set(Gameweek.objects.values_list(*GAMEWEEK_FIELDS))
+            gameweeks = upsert_gameweeks(data.get("events", []))
+            # Flags feed Score.completed and the leaderboard's gameweek
+            changed |= not {tuple(getattr(gw, f) for f in GAMEWEEK_FIELDS) for gw in gameweeks} <= stored
+            current_gw = next((gw for gw in gameweeks if gw.is_current), None)
+            if current_gw is None:
+                # best effort choose latest finished or id 1
+                current_gw = Gameweek.objects.order_by("-is_current", "id").first()
+
+        with maybe_stage(report, "standings"):
+            gameweek = current_gw.id if current_gw else 1
+            previous = {
+                team_id: (rank, points)
+                for team_id, rank, points in ActualStanding.objects.filter(
+                    season=season, gameweek=gameweek
+                ).values_list("team_id", "actual_rank", "points")
+            }
+            snapshot = {t["id"]: (t.get("position", 0) or 0, t.get("points", 0) or 0) for t in teams}
+            if snapshot != previous:
+                upsert_standings(season, gameweek, teams)
+                changed = True
+
+        if current_gw:
+            with maybe_stage(report, "scores"):
+                # Stored scores predate an import (see PredictionImporter.write)
+                if SiteState.objects.filter(id=1, scores_stale=True).update(scores_stale=False):
+                    full = True
+                mode = update_scores_for_gameweek(
+                    current_gw,
+                    season,
+                    {team_id: rank for team_id, (rank, _) in previous.items()},
+                    {team_id: rank for team_id, (rank, _) in snapshot.items()},
+                    full=full,
+                )
+                changed |= mode != "unchanged"
+
+        gw, _ = leaderboard_gameweeks()
+        state = SiteState.objects.filter(id=1).first()
+        if mode != "unchanged" or state is None or state.leaderboard_gameweek != (gw.id if gw else None):
+            with maybe_stage(report, "leaderboard"):
+                build_leaderboard()
+            changed = True
+        if mode != "unchanged" or not RankMatrix.objects.filter(season=season).exists():
+            # Reads every Score of the season: build it once the new scores
+            # are committed instead of holding the write lock meanwhile
+            transaction.on_commit(lambda: _build_rank_matrix(season, report))
+            changed = True
+        if changed:
+            bump_data_version()
+    return IngestResult(current_gw, mode, changed)
+
+
+def _build_rank_matrix(season: str, report: Optional[QueryReport]) -> None:
+    with maybe_stage(report, "rank_matrix"):
+        build_rank_matrix(season)
+
+
+def run_update(
+    season: str,
+    force: bool = False,
+    full: bool = False,
+    offline: bool = False,
+    report: Optional[QueryReport] = None,
+    debounce: bool = True,
+) -> Dict:
+    """
+    Run a full update unless one completed within the debounce window.
+
+    The fetched bootstrap snapshot is compared with the one last ingested and
+    the run is skipped when upstream content has not changed.
+
+    Args:
+        season: Season to score
+        force: Ignore the debounce window and the unchanged-content check
+        full: Recompute every player's score instead of a delta
+        offline: Use the latest stored snapshot instead of fetching
+        report: Optional QueryReport collecting per-stage statement counts
+        debounce: Apply the debounce window; the scheduler polls on its own
+            cadence and relies on the unchanged-content check alone
+
+    Returns:
+        Status payload as returned by UpdateScoresView
+    """
+    # Debounce using SiteState.last_computed timestamp
+    state, _ = SiteState.objects.get_or_create(id=1)
+    if debounce and debounced(state, force):
+        return {"status": "skipped_recent_run"}
+
+    snapshot = fetch_bootstrap(offline=offline)
+    return apply_snapshot(snapshot, state, season, force=force, full=full, report=report)
+
+
+def debounced(state: SiteState, force: bool = False) -> bool:
+    return not force and bool(state.last_computed) and (timezone.now() - state.last_computed) < DEBOUNCE
+
+
+def apply_snapshot(
+    snapshot: Snapshot,
+    state: SiteState,
+    season: str,
+    force: bool = False,
+    full: bool = False,
+    report: Optional[QueryReport] = None,
+) -> Dict:
+    """
+    Ingest a fetched snapshot unless it matches the last one ingested.
+
+    An unchanged snapshot is still ingested while imported predictions are
+    waiting to be scored. last_computed, which is part of every ETag, only
+    moves when the ingest changed something.
+    """
+    if not (force or full or state.scores_stale) and snapshot.hash == state.bootstrap_hash:
+        return {"status": "skipped_unchanged", "season": season}
+
+    result = ingest_bootstrap(snapshot.data, season, full=full, report=report)
+
+    state.bootstrap_hash = snapshot.hash
+    update_fields = ["bootstrap_hash"]
+    if result.changed:
+        # mark debounce
+        state.last_computed = timezone.now()
+        update_fields.append("last_computed")
+    state.save(update_fields=update_fields)
+
+    return {"status": "ok", "season": season, "scoring": result.mode}
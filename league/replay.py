@@ -0,0 +1,161 @@
+"""
+Rebuild a season's standings and scores from archived bootstrap snapshots.
+
+Each archived file holds the "teams" table (and "events") as they were during
+one gameweek, either as a stored snapshot (<hash>.json.gz, see league/fpl.py)
+or as a raw bootstrap-static .json document. The prediction matrix is loaded
+once and split into player shards scored across a process pool; all rows are
+then written in one transaction.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_data_version
+from .fpl import Snapshot, content_hash, extract_sections, load_snapshot_file
+from .ingest import QueryReport, maybe_stage, upsert_gameweeks, upsert_score_rows, upsert_standings, upsert_teams
+from .leaderboard import build_leaderboard, build_rank_matrix
+from .models import SiteState
+from .scoring import build_actual_vector, compute_scores, load_prediction_matrix
+from .workers import init_worker
+
+
+SHARDS_PER_WORKER = 4
+
+
+def load_archive_file(path: Path) -> Snapshot:
+    """Read a stored .json.gz snapshot or a raw bootstrap-static .json file."""
+    if path.name.endswith(".json.gz"):
+        return load_snapshot_file(path)
+    with path.open(encoding="utf-8") as f:
+        sections = extract_sections(json.load(f))
+    return Snapshot(hash=content_hash(sections), fetched_at="", **sections)
+
+
+def snapshot_gameweek(snapshot: Snapshot) -> Optional[int]:
+    """The gameweek a snapshot was taken in (the event flagged is_current)."""
+    return next((ev["id"] for ev in snapshot.events if ev.get("is_current")), None)
+
+
+def load_archive(directory: Path) -> Dict[int, Snapshot]:
+    """
+    Map gameweek -> snapshot for every archived file in a directory.
+
+    When several files cover the same gameweek the latest one wins, ordered by
+    fetched_at and then file modification time.
+    """
+    found: List[Tuple[Tuple[str, float], int, Snapshot]] = []
+    for path in sorted(directory.iterdir()):
+        if not (path.name.endswith(".json.gz") or path.suffix == ".json"):
+            continue
+        snapshot = load_archive_file(path)
+        gameweek = snapshot_gameweek(snapshot)
+        if gameweek is not None:
+            found.append(((snapshot.fetched_at, path.stat().st_mtime), gameweek, snapshot))
+
+    archive: Dict[int, Snapshot] = {}
+    for _, gameweek, snapshot in sorted(found, key=lambda item: item[0]):
+        archive[gameweek] = snapshot
+    return archive
+
+
+def score_shard(ranks: np.ndarray, actual: np.ndarray, present: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score one shard of players against every gameweek.
+
+    Args:
+        ranks: players x teams predicted ranks
+        actual: gameweeks x teams actual ranks
+        present: gameweeks x teams mask of teams with a standing
+
+    Returns:
+        (correct, deviation, scored), each gameweeks x players
+    """
+    results = [compute_scores(ranks, actual[i], present[i]) for i in range(len(actual))]
+    return tuple(np.stack([r[k] for r in results]) for k in range(3))
+
+
+def replay_season(
+    directory: Path,
+    season: str,
+    workers: Optional[int] = None,
+    report: Optional[QueryReport] = None,
+) -> Dict[str, int]:
+    """
+    Rebuild ActualStanding and Score rows for every archived gameweek.
+
+    Args:
+        directory: Directory of archived snapshots, one per gameweek
+        season: Season to rebuild
+        workers: Scoring processes (default: CPU count; 1 scores in-process)
+        report: Optional QueryReport collecting per-stage statement counts
+
+    Returns:
+        Counts of gameweeks, standings and scores written
+    """
+    archive = load_archive(directory)
+    if not archive:
+        return {"gameweeks": 0, "standings": 0, "scores": 0}
+    gameweeks = sorted(archive)
+    latest = archive[gameweeks[-1]]
+    events = {ev["id"]: ev for ev in latest.events}
+
+    with maybe_stage(report, "load"):
+        matrix = load_prediction_matrix(season)
+
+    actual = np.zeros((len(gameweeks), len(matrix.team_ids)), dtype=np.int16)
+    present = np.zeros((len(gameweeks), len(matrix.team_ids)), dtype=bool)
+    for i, gameweek in enumerate(gameweeks):
+        ranks = {t["id"]: t.get("position", 0) or 0 for t in archive[gameweek].teams}
+        actual[i], present[i] = build_actual_vector(matrix.team_ids, ranks)
+
+    workers = workers or os.cpu_count() or 1
+    shards = np.array_split(np.arange(len(matrix.player_ids)), max(1, workers * SHARDS_PER_WORKER))
+    shards = [shard for shard in shards if len(shard)]
+    with maybe_stage(report, "score"):
+        if workers == 1 or len(shards) <= 1:
+            results = [score_shard(matrix.ranks[shard], actual, present) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                results = list(pool.map(
+                    score_shard,
+                    [matrix.ranks[shard] for shard in shards],
+                    [actual] * len(shards),
+                    [present] * len(shards),
+                ))
+
+    def score_rows():
+        for shard, (correct, deviation, scored) in zip(shards, results):
+            player_ids = matrix.player_ids[shard]
+            for i, gameweek in enumerate(gameweeks):
+                event = events.get(gameweek, {})
+                completed = bool(event.get("finished") and event.get("data_checked"))
+                mask = scored[i]
+                for player_id, c, d in zip(
+                    player_ids[mask].tolist(), correct[i][mask].tolist(), deviation[i][mask].tolist()
+                ):
+                    yield season, gameweek, player_id, c, d, completed
+
+    counts = {"gameweeks": len(gameweeks), "standings": 0, "scores": 0}
+    with transaction.atomic():
+        with maybe_stage(report, "teams"):
+            upsert_teams(latest.teams)
+            upsert_gameweeks(latest.events)
+        with maybe_stage(report, "standings"):
+            for gameweek in gameweeks:
+                counts["standings"] += upsert_standings(season, gameweek, archive[gameweek].teams)
+        with maybe_stage(report, "scores"):
+            counts["scores"] = upsert_score_rows(score_rows())
+        with maybe_stage(report, "leaderboard"):
+            build_leaderboard()
+        with maybe_stage(report, "rank_matrix"):
+            build_rank_matrix(season)
+        SiteState.objects.update_or_create(id=1, defaults={"last_computed": timezone.now()})
+        bump_data_version()
+    return counts
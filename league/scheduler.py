@@ -1,56 +1,266 @@
 """
 Scheduler module for running periodic tasks within Django
+
+The polling cadence follows the FPL calendar instead of a fixed interval:
+
+- live: the current gameweek's deadline has passed and it is not finished,
+  so tables move with every match; poll every LIVE_INTERVAL
+- settling: the gameweek finished but FPL has not checked its data yet;
+  poll every SETTLING_INTERVAL until data_checked
+- idle: between gameweeks; sleep until shortly after the next deadline,
+  waking at least every IDLE_MAX_INTERVAL in case the calendar moved
+- unknown: no gameweek data stored yet; poll every FALLBACK_INTERVAL
+
+Each poll queues an update_scores job (trigger "scheduler", league/jobs.py)
+and runs the due jobs in-process, so it goes through the same queue as
+run_worker and hourly_update_scores. The job fetches bootstrap-static and
+recomputes only when its content hash changed (run_update's unchanged-content
+check), bypassing the 24h debounce that throttles the public trigger. The
+plan is stored on SiteState so `control_scheduler status` can show it from
+any process.
+
+Any number of processes may start the scheduler; only the holder of the
+SchedulerLease row runs the loop. The leader renews the lease every
+HEARTBEAT_INTERVAL, while sleeping and from a thread while a poll runs, and
+followers take over once it has gone LEASE_TTL without a heartbeat.
 """
+import os
+import socket
 import threading
-import time
 import logging
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from django.core.management import call_command
-from django.conf import settings
+from typing import Optional
+
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import enqueue_update, work
+from .models import Gameweek, SchedulerLease, SiteState
+from .workers import periodic
 
 logger = logging.getLogger(__name__)
 
 
+LIVE_INTERVAL = timedelta(minutes=10)
+SETTLING_INTERVAL = timedelta(minutes=30)
+IDLE_MAX_INTERVAL = timedelta(hours=24)
+FALLBACK_INTERVAL = timedelta(hours=1)
+# First poll after a deadline, once is_current has moved on upstream
+DEADLINE_GRACE = timedelta(minutes=5)
+
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+# A leader silent for this long is presumed dead
+LEASE_TTL = timedelta(minutes=3)
+
+
+@dataclass
+class SchedulePlan:
+    phase: str
+    next_run: datetime
+    reason: str
+    gameweek: Optional[int] = None
+
+
+def plan_next_run(now: Optional[datetime] = None) -> SchedulePlan:
+    """Derive when to poll next from the stored Gameweek state."""
+    now = now or timezone.now()
+    current = Gameweek.objects.filter(is_current=True).order_by("-id").first()
+    upcoming = Gameweek.objects.filter(deadline_time__gt=now).order_by("deadline_time").first()
+
+    if current is None and upcoming is None:
+        return SchedulePlan("unknown", now + FALLBACK_INTERVAL, "no gameweek data stored")
+    if current and not current.finished:
+        return SchedulePlan("live", now + LIVE_INTERVAL, f"GW {current.id} in progress", current.id)
+    if current and not current.data_checked:
+        return SchedulePlan(
+            "settling", now + SETTLING_INTERVAL, f"GW {current.id} finished, awaiting data check", current.id
+        )
+    if upcoming:
+        next_run = min(upcoming.deadline_time + DEADLINE_GRACE, now + IDLE_MAX_INTERVAL)
+        return SchedulePlan(
+            "idle",
+            next_run,
+            f"between gameweeks, GW {upcoming.id} deadline {upcoming.deadline_time:%Y-%m-%d %H:%M} UTC",
+            upcoming.id,
+        )
+    return SchedulePlan("idle", now + IDLE_MAX_INTERVAL, "no upcoming deadline")
+
+
+def save_plan(plan: SchedulePlan) -> None:
+    SiteState.objects.update_or_create(
+        id=1,
+        defaults={
+            "scheduler_phase": plan.phase,
+            "scheduler_next_run": plan.next_run,
+            "scheduler_reason": plan.reason,
+        },
+    )
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    """
+    DB-backed leadership lease on the SchedulerLease singleton row.
+
+    Every transition is one conditional UPDATE, so concurrent processes
+    cannot both believe they hold it.
+    """
+
+    def __init__(self, holder: str, ttl: timedelta = LEASE_TTL):
+        self.holder = holder
+        self.ttl = ttl
+
+    def acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if already held."""
+        now = timezone.now()
+        try:
+            SchedulerLease.objects.get_or_create(id=1)
+        except IntegrityError:
+            pass  # another process created it first
+        held = SchedulerLease.objects.filter(id=1, holder=self.holder).update(
+            heartbeat_at=now, expires_at=now + self.ttl
+        )
+        if held:
+            return True
+        return bool(
+            SchedulerLease.objects.filter(id=1)
+            .filter(Q(holder="") | Q(expires_at__isnull=True) | Q(expires_at__lt=now))
+            .update(holder=self.holder, acquired_at=now, heartbeat_at=now, expires_at=now + self.ttl)
+        )
+
+    def renew(self) -> bool:
+        """Heartbeat; False when the lease was lost to another process."""
+        now = timezone.now()
+        return bool(
+            SchedulerLease.objects.filter(id=1, holder=self.holder).update(
+                heartbeat_at=now, expires_at=now + self.ttl
+            )
+        )
+
+    def release(self) -> None:
+        SchedulerLease.objects.filter(id=1, holder=self.holder).update(holder="", expires_at=None)
+
+
+def current_leader() -> Optional[SchedulerLease]:
+    """The lease row if some process holds an unexpired lease."""
+    lease = SchedulerLease.objects.filter(id=1).first()
+    if lease and lease.holder and lease.expires_at and lease.expires_at >= timezone.now():
+        return lease
+    return None
+
+
 class ScoreUpdateScheduler:
-    """Scheduler for running score updates every hour"""
-    
-    def __init__(self, interval_hours=1):
-        self.interval_hours = interval_hours
+    """Scheduler polling FPL on a gameweek-aware cadence"""
+
+    def __init__(self, season: str = "2025/26"):
+        self.season = season
         self.running = False
         self.thread = None
-        
+        self.is_leader = False
+        self.lease = Lease(process_id())
+        self._wake = threading.Event()
+
     def start(self):
         """Start the scheduler in a background thread"""
         if self.running:
             logger.warning("Scheduler is already running")
             return
-            
+
         self.running = True
+        self._wake.clear()
         self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.thread.start()
-        logger.info(f"Score update scheduler started (every {self.interval_hours} hour(s))")
-        
+        logger.info(f"Score update scheduler started for season {self.season}")
+
     def stop(self):
         """Stop the scheduler"""
         self.running = False
+        self._wake.set()
         if self.thread:
             self.thread.join()
         logger.info("Score update scheduler stopped")
-        
+
+    def run_once(self) -> SchedulePlan:
+        """Poll upstream once and return the plan for the next poll."""
+        try:
+            # A full recompute can outlast LEASE_TTL: keep the lease while it runs
+            with self._renewing():
+                job, _ = enqueue_update(self.season, trigger="scheduler", debounce=False)
+                # A running run_worker may claim the job first; either way it runs once
+                work(worker=self.lease.holder, once=True)
+            job.refresh_from_db()
+            logger.info(f"Scheduled score update: job {job.id} {job.status} {(job.result or {}).get('status', '')}")
+        except Exception as e:
+            logger.error(f"Error in scheduled score update: {e}")
+        plan = plan_next_run()
+        save_plan(plan)
+        return plan
+
+    def _renewing(self):
+        """Renew the lease every HEARTBEAT_INTERVAL from a thread while the block runs."""
+
+        def beat() -> bool:
+            if self.lease.renew():
+                return True
+            # The update still finishes; its row lock keeps it from
+            # overlapping the new leader's, and the loop then follows
+            logger.warning(f"Scheduler leadership lost by {self.lease.holder} during an update")
+            self.is_leader = False
+            return False
+
+        return periodic(HEARTBEAT_INTERVAL.total_seconds(), beat, "scheduler lease heartbeat")
+
     def _run_scheduler(self):
         """Main scheduler loop"""
+        try:
+            while self.running:
+                if not self._lead():
+                    # Follower: check again for a dead leader every heartbeat
+                    self._wake.wait(HEARTBEAT_INTERVAL.total_seconds())
+                    continue
+                plan = self.run_once()
+                logger.info(f"Next score update at {plan.next_run:%Y-%m-%d %H:%M} ({plan.phase}: {plan.reason})")
+                self._wait_leading(plan.next_run)
+        finally:
+            if self.is_leader:
+                self.lease.release()
+                self.is_leader = False
+
+    def _lead(self) -> bool:
+        was_leader = self.is_leader
+        try:
+            self.is_leader = self.lease.acquire()
+        except Exception as e:
+            logger.error(f"Could not reach the scheduler lease: {e}")
+            self.is_leader = False
+        if self.is_leader and not was_leader:
+            logger.info(f"Scheduler leadership acquired by {self.lease.holder}")
+        return self.is_leader
+
+    def _wait_leading(self, until: datetime) -> None:
+        """Sleep until the next run, heartbeating; return early on stop or lost lease."""
         while self.running:
+            remaining = (until - timezone.now()).total_seconds()
+            if remaining <= 0:
+                return
+            # Waking early on stop()
+            if self._wake.wait(min(remaining, HEARTBEAT_INTERVAL.total_seconds())):
+                return
             try:
-                # Run the hourly update command
-                logger.info("Running scheduled score update...")
-                call_command('hourly_update_scores', verbosity=0)
-                logger.info("Scheduled score update completed")
-                
+                renewed = self.lease.renew()
             except Exception as e:
-                logger.error(f"Error in scheduled score update: {e}")
-                
-            # Wait for the next interval
-            time.sleep(self.interval_hours * 3600)  # Convert hours to seconds
+                logger.error(f"Scheduler lease heartbeat failed: {e}")
+                renewed = False
+            if not renewed:
+                logger.warning(f"Scheduler leadership lost by {self.lease.holder}")
+                self.is_leader = False
+                return
 
 
 # Global scheduler instance
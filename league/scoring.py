@@ -0,0 +1,324 @@
+"""
+Vectorized scoring engine for the prediction league.
+
+Predictions are loaded as a players x teams matrix of predicted ranks and the
+actual table as a rank vector in the same team order, so the per-player
+aggregates reduce to a handful of array operations instead of a Python loop
+over every Prediction row.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ingest import IN_CHUNK_SIZE, upsert_scores
+from .models import ActualStanding, Gameweek, Prediction, Score, SiteState
+from .teams import team_registry
+
+
+# Predicted ranks are >= 1 (see Prediction.clean), so 0 marks a missing cell.
+MISSING_RANK = 0
+
+
+@dataclass
+class PredictionMatrix:
+    """Predictions for a season laid out as one row per player."""
+
+    player_ids: np.ndarray
+    team_ids: np.ndarray
+    ranks: np.ndarray
+
+    @property
+    def team_index(self) -> Dict[int, int]:
+        return {int(team_id): col for col, team_id in enumerate(self.team_ids)}
+
+
+def build_prediction_matrix(
+    rows: Union[np.ndarray, Iterable[Tuple[int, int, int]]],
+    team_ids: Optional[Sequence[int]] = None,
+) -> PredictionMatrix:
+    """
+    Build a PredictionMatrix from (player_id, team_id, predicted_rank) tuples.
+
+    Args:
+        rows: Iterable of prediction tuples (or an n x 3 array), in any order
+        team_ids: Known team ids in ascending order (e.g. the team registry's),
+            used as the columns instead of collecting them from the rows
+
+    Returns:
+        PredictionMatrix with rows sorted by player id and columns by team id
+    """
+    if not isinstance(rows, np.ndarray):
+        rows = np.array(list(rows), dtype=np.int64)
+    data = rows.reshape(-1, 3)
+    player_ids, player_pos = _dense_index(data[:, 0])
+    team_ids, team_pos = _team_columns(data[:, 1], team_ids)
+    ranks = np.full((len(player_ids), len(team_ids)), MISSING_RANK, dtype=np.int16)
+    ranks[player_pos, team_pos] = data[:, 2]
+    return PredictionMatrix(player_ids=player_ids, team_ids=team_ids, ranks=ranks)
+
+
+def _dense_index(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map ids to 0..n-1 positions in ascending id order.
+
+    Equivalent to np.unique(ids, return_inverse=True) but avoids the sort for
+    the common inputs: rows already ordered by id, or a small id range.
+    """
+    if not len(ids):
+        return ids, ids
+    if np.all(ids[1:] >= ids[:-1]):
+        starts = np.concatenate(([True], ids[1:] != ids[:-1]))
+        return ids[starts], np.cumsum(starts) - 1
+    if ids.min() >= 0 and ids.max() < 4 * len(ids):
+        seen = np.bincount(ids)
+        unique = np.flatnonzero(seen)
+        lookup = np.zeros(len(seen), dtype=np.int64)
+        lookup[unique] = np.arange(len(unique))
+        return unique, lookup[ids]
+    return np.unique(ids, return_inverse=True)
+
+
+def _team_columns(ids: np.ndarray, known: Optional[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Column positions for team ids, against a known team list when given."""
+    if known is None or not len(ids) or not len(known):
+        return _dense_index(ids)
+    known = np.asarray(known, dtype=np.int64)
+    if ids.min() < 0 or ids.max() > known[-1]:
+        return _dense_index(ids)
+    lookup = np.full(known[-1] + 1, -1, dtype=np.int64)
+    lookup[known] = np.arange(len(known))
+    positions = lookup[ids]
+    if (positions < 0).any():
+        # A team the (possibly stale) list does not know about
+        return _dense_index(ids)
+    return known, positions
+
+
+def load_prediction_matrix(season: str) -> PredictionMatrix:
+    """Load every prediction for a season as a PredictionMatrix."""
+    rows = (
+        Prediction.objects.filter(season=season)
+        .order_by("player_id")
+        .values_list("player_id", "team_id", "predicted_rank")
+    )
+    return build_prediction_matrix(rows.iterator(chunk_size=10000), team_ids=team_registry().ids)
+
+
+def build_actual_vector(
+    team_ids: np.ndarray, actual_ranks: Dict[int, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Align actual ranks with the matrix columns.
+
+    Returns:
+        (ranks, present) where present flags the teams that have a standing
+    """
+    ranks = np.zeros(len(team_ids), dtype=np.int16)
+    present = np.zeros(len(team_ids), dtype=bool)
+    for col, team_id in enumerate(team_ids):
+        rank = actual_ranks.get(int(team_id))
+        if rank is not None:
+            ranks[col] = rank
+            present[col] = True
+    return ranks, present
+
+
+def compute_scores(
+    ranks: np.ndarray, actual: np.ndarray, present: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score every player against the actual table.
+
+    Args:
+        ranks: players x teams matrix of predicted ranks (0 = no prediction)
+        actual: actual rank per team column
+        present: mask of team columns that have an actual standing
+
+    Returns:
+        (score_correct, score_deviation, scored) per player, where scored flags
+        players with at least one prediction for a team in the table
+    """
+    valid = (ranks != MISSING_RANK) & present
+    correct = ((ranks == actual) & valid).sum(axis=1)
+    deviation = (np.abs(ranks - actual) * valid).sum(axis=1, dtype=np.int64)
+    return correct, deviation, valid.any(axis=1)
+
+
+def compute_scores_for_gameweek(current_gw: Gameweek, season: str) -> None:
+    """Compute and store Score rows for every player for one gameweek."""
+    matrix = load_prediction_matrix(season)
+    if not len(matrix.player_ids):
+        return
+
+    actual_ranks = dict(
+        ActualStanding.objects.filter(season=season, gameweek=current_gw.id).values_list(
+            "team_id", "actual_rank"
+        )
+    )
+    actual, present = build_actual_vector(matrix.team_ids, actual_ranks)
+    correct, deviation, scored = compute_scores(matrix.ranks, actual, present)
+
+    completed = current_gw.finished and current_gw.data_checked
+    upsert_scores([
+        Score(
+            season=season,
+            gameweek=current_gw.id,
+            player_id=player_id,
+            score_correct=score_correct,
+            score_deviation=score_deviation,
+            rank_correct=score_correct,
+            rank_deviation=score_deviation,
+            completed=completed,
+        )
+        for player_id, score_correct, score_deviation in zip(
+            matrix.player_ids[scored].tolist(),
+            correct[scored].tolist(),
+            deviation[scored].tolist(),
+        )
+    ])
+
+
+def changed_ranks(old_ranks: Dict[int, int], new_ranks: Dict[int, int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Diff two team -> rank snapshots.
+
+    Returns:
+        Mapping of team id to (old_rank, new_rank) for teams whose rank moved
+    """
+    return {
+        team_id: (old_ranks[team_id], rank)
+        for team_id, rank in new_ranks.items()
+        if team_id in old_ranks and old_ranks[team_id] != rank
+    }
+
+
+def compute_score_deltas(
+    player_ids: np.ndarray, predicted: np.ndarray, old: np.ndarray, new: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-player change in score_correct and score_deviation when teams move.
+
+    Args:
+        player_ids: player of each affected prediction, sorted ascending
+        predicted: predicted rank of each affected prediction
+        old: previous actual rank of the prediction's team
+        new: new actual rank of the prediction's team
+
+    Returns:
+        (player_ids, delta_correct, delta_deviation), one entry per player
+    """
+    delta_correct = (predicted == new).astype(np.int64) - (predicted == old)
+    delta_deviation = np.abs(predicted - new).astype(np.int64) - np.abs(predicted - old)
+    starts = np.flatnonzero(np.concatenate(([True], player_ids[1:] != player_ids[:-1])))
+    return (
+        player_ids[starts],
+        np.add.reduceat(delta_correct, starts),
+        np.add.reduceat(delta_deviation, starts),
+    )
+
+
+def apply_rank_changes(
+    current_gw: Gameweek, season: str, changes: Dict[int, Tuple[int, int]]
+) -> int:
+    """
+    Update stored scores for one gameweek after some teams changed rank.
+
+    Only predictions for the moved teams are read (through the
+    (season, team, player, predicted_rank) index) and only players whose
+    aggregates actually change are rewritten.
+
+    Returns:
+        Number of Score rows rewritten
+    """
+    completed = current_gw.finished and current_gw.data_checked
+    Score.objects.filter(season=season, gameweek=current_gw.id).exclude(
+        completed=completed
+    ).update(completed=completed)
+    if not changes:
+        return 0
+
+    rows = np.array(
+        list(
+            Prediction.objects.filter(season=season, team_id__in=list(changes))
+            .order_by("player_id")
+            .values_list("player_id", "team_id", "predicted_rank")
+            .iterator(chunk_size=10000)
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    if not len(rows):
+        return 0
+
+    old_lookup = np.zeros(max(changes) + 1, dtype=np.int64)
+    new_lookup = np.zeros(max(changes) + 1, dtype=np.int64)
+    for team_id, (old_rank, new_rank) in changes.items():
+        old_lookup[team_id] = old_rank
+        new_lookup[team_id] = new_rank
+    player_ids, delta_correct, delta_deviation = compute_score_deltas(
+        rows[:, 0], rows[:, 2], old_lookup[rows[:, 1]], new_lookup[rows[:, 1]]
+    )
+    moved = (delta_correct != 0) | (delta_deviation != 0)
+    deltas = dict(zip(
+        player_ids[moved].tolist(),
+        zip(delta_correct[moved].tolist(), delta_deviation[moved].tolist()),
+    ))
+
+    updated: List[Score] = []
+    affected = list(deltas)
+    for start in range(0, len(affected), IN_CHUNK_SIZE):
+        chunk = affected[start:start + IN_CHUNK_SIZE]
+        for score in Score.objects.filter(season=season, gameweek=current_gw.id, player_id__in=chunk):
+            delta_c, delta_d = deltas[score.player_id]
+            score.score_correct += delta_c
+            score.score_deviation += delta_d
+            score.rank_correct = score.score_correct
+            score.rank_deviation = score.score_deviation
+            score.completed = completed
+            updated.append(score)
+    return upsert_scores(updated)
+
+
+def update_scores_for_gameweek(
+    current_gw: Gameweek,
+    season: str,
+    previous_ranks: Dict[int, int],
+    new_ranks: Dict[int, int],
+    full: bool = False,
+) -> str:
+    """
+    Bring Score rows for a gameweek in line with a new standings snapshot.
+
+    Falls back to a full recompute when there is no previous snapshot for the
+    gameweek, the team set differs or the gameweek has no scores yet;
+    otherwise only the players affected by teams that moved are rewritten.
+    Deltas assume the stored scores match the current predictions, so callers
+    pass full=True while SiteState.scores_stale is set (see _on_prediction_change).
+
+    Returns:
+        "full", "delta" or "unchanged"
+    """
+    if (
+        full
+        or not previous_ranks
+        or set(previous_ranks) != set(new_ranks)
+        or not Score.objects.filter(season=season, gameweek=current_gw.id).exists()
+    ):
+        compute_scores_for_gameweek(current_gw, season)
+        return "full"
+
+    changes = changed_ranks(previous_ranks, new_ranks)
+    apply_rank_changes(current_gw, season, changes)
+    return "delta" if changes else "unchanged"
+
+
+@receiver([post_save, post_delete], sender=Prediction, dispatch_uid="league_prediction_scores")
+def _on_prediction_change(sender, **kwargs) -> None:
+    # Predictions edited outside PredictionImporter (e.g. in the admin); the
+    # importer's bulk writes send no signals and set the flag itself
+    transaction.on_commit(
+        lambda: SiteState.objects.update_or_create(id=1, defaults={"scores_stale": True})
+    )
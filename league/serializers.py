@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
-from .models import Player, Score, Team
+from .models import Player, Prediction, Score, Team
+from .teams import team_registry
 
 
 class TeamSerializer(serializers.ModelSerializer):
@@ -9,6 +10,19 @@ class TeamSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "short_name", "code"]
 
 
+class PredictionSerializer(serializers.ModelSerializer):
+    """Prediction with its team's name looked up in the team registry, not joined."""
+
+    team_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Prediction
+        fields = ["team_id", "team_name", "predicted_rank"]
+
+    def get_team_name(self, obj) -> str:
+        return team_registry().name(obj.team_id)
+
+
 class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
@@ -32,3 +46,11 @@ class ScoreSerializer(serializers.ModelSerializer):
         ]
 
 
+class RankedScoreSerializer(ScoreSerializer):
+    """Score with the competition ranks annotated by ScoreListView."""
+
+    rank_correct_based = serializers.IntegerField(read_only=True)
+    rank_deviation_based = serializers.IntegerField(read_only=True)
+
+    class Meta(ScoreSerializer.Meta):
+        fields = ScoreSerializer.Meta.fields + ["rank_correct_based", "rank_deviation_based"]
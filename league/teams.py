@@ -0,0 +1,135 @@
+"""
+Process-wide registry of the Premier League teams.
+
+The 20 teams change about once a season, so each process loads them once into
+an immutable TeamRegistry with O(1) lookup by id, short name and
+case-insensitive name instead of querying Team for every lookup.
+
+Invalidation:
+- post_save/post_delete on Team, and upsert_teams when a team's name, short
+  name or code changed (bulk_create sends no signals), call teams_changed():
+  this process drops its registry and, once the transaction commits, a new
+  version stamp is written to the shared cache
+- every process compares the stamp with the one its registry was loaded
+  under, at most every VERSION_CHECK_INTERVAL seconds, and reloads when it
+  moved
+"""
+import threading
+import time
+import uuid
+from types import MappingProxyType
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Team
+
+
+VERSION_KEY = "league:team_registry_version"
+VERSION_CHECK_INTERVAL = 5.0
+
+
+class TeamInfo(NamedTuple):
+    id: int
+    name: str
+    short_name: str
+    code: int
+
+
+class TeamRegistry:
+    """Immutable snapshot of the Team table, indexed for lookups."""
+
+    __slots__ = ("version", "_by_id", "_by_short_name", "_by_name")
+
+    def __init__(self, teams: Iterable[TeamInfo], version: str = ""):
+        teams = sorted(teams)
+        self.version = version
+        self._by_id = MappingProxyType({team.id: team for team in teams})
+        self._by_short_name = MappingProxyType({team.short_name.casefold(): team for team in teams})
+        self._by_name = MappingProxyType({team.name.casefold(): team for team in teams})
+
+    @classmethod
+    def load(cls, version: str = "") -> "TeamRegistry":
+        rows = Team.objects.order_by("id").values_list("id", "name", "short_name", "code")
+        return cls((TeamInfo(*row) for row in rows), version)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[TeamInfo]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, team_id: int) -> bool:
+        return team_id in self._by_id
+
+    @property
+    def ids(self) -> Tuple[int, ...]:
+        return tuple(self._by_id)
+
+    def by_id(self, team_id: int) -> Optional[TeamInfo]:
+        return self._by_id.get(team_id)
+
+    def by_short_name(self, short_name: str) -> Optional[TeamInfo]:
+        return self._by_short_name.get(short_name.casefold())
+
+    def by_name(self, name: str) -> Optional[TeamInfo]:
+        return self._by_name.get(name.casefold())
+
+    def name(self, team_id: int, default: str = "") -> str:
+        team = self._by_id.get(team_id)
+        return team.name if team else default
+
+
+_lock = threading.Lock()
+_registry: Optional[TeamRegistry] = None
+_checked_at = 0.0
+
+
+def _current_version() -> str:
+    cache = caches["default"]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # First process up (or the cache was cleared) starts a new stamp
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version or ""
+
+
+def team_registry() -> TeamRegistry:
+    """The current registry, reloaded when another process changed teams."""
+    global _registry, _checked_at
+    registry = _registry
+    if registry is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL:
+        return registry
+    with _lock:
+        version = _current_version()
+        if _registry is None or _registry.version != version:
+            _registry = TeamRegistry.load(version)
+        _checked_at = time.monotonic()
+        return _registry
+
+
+def _drop_registry() -> None:
+    global _registry
+    with _lock:
+        _registry = None
+
+
+def _publish_change() -> None:
+    caches["default"].set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    _drop_registry()
+
+
+def teams_changed() -> None:
+    """Invalidate the registry here now and in other processes on commit."""
+    _drop_registry()
+    # Other processes must not reload before the new rows are visible to them
+    transaction.on_commit(_publish_change)
+
+
+@receiver([post_save, post_delete], sender=Team, dispatch_uid="league_team_registry")
+def _on_team_change(sender, **kwargs) -> None:
+    teams_changed()
@@ -1,3 +1,977 @@
-from django.test import TestCase
+"""
+Query-budget and query-plan regression tests for every API route, and
+behaviour tests for the modules behind them.
 
-# Create your tests here.
+A league generated by LeagueGenerator is loaded once; each route in
+league/urls.py is then requested and every SQL statement it runs is
+recorded. A route fails if it runs more SELECTs than its budget, or if
+EXPLAIN QUERY PLAN shows a full table scan on one of the large tables.
+Writes are not budgeted: bulk inserts are batched by the backend's
+parameter limit and grow with the league by design.
+Adding a route without a ROUTE_CASES entry fails test_every_route_is_covered.
+
+Every test class runs against in-memory caches (TEST_CACHES), never the
+file caches under BASE_DIR/cache.
+"""
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+from unittest import mock
+
+import brotli
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .benchmarks.generator import LeagueGenerator
+from .caching import UpstreamCache, bump_data_version
+from .compression import accepted_encoding
+from .fpl import LATEST_POINTER, Snapshot, content_hash, fetch_bootstrap, prune_snapshots, save_snapshot
+from .jsonstream import extract_keys
+from .leaderboard import build_leaderboard, leaderboard_payload
+from .jobs import (
+    BACKOFF_BASE,
+    HANDLERS,
+    KEEP_FINISHED,
+    STALE_AFTER,
+    claim,
+    enqueue_update,
+    heartbeat,
+    purge_finished,
+    requeue_stale,
+    work,
+)
+from .metrics import Histogram
+from .importers import PredictionImporter, load_team_ids
+from .ingest import upsert_teams
+from .models import Gameweek, Job, Player, Prediction, RankMatrix, SchedulerLease, Score, SiteState, Team
+from .pipeline import apply_snapshot, ingest_bootstrap
+from .renderers import ORJSONRenderer
+from .scheduler import Lease, ScoreUpdateScheduler, current_leader
+from .scoring import compute_scores_for_gameweek, update_scores_for_gameweek
+from .teams import team_registry
+from .urls import urlpatterns
+from .workers import periodic
+
+
+TEST_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"league-tests-{alias}"}
+    for alias in ("default", "responses")
+}
+
+
+def clear_caches() -> None:
+    for alias in TEST_CACHES:
+        caches[alias].clear()
+
+
+SEASON = "2025/26"
+PLAYERS = 2000
+GAMEWEEKS = 3
+
+# Tables whose size grows with the league; a SCAN of any of them is a regression
+LARGE_TABLES = ("league_score", "league_prediction", "league_actualstanding")
+TABLE_SCAN = re.compile(r"\bSCAN (%s)\b" % "|".join(LARGE_TABLES))
+
+USERNAME = LeagueGenerator(PLAYERS).username(PLAYERS // 2)
+JOB_ID = 1
+METRICS_TOKEN = "test-scrape-token"
+
+# route -> [(method, url, max SELECT queries)]
+ROUTE_CASES: Dict[str, List[Tuple[str, str, int]]] = {
+    "": [("get", "/api/", 0)],
+    "health/": [("get", "/api/health/", 0)],
+    "metrics/": [("get", "/api/metrics/", 0)],
+    "standings/pl/": [("get", "/api/standings/pl/", 0)],
+    "scores/": [
+        ("get", f"/api/scores/?season={SEASON}&gameweek={GAMEWEEKS}", 3),
+        ("get", f"/api/scores/?season={SEASON}&gameweek={GAMEWEEKS}&page=40", 3),
+        ("get", f"/api/scores/?season={SEASON}&gameweek={GAMEWEEKS}&player_type=pundit", 3),
+        ("get", f"/api/scores/?season={SEASON}&gameweek={GAMEWEEKS}&cursor=", 2),
+    ],
+    "update_scores/": [("post", "/api/update_scores/", 1)],
+    "jobs/<int:job_id>/": [("get", f"/api/jobs/{JOB_ID}/", 1)],
+    "async/standings/pl/": [("get", "/api/async/standings/pl/", 0)],
+    "async/update_scores/": [("post", "/api/async/update_scores/", 1)],
+    "page/pl/": [("get", "/api/page/pl/", 0)],
+    "page/current/": [("get", "/api/page/current/", 0)],
+    "page/u/<str:username>/": [("get", f"/api/page/u/{USERNAME}/", 0)],
+    "page/home/": [("get", "/api/page/home/", 0)],
+    "standings/current/": [
+        ("get", "/api/standings/current/", 2),
+        ("get", "/api/standings/current/?player_type=pundit", 2),
+        ("get", "/api/standings/current/?page=20", 4),
+    ],
+    "standings/ranks/": [("get", "/api/standings/ranks/", 2)],
+    "user_history/<str:username>/": [("get", f"/api/user_history/{USERNAME}/", 3)],
+    "user_predictions/<str:username>/": [("get", f"/api/user_predictions/{USERNAME}/", 3)],
+    # SiteState, then players and their rows per chunk of 500
+    "user_histories/": [
+        ("get", f"/api/user_histories/?usernames={USERNAME},nobody", 3),
+        ("post", "/api/user_histories/", 3),
+        ("get", "/api/user_histories/?usernames=all", 6),
+    ],
+    "user_predictions/": [
+        ("get", f"/api/user_predictions/?usernames={USERNAME},nobody", 3),
+        ("get", "/api/user_predictions/?usernames=all", 6),
+    ],
+}
+
+
+class QueryRecorder:
+    """Record (sql, params) of every statement run on the default connection."""
+
+    def __init__(self):
+        self.queries: List[Tuple[str, tuple]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    @property
+    def selects(self) -> List[Tuple[str, tuple]]:
+        return [(sql, params) for sql, params in self.queries if sql.lstrip().upper().startswith("SELECT")]
+
+
+def explain(sql: str, params) -> List[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_ENABLED=True, METRICS_TOKEN=METRICS_TOKEN)
+class EndpointQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.generator = gen = LeagueGenerator(PLAYERS)
+        ingest_bootstrap(gen.bootstrap(1), SEASON)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = gen.write_csv(Path(tmp) / "predictions.csv")
+            call_command("init_predictions", str(csv_path), season=SEASON, stdout=io.StringIO())
+        with cls.captureOnCommitCallbacks(execute=True):
+            for gameweek in range(1, GAMEWEEKS + 1):
+                ingest_bootstrap(gen.bootstrap(gameweek), SEASON, full=True)
+        build_leaderboard()
+        Job.objects.create(id=JOB_ID, kind="update_scores", season=SEASON, trigger="manual")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        clear_caches()
+        sections = self.generator.bootstrap(GAMEWEEKS + 1)
+        snapshot = Snapshot(hash=content_hash(sections), fetched_at="", **sections)
+        patcher = mock.patch("league.teams.VERSION_CHECK_INTERVAL", float("inf"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for target in (
+            "league.pipeline.fetch_bootstrap",
+            "league.views.fetch_bootstrap",
+            "league.views.afetch_bootstrap",
+        ):
+            patcher = mock.patch(target, return_value=snapshot)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def request(self, method: str, url: str) -> QueryRecorder:
+        # Let update_scores run past the debounce against the stubbed upstream
+        SiteState.objects.filter(id=1).update(last_computed=None, bootstrap_hash="")
+        # A registry reload is one query whenever its version check comes due;
+        # load it now and keep it for the request so budgets do not hinge on timing
+        team_registry()
+        recorder = QueryRecorder()
+        # The scrape token lets /api/metrics/ through and is ignored elsewhere
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {METRICS_TOKEN}")
+        with connection.execute_wrapper(recorder):
+            if method == "post":
+                response = client.post(url, {"season": SEASON, "usernames": [USERNAME]}, content_type="application/json")
+            else:
+                response = client.get(url)
+            if response.streaming:
+                # Streamed views run their queries while the body is consumed
+                b"".join(response.streaming_content)
+        self.assertIn(response.status_code, (200, 202), f"{method.upper()} {url}")
+        return recorder
+
+    def test_every_route_is_covered(self):
+        routes = {str(pattern.pattern) for pattern in urlpatterns}
+        self.assertEqual(routes - set(ROUTE_CASES), set(), "routes without a query budget")
+
+    def test_query_budgets(self):
+        for route, cases in ROUTE_CASES.items():
+            for method, url, budget in cases:
+                with self.subTest(route=route, url=url):
+                    recorder = self.request(method, url)
+                    self.assertLessEqual(
+                        len(recorder.selects),
+                        budget,
+                        f"{method.upper()} {url} ran {len(recorder.selects)} queries:\n"
+                        + "\n".join(sql[:200] for sql, _ in recorder.selects),
+                    )
+
+    def test_update_job(self):
+        # The update endpoints only enqueue; the pipeline's queries run in the worker
+        self.request("post", "/api/update_scores/")
+        SiteState.objects.filter(id=1).update(last_computed=None, bootstrap_hash="")
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            self.assertEqual(work(once=True), 2)
+        self.assertEqual(
+            set(Job.objects.values_list("status", flat=True)), {"done"}, list(Job.objects.values("id", "error"))
+        )
+        self.assertEqual(Job.objects.get(id=JOB_ID).result["status"], "ok")
+        # Ran right after the first, so the 24h debounce applies
+        self.assertEqual(Job.objects.get(trigger="api").result["status"], "skipped_recent_run")
+        self.assertLessEqual(len(recorder.selects), 26, "\n".join(sql[:200] for sql, _ in recorder.selects))
+        _, created = enqueue_update(SEASON, trigger="api")
+        self.assertTrue(created)
+        _, created = enqueue_update(SEASON, trigger="api")
+        self.assertFalse(created)
+
+    def test_player_response_cache(self):
+        for url in (f"/api/user_history/{USERNAME}/", f"/api/user_predictions/{USERNAME}/"):
+            with self.subTest(url=url):
+                cold = self.request("get", url)
+                warm = self.request("get", url)
+                # Only the conditional GET's SiteState read is left
+                self.assertEqual(len(warm.selects), 1, "\n".join(sql[:200] for sql, _ in warm.selects))
+                with self.captureOnCommitCallbacks(execute=True):
+                    bump_data_version()
+                self.assertEqual(len(self.request("get", url).selects), len(cold.selects))
+
+    def test_etag_follows_data_version(self):
+        SiteState.objects.filter(id=1).update(last_computed=timezone.now())
+        url = f"/api/user_predictions/{USERNAME}/"
+        etag = Client().get(url)["ETag"]
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # An import bumps the data version but not last_computed
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_batch_post_is_not_conditional(self):
+        SiteState.objects.filter(id=1).update(last_computed=timezone.now())
+        url = "/api/user_predictions/"
+        # The validator of the bare path, which every POST used to share
+        etag = Client().get(url)["ETag"]
+        for names in ([USERNAME], [self.generator.username(1)]):
+            response = Client().post(
+                url, {"usernames": names}, content_type="application/json", HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header("ETag"))
+            self.assertEqual(json.loads(b"".join(response.streaming_content))["username"], names[0])
+
+    def test_batch_matches_single(self):
+        other = self.generator.username(1)
+        for single, batch in (("user_history", "user_histories"), ("user_predictions", "user_predictions")):
+            with self.subTest(batch=batch):
+                response = Client().get(f"/api/{batch}/?usernames={USERNAME},nobody,{other}")
+                self.assertEqual(response["Content-Type"], "application/x-ndjson")
+                lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+                expected = [Client().get(f"/api/{single}/{name}/").json() for name in (USERNAME, "nobody", other)]
+                self.assertEqual(lines, expected)
+                everyone = b"".join(Client().get(f"/api/{batch}/?usernames=all").streaming_content)
+                self.assertEqual(len(everyone.splitlines()), PLAYERS)
+        self.assertEqual(Client().get("/api/user_histories/").status_code, 400)
+
+    def test_rank_matrix(self):
+        matrix = Client().get("/api/standings/ranks/").json()
+        self.assertEqual(matrix["gameweeks"], list(range(1, GAMEWEEKS + 1)))
+        self.assertEqual(len(matrix["usernames"]), PLAYERS)
+        column = {username: col for col, username in enumerate(matrix["usernames"])}
+        for row, gameweek in enumerate(matrix["gameweeks"]):
+            scores = Client().get(f"/api/scores/?season={SEASON}&gameweek={gameweek}&page=3").json()["results"]
+            for score in scores:
+                col = column[score["player"]["username"]]
+                self.assertEqual(matrix["rank_correct"][row][col], score["rank_correct_based"])
+                self.assertEqual(matrix["rank_deviation"][row][col], score["rank_deviation_based"])
+        self.assertEqual(Client().get("/api/standings/ranks/?season=1999/00").status_code, 404)
+
+    def test_compressed_responses(self):
+        SiteState.objects.filter(id=1).update(last_computed=timezone.now())
+        identity = Client().get("/api/standings/current/")
+        self.assertNotIn("Content-Encoding", identity)
+        # The stored payload matches what DRF renders from the entries
+        self.assertEqual(identity.content, JSONRenderer().render(leaderboard_payload(None)))
+
+        stored = Client().get("/api/standings/current/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(stored["Content-Encoding"], "br")
+        self.assertTrue(stored["ETag"].startswith("W/"))
+        self.assertEqual(brotli.decompress(stored.content), identity.content)
+        revalidated = Client().get(
+            "/api/standings/current/", HTTP_ACCEPT_ENCODING="br", HTTP_IF_NONE_MATCH=stored["ETag"]
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+        dynamic = Client().get("/api/standings/current/?page=2", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(dynamic["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", dynamic["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(dynamic.content))["gameweek"], identity.json()["gameweek"])
+
+        streamed = Client().get("/api/user_histories/?usernames=all", HTTP_ACCEPT_ENCODING="br;q=0.5, gzip")
+        self.assertEqual(streamed["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(streamed.streaming_content)).splitlines()
+        self.assertEqual(len(lines), PLAYERS)
+
+        refused = Client().get("/api/standings/current/", HTTP_ACCEPT_ENCODING="gzip;q=0, br;q=0")
+        self.assertNotIn("Content-Encoding", refused)
+
+    def test_stored_payload_only_for_json(self):
+        for response in (
+            Client().get("/api/standings/current/?format=api"),
+            Client().get("/api/standings/current/", HTTP_ACCEPT="text/html"),
+        ):
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response["Content-Type"].startswith("text/html"))
+        self.assertEqual(Client().get("/api/standings/current/?format=json")["Content-Type"], "application/json")
+
+    def test_query_plans(self):
+        for route, cases in ROUTE_CASES.items():
+            for method, url, _ in cases:
+                with self.subTest(route=route, url=url):
+                    recorder = self.request(method, url)
+                    for sql, params in recorder.selects:
+                        plan = explain(sql, params)
+                        scans = [line for line in plan if TABLE_SCAN.search(line)]
+                        self.assertEqual(scans, [], f"{url} scans a large table:\n{sql[:500]}\n" + "\n".join(plan))
+
+
+def swap_positions(teams: List[Dict], first: int, second: int) -> List[Dict]:
+    """A copy of a "teams" section with two teams' positions exchanged."""
+    positions = {team["id"]: team["position"] for team in teams}
+    positions[first], positions[second] = positions[second], positions[first]
+    return [dict(team, position=positions[team["id"]]) for team in teams]
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DeltaScoringTests(TestCase):
+    """Delta updates must leave the same Score rows as a full recompute."""
+
+    players = 300
+
+    def setUp(self):
+        clear_caches()
+        self.generator = LeagueGenerator(self.players, seed=3)
+        ingest_bootstrap(self.generator.bootstrap(1), SEASON)
+        self.import_rows(self.generator.prediction_rows())
+        self.current = self.generator.bootstrap(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_bootstrap(self.current, SEASON, full=True)
+
+    def import_rows(self, rows) -> None:
+        importer = PredictionImporter(SEASON, team_ids=load_team_ids())
+        importer.run((line, row) for line, row in enumerate(rows, start=1))
+
+    def stored_scores(self) -> Dict[int, Tuple]:
+        return {
+            row[0]: row[1:]
+            for row in Score.objects.filter(season=SEASON, gameweek=2).values_list(
+                "player_id", "score_correct", "score_deviation", "rank_correct", "rank_deviation", "completed"
+            )
+        }
+
+    def move(self, first: int, second: int) -> str:
+        """Ingest the current gameweek again with two teams swapped."""
+        teams = swap_positions(self.current["teams"], first, second)
+        self.current = {"teams": teams, "events": self.current["events"]}
+        return ingest_bootstrap(self.current, SEASON).mode
+
+    def assert_matches_full(self) -> None:
+        after_delta = self.stored_scores()
+        compute_scores_for_gameweek(Gameweek.objects.get(id=2), SEASON)
+        self.assertEqual(after_delta, self.stored_scores())
+        self.assertEqual(len(after_delta), Player.objects.count())
+
+    def test_delta_matches_full(self):
+        self.assertEqual(self.move(1, 2), "delta")
+        self.assertEqual(self.move(3, 17), "delta")
+        self.assert_matches_full()
+        self.assertEqual(ingest_bootstrap(self.current, SEASON).mode, "unchanged")
+
+    def test_idle_poll_keeps_versions(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = ingest_bootstrap(self.current, SEASON)
+        self.assertEqual((result.mode, result.changed), ("unchanged", False))
+        self.assertEqual(callbacks, [])
+
+        # A new upstream hash whose ingest changes nothing leaves last_computed alone
+        computed_at = timezone.now() - timedelta(hours=1)
+        SiteState.objects.filter(id=1).update(last_computed=computed_at, bootstrap_hash="old")
+        snapshot = Snapshot(hash="new", fetched_at="", **self.current)
+        self.assertEqual(apply_snapshot(snapshot, SiteState.objects.get(id=1), SEASON)["scoring"], "unchanged")
+        state = SiteState.objects.get(id=1)
+        self.assertEqual((state.last_computed, state.bootstrap_hash), (computed_at, "new"))
+
+        teams = swap_positions(self.current["teams"], 1, 2)
+        moved = Snapshot(hash="moved", fetched_at="", teams=teams, events=self.current["events"])
+        self.assertEqual(apply_snapshot(moved, SiteState.objects.get(id=1), SEASON)["scoring"], "delta")
+        self.assertGreater(SiteState.objects.get(id=1).last_computed, computed_at)
+
+    def test_rank_matrix_built_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.move(1, 2)
+        built_at = RankMatrix.objects.get(season=SEASON).built_at
+        for callback in callbacks:
+            callback()
+        rebuilt_at = RankMatrix.objects.get(season=SEASON).built_at
+        self.assertGreater(rebuilt_at, built_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ingest_bootstrap(self.current, SEASON).mode, "unchanged")
+        self.assertEqual(RankMatrix.objects.get(season=SEASON).built_at, rebuilt_at)
+
+    def test_players_imported_after_first_compute(self):
+        newcomers = LeagueGenerator(self.players + 20, seed=3)
+        self.import_rows(list(newcomers.prediction_rows())[self.players:])
+        self.assertTrue(SiteState.objects.get(id=1).scores_stale)
+        self.assertEqual(self.move(1, 2), "full")
+        self.assertFalse(SiteState.objects.get(id=1).scores_stale)
+        self.assertEqual(self.move(4, 5), "delta")
+        self.assert_matches_full()
+
+    def test_replaced_predictions(self):
+        rows = list(self.generator.prediction_rows())[:10]
+        # Same players, every prediction shifted one rank down
+        self.import_rows([[*row[:2], *row[3:22], row[2], row[22]] for row in rows])
+        self.assertEqual(self.move(1, 2), "full")
+        self.assertEqual(self.move(6, 9), "delta")
+        self.assert_matches_full()
+
+    def test_edited_predictions_force_full(self):
+        # Predictions saved one by one, e.g. in the admin, rather than imported
+        player = Player.objects.create(username="latecomer")
+        with self.captureOnCommitCallbacks(execute=True):
+            for team_id in self.generator.team_ids():
+                Prediction.objects.create(season=SEASON, player=player, team_id=team_id, predicted_rank=team_id)
+        self.assertTrue(SiteState.objects.get(id=1).scores_stale)
+        self.assertEqual(self.move(1, 2), "full")
+        self.assertEqual(self.move(4, 5), "delta")
+        self.assert_matches_full()
+
+    def test_unscorable_players_keep_delta(self):
+        # Predictions on a team outside the table never produce a Score row
+        team = Team.objects.create(id=99, name="Relegated", short_name="REL", code=99)
+        player = Player.objects.create(username="unscorable")
+        Prediction.objects.bulk_create([Prediction(season=SEASON, player=player, team=team, predicted_rank=1)])
+        self.assertEqual(self.move(1, 2), "delta")
+        self.assertFalse(Score.objects.filter(player=player).exists())
+
+    def test_missing_scores_force_full(self):
+        Score.objects.filter(season=SEASON, gameweek=2).delete()
+        ranks = {team["id"]: team["position"] for team in self.current["teams"]}
+        gameweek = Gameweek.objects.get(id=2)
+        self.assertEqual(update_scores_for_gameweek(gameweek, SEASON, ranks, ranks), "full")
+        self.assertEqual(update_scores_for_gameweek(gameweek, SEASON, ranks, ranks), "unchanged")
+        self.assert_matches_full()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(TestCase):
+    players = 140
+
+    @classmethod
+    def setUpTestData(cls):
+        gen = LeagueGenerator(cls.players, seed=5)
+        ingest_bootstrap(gen.bootstrap(1), SEASON)
+        importer = PredictionImporter(SEASON, team_ids=load_team_ids())
+        importer.run((line, row) for line, row in enumerate(gen.prediction_rows(), start=1))
+        for gameweek in range(1, 4):
+            ingest_bootstrap(gen.bootstrap(gameweek), SEASON, full=True)
+
+    def setUp(self):
+        clear_caches()
+
+    def walk(self, url: str) -> List[Tuple]:
+        """Every row of a listing, following "next" links from url."""
+        rows = []
+        while url:
+            page = Client().get(url).json()
+            rows.extend(
+                (r["player"]["username"], r["score_correct"], r["score_deviation"], r["rank_correct_based"])
+                for r in page["results"]
+            )
+            url = page["next"]
+        return rows
+
+    def test_cursor_pages_cover_every_row_once(self):
+        for player_type in ("", "pundit"):
+            with self.subTest(player_type=player_type):
+                base = f"/api/scores/?season={SEASON}&gameweek=2&player_type={player_type}"
+                by_cursor = self.walk(base + "&cursor=")
+                by_page = self.walk(base)
+                expected = Score.objects.filter(season=SEASON, gameweek=2)
+                if player_type:
+                    expected = expected.filter(player__player_type=player_type)
+                self.assertEqual(len(by_cursor), expected.count())
+                self.assertEqual(len({row[0] for row in by_cursor}), len(by_cursor), "row repeated")
+                # Same rows and correct-based ranks as the window function
+                self.assertEqual(sorted(by_cursor), sorted(by_page))
+                keys = [(-correct, deviation) for _, correct, deviation, _ in by_cursor]
+                self.assertEqual(keys, sorted(keys))
+
+    def test_cursor_needs_season_and_gameweek(self):
+        for query in ("cursor=", f"season={SEASON}&cursor=", "gameweek=2&cursor="):
+            with self.subTest(query=query):
+                self.assertEqual(Client().get(f"/api/scores/?{query}").status_code, 400)
+
+
+def stub_upstream(test: TestCase, sections: Dict) -> Snapshot:
+    """Serve sections as the fetched bootstrap-static for the rest of the test."""
+    snapshot = Snapshot(hash=content_hash(sections), fetched_at="", **sections)
+    patcher = mock.patch("league.pipeline.fetch_bootstrap", return_value=snapshot)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return snapshot
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SchedulerTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.generator = LeagueGenerator(50)
+        stub_upstream(self, self.generator.bootstrap(2))
+
+    def test_run_once_goes_through_the_queue(self):
+        scheduler = ScoreUpdateScheduler(SEASON)
+        plan = scheduler.run_once()
+        job = Job.objects.get(trigger="scheduler")
+        self.assertEqual((job.status, job.result["status"]), ("done", "ok"))
+        self.assertEqual(job.worker, scheduler.lease.holder)
+        self.assertEqual((plan.phase, plan.gameweek), ("live", 2))
+        self.assertEqual(SiteState.objects.get(id=1).scheduler_phase, "live")
+        # Not debounced like the public trigger: only the unchanged check applies
+        scheduler.run_once()
+        latest = Job.objects.filter(trigger="scheduler").latest("id")
+        self.assertEqual(latest.result["status"], "skipped_unchanged")
+
+    def test_lease_renewed_while_update_runs(self):
+        scheduler = ScoreUpdateScheduler(SEASON)
+        scheduler.is_leader = True
+        scheduler.lease = mock.Mock(holder="leader", renew=mock.Mock(return_value=True))
+        slow = mock.Mock(side_effect=lambda **kwargs: time.sleep(0.1))
+        with mock.patch("league.scheduler.HEARTBEAT_INTERVAL", timedelta(milliseconds=10)), mock.patch(
+            "league.scheduler.work", slow
+        ):
+            scheduler.run_once()
+            self.assertGreater(scheduler.lease.renew.call_count, 1)
+            self.assertTrue(scheduler.is_leader)
+
+            scheduler.lease.renew.return_value = False
+            with self.assertLogs("league.scheduler", "WARNING"):
+                scheduler.run_once()
+        self.assertFalse(scheduler.is_leader)
+
+
+class LeaseTests(TestCase):
+    def test_single_holder_and_takeover(self):
+        first, second = Lease("first"), Lease("second")
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertTrue(first.acquire(), "acquire renews a held lease")
+        self.assertEqual(current_leader().holder, "first")
+
+        # First stops heartbeating past its TTL: second takes over
+        SchedulerLease.objects.filter(id=1).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(current_leader())
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.renew())
+        self.assertTrue(second.renew())
+
+        first.release()
+        self.assertEqual(current_leader().holder, "second", "release only frees one's own lease")
+        second.release()
+        self.assertIsNone(current_leader())
+        self.assertTrue(first.acquire())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LeaderboardRefreshTests(TestCase):
+    """Name, type and membership changes reach the stored standings without a score moving."""
+
+    def setUp(self):
+        clear_caches()
+        self.generator = LeagueGenerator(40, seed=7)
+        self.sections = self.generator.bootstrap(2)
+        self.snapshot = stub_upstream(self, self.sections)
+        ingest_bootstrap(self.generator.bootstrap(1), SEASON)
+        self.import_rows(self.generator.prediction_rows())
+        # The leaderboard shows GW 1, the latest finished one
+        ingest_bootstrap(self.generator.bootstrap(1), SEASON, full=True)
+        ingest_bootstrap(self.sections, SEASON, full=True)
+
+    def import_rows(self, rows) -> None:
+        PredictionImporter(SEASON, team_ids=load_team_ids()).run(
+            (line, row) for line, row in enumerate(rows, start=1)
+        )
+
+    def standings(self) -> Dict[str, Dict]:
+        return {row["username"]: row for row in Client().get("/api/standings/current/").json()["results"]}
+
+    def test_player_edit_queues_rebuild(self):
+        player = Player.objects.get(username=self.generator.username(0))
+        with self.captureOnCommitCallbacks(execute=True):
+            player.custom_team_name = "Renamed FC"
+            player.player_type = "pundit"
+            player.save()
+        self.assertEqual(work(once=True), 1)
+        job = Job.objects.get(kind="build_leaderboard")
+        self.assertEqual((job.status, job.trigger), ("done", "player"))
+        row = self.standings()[player.username]
+        self.assertEqual((row["team_name"], row["player_type"]), ("Renamed FC", "pundit"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            player.delete()
+        work(once=True)
+        self.assertNotIn(player.username, self.standings())
+        self.assertNotIn(player.username, Client().get("/api/standings/ranks/").json()["usernames"])
+
+    def test_command_rebuild_changes_etag(self):
+        SiteState.objects.filter(id=1).update(last_computed=timezone.now())
+        etag = Client().get("/api/standings/current/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("build_leaderboard", season=SEASON, stdout=io.StringIO())
+        response = Client().get("/api/standings/current/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_import_updates_names_then_membership(self):
+        rows = list(LeagueGenerator(41, seed=7).prediction_rows())
+        rows[0][1] = "Imported FC"
+        self.import_rows([rows[0], rows[40]])
+        self.assertEqual(self.standings()[rows[0][0]]["team_name"], "Imported FC")
+        # The newcomer is scored by the next update even with upstream unchanged
+        SiteState.objects.filter(id=1).update(bootstrap_hash=self.snapshot.hash)
+        enqueue_update(SEASON, trigger="manual")
+        with self.captureOnCommitCallbacks(execute=True):
+            work(once=True)
+        self.assertEqual(Job.objects.get(trigger="manual").result["scoring"], "full")
+        self.assertTrue(Score.objects.filter(player__username=rows[40][0], gameweek=2).exists())
+        self.assertIn(rows[40][0], Client().get("/api/standings/ranks/").json()["usernames"])
+
+
+class JobQueueTests(TestCase):
+    def test_merges_params_into_pending_job(self):
+        job, created = enqueue_update(SEASON, trigger="api")
+        self.assertTrue(created)
+        merged, created = enqueue_update(SEASON, trigger="api", full=True)
+        self.assertEqual((merged.id, created), (job.id, False))
+        enqueue_update(SEASON, trigger="api", force=True)
+        job.refresh_from_db()
+        self.assertEqual(job.params, {"full": True, "force": True})
+        # Once claimed, a new request queues a job of its own
+        claim("test")
+        queued, created = enqueue_update(SEASON, trigger="api")
+        self.assertTrue(created)
+        self.assertEqual(queued.params, {})
+
+    def test_retries_with_backoff_then_fails(self):
+        job, _ = enqueue_update(SEASON, trigger="api")
+        failing = mock.Mock(side_effect=RuntimeError("upstream down"))
+        with mock.patch.dict(HANDLERS, {"update_scores": failing}), self.assertLogs("league.jobs", "ERROR"):
+            for attempt in range(1, job.max_attempts + 1):
+                start = timezone.now()
+                self.assertEqual(work(once=True), 1)
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+                self.assertEqual(job.error, "RuntimeError: upstream down")
+                if attempt < job.max_attempts:
+                    self.assertEqual(job.status, "pending")
+                    self.assertGreaterEqual(job.run_after, start + BACKOFF_BASE * 2 ** (attempt - 1))
+                    # Not due yet
+                    self.assertEqual(work(once=True), 0)
+                    Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(failing.call_count, job.max_attempts)
+        # The public status endpoint never shows a traceback
+        Job.objects.filter(id=job.id).update(error='Traceback (most recent call last):\n  File "/srv/x.py"')
+        self.assertEqual(Client().get(f"/api/jobs/{job.id}/").json()["error"], "Traceback (most recent call last):")
+
+    def test_purges_old_finished_jobs(self):
+        now = timezone.now()
+        old = Job.objects.create(kind="update_scores", season=SEASON, trigger="old", status="done")
+        recent = Job.objects.create(kind="update_scores", season=SEASON, trigger="recent", status="failed")
+        waiting = Job.objects.create(kind="update_scores", season=SEASON, trigger="waiting")
+        Job.objects.filter(id=old.id).update(finished_at=now - KEEP_FINISHED - timedelta(hours=1))
+        Job.objects.filter(id=recent.id).update(finished_at=now - timedelta(hours=1))
+        self.assertEqual(purge_finished(now), 1)
+        self.assertEqual(set(Job.objects.values_list("id", flat=True)), {recent.id, waiting.id})
+
+    def test_requeues_on_missed_heartbeat_only(self):
+        enqueue_update(SEASON, trigger="api")
+        enqueue_update(SEASON, trigger="manual")
+        long_running, orphaned = claim("alive"), claim("dead")
+        now = timezone.now()
+        # Running for hours but still heartbeating: left alone
+        Job.objects.filter(id=long_running.id).update(started_at=now - 20 * STALE_AFTER, heartbeat_at=now)
+        Job.objects.filter(id=orphaned.id).update(heartbeat_at=now - 2 * STALE_AFTER)
+        self.assertEqual(requeue_stale(now), 1)
+        self.assertEqual(Job.objects.get(id=long_running.id).status, "running")
+        orphaned.refresh_from_db()
+        self.assertEqual(orphaned.status, "pending")
+        self.assertIn("dead stopped responding", orphaned.error)
+
+    def test_heartbeat_touches_running_job(self):
+        enqueue_update(SEASON, trigger="api")
+        job = claim("test")
+        with mock.patch("league.jobs.HEARTBEAT_INTERVAL", timedelta(milliseconds=10)), mock.patch(
+            "league.jobs.touch", return_value=True
+        ) as touch:
+            with heartbeat(job):
+                time.sleep(0.1)
+            calls = touch.call_count
+            time.sleep(0.05)
+        self.assertGreater(calls, 1)
+        self.assertEqual(touch.call_count, calls, "heartbeat outlived the job")
+
+    def test_periodic_retries_errors_and_stops_on_false(self):
+        beat = mock.Mock(side_effect=[RuntimeError("database is locked"), True, False, True])
+        with self.assertLogs("league.workers", "WARNING") as logs, periodic(0.01, beat, "test beat"):
+            time.sleep(0.2)
+        self.assertEqual(beat.call_count, 3)
+        self.assertIn("database is locked", logs.output[0])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TeamRegistryTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        Team.objects.create(id=1, name="Arsenal", short_name="ARS", code=3)
+        Team.objects.create(id=2, name="Aston Villa", short_name="AVL", code=7)
+
+    def test_lookups(self):
+        registry = team_registry()
+        self.assertEqual(registry.ids, (1, 2))
+        self.assertEqual(registry.by_short_name("ars").name, "Arsenal")
+        self.assertEqual(registry.by_name("ASTON VILLA").id, 2)
+        self.assertIsNone(registry.by_id(3))
+        self.assertEqual(registry.name(3, "?"), "?")
+
+    def test_reloads_after_change(self):
+        before = team_registry()
+        with self.captureOnCommitCallbacks(execute=True):
+            Team.objects.filter(id=1).update(name="The Arsenal")
+            Team.objects.get(id=2).save()
+        after = team_registry()
+        self.assertNotEqual(after.version, before.version)
+        self.assertEqual(after.name(1), "The Arsenal")
+
+    def test_upsert_publishes_only_changes(self):
+        teams = [
+            {"id": 1, "name": "Arsenal", "short_name": "ARS", "code": 3},
+            {"id": 2, "name": "Aston Villa", "short_name": "AVL", "code": 7},
+        ]
+        before = team_registry()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(upsert_teams(teams), 0)
+        self.assertEqual(callbacks, [])
+        self.assertIs(team_registry(), before)
+
+        teams[1]["short_name"] = "AVI"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(upsert_teams(teams), 1)
+        self.assertEqual(team_registry().by_id(2).short_name, "AVI")
+
+
+@override_settings(CACHES=TEST_CACHES)
+class UpstreamCacheTests(SimpleTestCase):
+    def setUp(self):
+        clear_caches()
+        self.calls = 0
+
+    def loader(self):
+        self.calls += 1
+        return self.calls
+
+    def test_fresh_then_stale_then_expired(self):
+        upstream = UpstreamCache("test", self.loader, fresh_for=60, stale_for=60)
+        self.assertEqual(upstream.get(), 1)
+        self.assertEqual(upstream.get(), 1)
+        entry = upstream.cache.get(upstream.key)
+
+        # Stale: the old value is served while a background refresh runs
+        upstream.cache.set(upstream.key, dict(entry, loaded_at=entry["loaded_at"] - 90), timeout=None)
+        with mock.patch("league.caching.threading.Thread") as thread:
+            self.assertEqual(upstream.get(), 1)
+        thread.assert_called_once()
+        self.assertIsNotNone(upstream.cache.get(upstream.lock_key))
+        upstream.cache.delete(upstream.lock_key)
+
+        # Expired: loaded in the request
+        upstream.cache.set(upstream.key, dict(entry, loaded_at=entry["loaded_at"] - 300), timeout=None)
+        self.assertEqual(upstream.get(), 2)
+        self.assertIsNone(upstream.cache.get(upstream.lock_key))
+
+    def test_async_refresh_outlives_request_loop(self):
+        async def aloader():
+            # Still waiting on upstream when the request's loop is torn down
+            await asyncio.sleep(0.05)
+            return self.loader()
+
+        upstream = UpstreamCache("test", self.loader, aloader=aloader, fresh_for=60, stale_for=60)
+        self.assertEqual(async_to_sync(upstream.aget)(), 1)
+        entry = upstream.cache.get(upstream.key)
+        upstream.cache.set(upstream.key, dict(entry, loaded_at=entry["loaded_at"] - 90), timeout=None)
+        # As under WSGI: the loop async_to_sync made for the call is gone once it returns
+        self.assertEqual(async_to_sync(upstream.aget)(), 1)
+        deadline = time.monotonic() + 5
+        while upstream.cache.get(upstream.lock_key) is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(upstream.cache.get(upstream.key)["value"], 2)
+
+    def test_serves_last_good_value_when_upstream_fails(self):
+        upstream = UpstreamCache("test", self.loader, fresh_for=60, stale_for=60)
+        upstream.get()
+        entry = upstream.cache.get(upstream.key)
+        upstream.cache.set(upstream.key, dict(entry, loaded_at=0), timeout=None)
+        upstream.loader = mock.Mock(side_effect=OSError("upstream down"))
+        with self.assertLogs("league.caching", "WARNING"):
+            self.assertEqual(upstream.get(), 1)
+        with self.assertRaises(OSError):
+            UpstreamCache("other", upstream.loader).get()
+
+
+class CompressionNegotiationTests(SimpleTestCase):
+    def negotiate(self, header):
+        return accepted_encoding(RequestFactory().get("/", HTTP_ACCEPT_ENCODING=header))
+
+    def test_accepted_encoding(self):
+        self.assertEqual(self.negotiate("gzip, br"), "br")
+        self.assertEqual(self.negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(self.negotiate("*"), "br")
+        self.assertEqual(self.negotiate("*;q=0, gzip"), "gzip")
+        self.assertIsNone(self.negotiate(""))
+        self.assertIsNone(self.negotiate("identity, deflate"))
+        self.assertIsNone(self.negotiate("gzip;q=0, br;q=0"))
+        self.assertEqual(self.negotiate("br;q=bad, gzip"), "gzip")
+
+
+class RendererTests(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        data = {"name": "line\u2028paragraph\u2029é", "at": timezone.now(), "ranks": {1: 2}}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_render(self):
+        histogram = Histogram("test_seconds", "Test histogram", (0.1, 1))
+        labels = (("route", 'a"b'), ("method", "GET"))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(labels, value)
+        lines = list(histogram.render())
+        self.assertEqual(lines[:2], ["# HELP test_seconds Test histogram", "# TYPE test_seconds histogram"])
+        self.assertEqual(
+            lines[2:],
+            [
+                'test_seconds_bucket{route="a\\"b",method="GET",le="0.1"} 1',
+                'test_seconds_bucket{route="a\\"b",method="GET",le="1"} 2',
+                'test_seconds_bucket{route="a\\"b",method="GET",le="+Inf"} 3',
+                'test_seconds_sum{route="a\\"b",method="GET"} 5.55',
+                'test_seconds_count{route="a\\"b",method="GET"} 3',
+            ],
+        )
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN=METRICS_TOKEN)
+class MetricsAccessTests(TestCase):
+    def test_staff_or_token_only(self):
+        self.assertEqual(Client().get("/api/metrics/").status_code, 403)
+        self.assertEqual(Client(HTTP_AUTHORIZATION="Bearer wrong").get("/api/metrics/").status_code, 403)
+        response = Client(HTTP_AUTHORIZATION=f"Bearer {METRICS_TOKEN}").get("/api/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE", response.content)
+
+        client = Client()
+        client.force_login(User.objects.create(username="ops", is_staff=True))
+        self.assertEqual(client.get("/api/metrics/").status_code, 200)
+        client.force_login(User.objects.create(username="fan"))
+        self.assertEqual(client.get("/api/metrics/").status_code, 403)
+
+    def test_disabled(self):
+        with self.settings(METRICS_ENABLED=False):
+            response = Client(HTTP_AUTHORIZATION=f"Bearer {METRICS_TOKEN}").get("/api/metrics/")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_never_matches(self):
+        self.assertEqual(Client(HTTP_AUTHORIZATION="Bearer ").get("/api/metrics/").status_code, 403)
+
+
+class SnapshotStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        self.sections = LeagueGenerator(10).bootstrap(2)
+
+    def test_hash_ignores_fields_the_pipeline_does_not_read(self):
+        noisy = json.loads(json.dumps(self.sections))
+        noisy["teams"][0]["form"] = "WWDLW"
+        noisy["events"][0]["transfers_made"] = 123456
+        self.assertEqual(content_hash(noisy), content_hash(self.sections))
+        noisy["teams"][0]["points"] += 3
+        self.assertNotEqual(content_hash(noisy), content_hash(self.sections))
+
+    def test_prunes_all_but_newest_and_latest(self):
+        variants = []
+        for points in range(3):
+            sections = json.loads(json.dumps(self.sections))
+            sections["teams"][0]["points"] = 100 + points
+            variants.append(sections)
+        with self.settings(FPL_SNAPSHOT_KEEP=None):
+            hashes = [save_snapshot(sections, self.directory).hash for sections in variants]
+        for age, snapshot_hash in enumerate(reversed(hashes)):
+            os.utime(self.directory / f"{snapshot_hash}.json.gz", (0, 1000 - age))
+        (self.directory / LATEST_POINTER).write_text(hashes[0])
+
+        self.assertEqual(prune_snapshots(self.directory, keep=1), 1)
+        stored = {path.name.split(".")[0] for path in self.directory.glob("*.json.gz")}
+        self.assertEqual(stored, {hashes[0], hashes[2]})
+
+        # Seeing a stored snapshot again makes it the newest
+        with self.settings(FPL_SNAPSHOT_KEEP=1):
+            save_snapshot(variants[0], self.directory)
+        self.assertEqual([path.name for path in self.directory.glob("*.json.gz")], [f"{hashes[0]}.json.gz"])
+
+    def test_web_fetch_stores_nothing(self):
+        with self.settings(FPL_SNAPSHOT_DIR=self.directory), mock.patch(
+            "league.fpl.stream_sections", return_value=self.sections
+        ):
+            snapshot = fetch_bootstrap(store=False)
+            self.assertEqual(snapshot.hash, content_hash(self.sections))
+            self.assertEqual(list(self.directory.iterdir()), [])
+            fetch_bootstrap()
+        self.assertEqual((self.directory / LATEST_POINTER).read_text(), snapshot.hash)
+
+
+class JSONStreamTests(SimpleTestCase):
+    def test_extract_keys_across_chunks(self):
+        document = {
+            "events": [{"id": 1, "name": "GW \"1\" {x}"}],
+            "elements": [{"id": n, "nested": {"a": [1, 2, "]"]}} for n in range(50)],
+            "teams": [{"id": 1, "name": "Arsenal \u00e9"}],
+            "total": 1.5e3,
+        }
+        raw = json.dumps(document, ensure_ascii=False).encode("utf-8")
+        for size in (1, 7, len(raw)):
+            with self.subTest(chunk_size=size):
+                chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+                self.assertEqual(
+                    extract_keys(chunks, ["teams", "events", "total"]),
+                    {key: document[key] for key in ("teams", "events", "total")},
+                )
+
+    def test_truncated_input(self):
+        with self.assertRaises(ValueError):
+            extract_keys([b'{"teams": [1, 2'], ["teams"])
@@ -2,6 +2,7 @@ from django.urls import path
 
 from .views import (
     CurrentPLStandingsView,
+    JobStatusView,
     ScoreListView,
     UpdateScoresView,
     ScoreCurrentView,
@@ -9,18 +10,29 @@ from .views import (
     UserPredictionsView,
     current_standings_page,
     user_history_page,
+    user_histories,
+    user_predictions_batch,
     homepage,
     health,
+    metrics,
+    rank_matrix_view,
     pl_table,
+    pl_standings_async,
+    update_scores_async,
 )
 
 
 urlpatterns = [
     path("", homepage),
     path("health/", health),
+    path("metrics/", metrics),
     path("standings/pl/", CurrentPLStandingsView.as_view()),
     path("scores/", ScoreListView.as_view()),
     path("update_scores/", UpdateScoresView.as_view()),
+    path("jobs/<int:job_id>/", JobStatusView.as_view()),
+    # Async variants for ASGI deployments
+    path("async/standings/pl/", pl_standings_async),
+    path("async/update_scores/", update_scores_async),
     # Pages
     path("page/pl/", pl_table),
     path("page/current/", current_standings_page),
@@ -28,8 +40,12 @@ urlpatterns = [
     path("page/home/", homepage),
     # Aggregated standings JSON
     path("standings/current/", ScoreCurrentView.as_view()),
+    path("standings/ranks/", rank_matrix_view),
     path("user_history/<str:username>/", UserHistoryView.as_view()),
     path("user_predictions/<str:username>/", UserPredictionsView.as_view()),
+    # Batch NDJSON variants: ?usernames=a,b,c or "all"
+    path("user_histories/", user_histories),
+    path("user_predictions/", user_predictions_batch),
 ]
 
 
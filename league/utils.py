@@ -2,11 +2,9 @@
 Utility functions for the prediction league system
 """
 import json
-import os
-from pathlib import Path
 from typing import Dict, Optional
 
-from .models import Team
+from .teams import team_registry
 
 
 def get_teams_lookup() -> Dict[int, Dict]:
@@ -16,18 +14,7 @@ def get_teams_lookup() -> Dict[int, Dict]:
     Returns:
         Dict mapping team ID to team info dict with keys: id, name, short_name, code
     """
-    teams = Team.objects.all().order_by('id')
-    
-    team_data = {}
-    for team in teams:
-        team_data[team.id] = {
-            'id': team.id,
-            'name': team.name,
-            'short_name': team.short_name,
-            'code': team.code
-        }
-    
-    return team_data
+    return {team.id: team._asdict() for team in team_registry()}
 
 
 def get_team_by_id(team_id: int) -> Optional[Dict]:
@@ -40,16 +27,8 @@ def get_team_by_id(team_id: int) -> Optional[Dict]:
     Returns:
         Team info dict or None if not found
     """
-    try:
-        team = Team.objects.get(id=team_id)
-        return {
-            'id': team.id,
-            'name': team.name,
-            'short_name': team.short_name,
-            'code': team.code
-        }
-    except Team.DoesNotExist:
-        return None
+    team = team_registry().by_id(team_id)
+    return team._asdict() if team else None
 
 
 def get_team_by_name(team_name: str) -> Optional[Dict]:
@@ -62,18 +41,22 @@ def get_team_by_name(team_name: str) -> Optional[Dict]:
     Returns:
         Team info dict or None if not found
     """
-    try:
-        team = Team.objects.filter(name__iexact=team_name).first()
-        if team:
-            return {
-                'id': team.id,
-                'name': team.name,
-                'short_name': team.short_name,
-                'code': team.code
-            }
-        return None
-    except Exception:
-        return None
+    team = team_registry().by_name(team_name)
+    return team._asdict() if team else None
+
+
+def get_team_by_short_name(short_name: str) -> Optional[Dict]:
+    """
+    Get team information by short name (case-insensitive), e.g. "ARS".
+    
+    Args:
+        short_name: The short name to look up
+        
+    Returns:
+        Team info dict or None if not found
+    """
+    team = team_registry().by_short_name(short_name)
+    return team._asdict() if team else None
 
 
 def export_teams_to_json(output_path: str = "teams_lookup.json") -> str:
@@ -1,174 +1,168 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import json
+from typing import Dict, Iterable, List, Optional
 
-import requests
-from django.utils import timezone
+from asgiref.sync import sync_to_async
+from django.core.exceptions import PermissionDenied
+from django.db.models import F
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import generics, pagination, status, views
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import generics, pagination, status, views
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from .models import ActualStanding, Gameweek, Player, Prediction, Score, Team, SiteState
-from .serializers import PlayerSerializer, ScoreSerializer, TeamSerializer
-
+from .batch import iter_histories, iter_predictions
+from .caching import UpstreamCache, VersionedCache, conditional_on_data
+from .compression import stored_response
+from .fpl import afetch_bootstrap, fetch_bootstrap
+from .jobs import enqueue_update, job_payload
+from .leaderboard import (
+    leaderboard_gameweek,
+    leaderboard_key,
+    leaderboard_payload,
+    leaderboard_queryset,
+    leaderboard_scope,
+    rank_correct,
+    rank_deviation,
+    rank_matrix_key,
+)
+from .metrics import metrics_allowed, metrics_enabled, render_metrics
+from .models import Job, Player, Prediction, Score
+from .pagination import ScoreKeysetPagination
+from .renderers import dumps
+from .serializers import PredictionSerializer, RankedScoreSerializer
+from .teams import team_registry
+
+
+@method_decorator(conditional_on_data, name="get")
+class ScoreListView(generics.ListAPIView):
+    """Scores ranked in the database, one page at a time.
 
-FPL_BOOTSTRAP_URL = "https://fantasy.premierleague.com/api/bootstrap-static/"
+    Ranks are RANK() windows per (season, gameweek); filtering by player_type
+    happens before ranking, so ranks are then within that player_type.
 
+    Passing ?cursor= switches to keyset pagination (see league/pagination.py),
+    which keeps deep pages as cheap as the first one. It needs season and
+    gameweek: the cursor key is only unique within one gameweek.
+    """
 
+    serializer_class = RankedScoreSerializer
 
-class ScoreListView(generics.ListAPIView):
-    serializer_class = ScoreSerializer
-    pagination_class = pagination.PageNumberPagination
+    @property
+    def pagination_class(self):
+        if ScoreKeysetPagination.cursor_query_param in self.request.query_params:
+            return ScoreKeysetPagination
+        return pagination.PageNumberPagination
 
     def get_queryset(self):
-        qs = Score.objects.select_related("player").order_by(
-            "-score_correct", "score_deviation"
-        )
-        player_type = self.request.query_params.get("player_type")
+        qs = Score.objects.select_related("player")
+        params = self.request.query_params
+        if self.pagination_class is ScoreKeysetPagination and not (
+            params.get("season") and params.get("gameweek", "").isdigit()
+        ):
+            raise ValidationError({"cursor": "Cursor pagination needs season and gameweek"})
+        if params.get("season"):
+            qs = qs.filter(season=params["season"])
+        if params.get("gameweek", "").isdigit():
+            qs = qs.filter(gameweek=int(params["gameweek"]))
+        player_type = params.get("player_type")
         if player_type in {"normal", "pundit"}:
             qs = qs.filter(player__player_type=player_type)
-        return qs
+        if self.pagination_class is ScoreKeysetPagination:
+            # Ranks are carried in the cursor instead of a full window
+            return qs
+        partition = [F("season"), F("gameweek")]
+        return qs.annotate(
+            rank_correct_based=rank_correct(partition),
+            rank_deviation_based=rank_deviation(partition),
+        ).order_by("-score_correct", "score_deviation", "id")
 
 
-@method_decorator(cache_page(600), name="dispatch")
-class CurrentPLStandingsView(views.APIView):
-    def get(self, request):
-        resp = requests.get(FPL_BOOTSTRAP_URL, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        teams = data.get("teams", [])
-        simplified = [
-            {
-                "id": t.get("id"),
-                "name": t.get("name"),
-                "short_name": t.get("short_name"),
-                "win": t.get("win", 0),
-                "loss": t.get("loss", 0),
-                "draw": t.get("draw", 0),
-                "points": t.get("points", 0),
-                "position": t.get("position", 0),
-            }
-            for t in teams
-        ]
-        simplified.sort(key=lambda x: x.get("position") or 0)
-        return Response(simplified)
-
-
-def _compute_scores_for_gameweek(current_gw: Gameweek, season: str) -> None:
-    predictions = (
-        Prediction.objects.select_related("player", "team")
-        .filter(season=season)
-        .all()
-    )
+def simplify_pl_standings(teams: List[Dict]) -> List[Dict]:
+    simplified = [
+        {
+            "id": t.get("id"),
+            "name": t.get("name"),
+            "short_name": t.get("short_name"),
+            "win": t.get("win", 0),
+            "loss": t.get("loss", 0),
+            "draw": t.get("draw", 0),
+            "points": t.get("points", 0),
+            "position": t.get("position", 0),
+        }
+        for t in teams
+    ]
+    simplified.sort(key=lambda x: x.get("position") or 0)
+    return simplified
 
-    actuals = {
-        (a.team_id): a
-        for a in ActualStanding.objects.filter(season=season, gameweek=current_gw.id)
-    }
 
-    # Aggregate by player
-    by_player: Dict[int, Dict[str, int]] = {}
-    for p in predictions:
-        a = actuals.get(p.team_id)
-        if not a:
-            continue
-        stats = by_player.setdefault(p.player_id, {
-            "score_correct": 0,
-            "score_deviation": 0,
-            "rank_correct": 0,
-            "rank_deviation": 0,
-        })
-        if p.predicted_rank == a.actual_rank:
-            stats["score_correct"] += 1
-            stats["rank_correct"] += 1
-        deviation = abs(int(p.predicted_rank) - int(a.actual_rank))
-        stats["score_deviation"] += deviation
-        stats["rank_deviation"] += deviation
-
-    # Write Score rows
-    for player_id, stats in by_player.items():
-        Score.objects.update_or_create(
-            season=season,
-            gameweek=current_gw.id,
-            player_id=player_id,
-            defaults={
-                **stats,
-                "completed": current_gw.finished and current_gw.data_checked,
-            },
-        )
+def load_pl_standings() -> List[Dict]:
+    return simplify_pl_standings(fetch_bootstrap(timeout=15, store=False).teams)
+
+
+async def aload_pl_standings() -> List[Dict]:
+    return simplify_pl_standings((await afetch_bootstrap(timeout=15, store=False)).teams)
+
+
+pl_standings_cache = UpstreamCache("pl_standings", load_pl_standings, aloader=aload_pl_standings, fresh_for=600)
+
+
+class CurrentPLStandingsView(views.APIView):
+    def get(self, request):
+        return Response(pl_standings_cache.get())
 
 
 class UpdateScoresView(views.APIView):
-    """Trigger to update teams, gameweeks, actual standings and compute scores.
+    """Queue an update of teams, gameweeks, actual standings and scores.
 
-    Debounce if last run within 24 hours (stored in a singleton row via Gameweek flags).
+    The run_worker command does the work; poll /api/jobs/<job_id>/ for the
+    outcome. The run itself is still debounced to once per 24 hours.
     """
 
     def post(self, request):
         season = request.data.get("season", "2025/26")
+        job, created = enqueue_update(season, trigger="api")
+        return Response(queued_payload(job, created), status=status.HTTP_202_ACCEPTED)
+
+
+def queued_payload(job: Job, created: bool) -> Dict:
+    return {"status": "queued", "job_id": job.id, "deduplicated": not created}
+
+
+class JobStatusView(views.APIView):
+    def get(self, request, job_id: int):
+        job = Job.objects.filter(id=job_id).first()
+        if job is None:
+            return Response({"detail": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_payload(job))
+
 
-        # Debounce using SiteState.last_computed timestamp
-        state, _ = SiteState.objects.get_or_create(id=1)
-        if state.last_computed and (timezone.now() - state.last_computed) < timedelta(hours=24):
-            return Response({"status": "skipped_recent_run"})
-
-        # Fetch bootstrap-static
-        resp = requests.get(FPL_BOOTSTRAP_URL, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Upsert teams
-        for t in data.get("teams", []):
-            Team.objects.update_or_create(
-                id=t["id"],
-                defaults={
-                    "name": t.get("name", ""),
-                    "short_name": t.get("short_name", ""),
-                    "code": t.get("code", 0),
-                },
-            )
-
-        # Upsert gameweeks
-        current_gw: Optional[Gameweek] = None
-        for ev in data.get("events", []):
-            gw, _ = Gameweek.objects.update_or_create(
-                id=ev["id"],
-                defaults={
-                    "is_current": ev.get("is_current", False),
-                    "finished": ev.get("finished", False),
-                    "data_checked": ev.get("data_checked", False),
-                },
-            )
-            if gw.is_current:
-                current_gw = gw
-
-        # Update actual standings from teams object
-        if current_gw is None:
-            # best effort choose latest finished or id 1
-            current_gw = Gameweek.objects.order_by("-is_current", "id").first()
-
-        teams = data.get("teams", [])
-        for t in teams:
-            ActualStanding.objects.update_or_create(
-                season=season,
-                gameweek=current_gw.id if current_gw else 1,
-                team_id=t["id"],
-                defaults={
-                    "actual_rank": t.get("position", 0) or 0,
-                    "points": t.get("points", 0) or 0,
-                },
-            )
-
-        if current_gw:
-            _compute_scores_for_gameweek(current_gw, season)
-
-        # mark debounce
-        state.last_computed = timezone.now()
-        state.save(update_fields=["last_computed"])
-
-        return Response({"status": "ok", "season": season})
+# Async variants of the FPL-backed endpoints. Served through ASGI
+# (plsite/asgi.py) they wait on upstream without holding a worker thread.
+async def pl_standings_async(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    return HttpResponse(dumps(await pl_standings_cache.aget()), content_type="application/json")
+
+
+async def update_scores_async(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        body = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+    season = body.get("season", "2025/26") if isinstance(body, dict) else "2025/26"
+    job, created = await sync_to_async(enqueue_update)(season, trigger="api")
+    return JsonResponse(queued_payload(job, created), status=202)
+
+
+# Like UpdateScoresView (DRF views are CSRF-exempt); csrf_exempt() itself
+# wraps in a sync function on Django 4.2, so set the flag directly
+update_scores_async.csrf_exempt = True
 
 
 @api_view(["GET"])
@@ -176,6 +170,15 @@ def health(_request):
     return Response({"status": "ok"})
 
 
+def metrics(request):
+    """Request metrics of this process in Prometheus text format."""
+    if not metrics_enabled():
+        raise Http404("Metrics are disabled")
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # HTML pages
 def pl_table(request):
     return render(request, "league/pl_standings.html")
@@ -185,112 +188,75 @@ def current_standings_page(request):
     return render(request, "league/current_standings.html")
 
 
+@method_decorator(conditional_on_data, name="get")
 class ScoreCurrentView(views.APIView):
     def get(self, request):
         player_type = request.GET.get("player_type")
-        # choose current gw as latest finished+checked else is_current
-        gw = (
-            Gameweek.objects.filter(finished=True, data_checked=True).order_by("-id").first()
-            or Gameweek.objects.filter(is_current=True).order_by("-id").first()
-        )
-        prev_gw = None
-        if gw:
-            prev_gw = (
-                Gameweek.objects.filter(id__lt=gw.id, finished=True, data_checked=True)
-                .order_by("-id")
-                .first()
-            )
-
-        def fetch_scores(gw_obj: Optional[Gameweek]):
-            if not gw_obj:
-                return []
-            qs = Score.objects.select_related("player").filter(gameweek=gw_obj.id)
-            if player_type in {"normal", "pundit"}:
-                qs = qs.filter(player__player_type=player_type)
-            return list(qs)
-
-        current_scores = fetch_scores(gw)
-        previous_scores = fetch_scores(prev_gw)
-
-        def build_rank_map(scores: List[Score], key_correct, key_deviation):
-            # rank for correct-based (desc), then deviation-based (asc)
-            sorted_correct = sorted(scores, key=key_correct, reverse=True)
-            rank_correct = {}
-            last_val = None
-            rank = 0
-            for idx, s in enumerate(sorted_correct, start=1):
-                val = key_correct(s)
-                if val != last_val:
-                    rank = idx
-                    last_val = val
-                rank_correct[s.player_id] = rank
-
-            sorted_dev = sorted(scores, key=key_deviation)
-            rank_dev = {}
-            last_val = None
-            rank = 0
-            for idx, s in enumerate(sorted_dev, start=1):
-                val = key_deviation(s)
-                if val != last_val:
-                    rank = idx
-                    last_val = val
-                rank_dev[s.player_id] = rank
-            return rank_correct, rank_dev
-
-        key_correct = lambda s: (s.score_correct, -s.score_deviation)
-        key_deviation = lambda s: (s.score_deviation, -s.score_correct)
-        curr_rank_correct_map, curr_rank_dev_map = build_rank_map(current_scores, key_correct, key_deviation)
-        prev_rank_correct_map, prev_rank_dev_map = build_rank_map(previous_scores, key_correct, key_deviation)
-
-        payload = []
-        for s in current_scores:
-            payload.append(
-                {
-                    "username": s.player.username,
-                    "player_type": s.player.player_type,
-                    "team_name": s.player.custom_team_name or s.player.username,
-                    "gameweek": s.gameweek,
-                    "score_correct": s.score_correct,
-                    "score_deviation": s.score_deviation,
-                    "curr_rank_correct_based": curr_rank_correct_map.get(s.player_id),
-                    "curr_rank_deviation_based": curr_rank_dev_map.get(s.player_id),
-                    "last_rank_correct_based": prev_rank_correct_map.get(s.player_id),
-                    "last_rank_deviation_based": prev_rank_dev_map.get(s.player_id),
-                }
-            )
-
-        return Response({"gameweek": gw.id if gw else None, "results": payload})
+        if "page" not in request.GET:
+            # Rendered and compressed by build_leaderboard; rebuilt here only before the
+            # first build, and for renderers other than JSON (e.g. the browsable API)
+            if request.accepted_renderer.format == "json":
+                stored = stored_response(request, leaderboard_key(leaderboard_scope(player_type)))
+                if stored is not None:
+                    return stored
+            return Response(leaderboard_payload(player_type))
+        # Paged: only the requested slice of the stored leaderboard is read
+        paginator = pagination.PageNumberPagination()
+        page = paginator.paginate_queryset(leaderboard_queryset(player_type), request, view=self)
+        response = paginator.get_paginated_response(page)
+        response.data["gameweek"] = leaderboard_gameweek()
+        return response
+
+
+@require_http_methods(["GET", "HEAD"])
+@conditional_on_data
+def rank_matrix_view(request):
+    """Per-gameweek ranks of every player, as stored by the pipeline (see rank_matrix)."""
+    season = request.GET.get("season", "2025/26")
+    response = stored_response(request, rank_matrix_key(season))
+    if response is None:
+        return JsonResponse({"detail": f"No rank matrix for season {season}"}, status=404)
+    return response
+
+
+history_cache = VersionedCache("user_history")
+predictions_cache = VersionedCache("user_predictions")
+
+
+def user_history_payload(username: str, season: str) -> Dict:
+    player = Player.objects.filter(username=username).first()
+    if not player:
+        return {"username": username, "results": []}
+    scores = (
+        Score.objects.filter(player=player, season=season)
+        .order_by("gameweek")
+        .all()
+    )
+    results = [
+        {
+            "gameweek": s.gameweek,
+            "score_correct": s.score_correct,
+            "score_deviation": s.score_deviation,
+            "rank_correct": s.rank_correct,
+            "rank_deviation": s.rank_deviation,
+            "completed": s.completed,
+        }
+        for s in scores
+    ]
+    return {
+        "username": player.username,
+        "player_type": player.player_type,
+        "team_name": player.custom_team_name or player.username,
+        "season": season,
+        "results": results,
+    }
 
 
+@method_decorator(conditional_on_data, name="get")
 class UserHistoryView(views.APIView):
     def get(self, request, username: str):
         season = request.GET.get("season", "2025/26")
-        player = Player.objects.filter(username=username).first()
-        if not player:
-            return Response({"username": username, "results": []})
-        scores = (
-            Score.objects.filter(player=player, season=season)
-            .order_by("gameweek")
-            .all()
-        )
-        results = [
-            {
-                "gameweek": s.gameweek,
-                "score_correct": s.score_correct,
-                "score_deviation": s.score_deviation,
-                "rank_correct": s.rank_correct,
-                "rank_deviation": s.rank_deviation,
-                "completed": s.completed,
-            }
-            for s in scores
-        ]
-        return Response({
-            "username": player.username,
-            "player_type": player.player_type,
-            "team_name": player.custom_team_name or player.username,
-            "season": season,
-            "results": results,
-        })
+        return Response(history_cache.get_or_build((username, season), lambda: user_history_payload(username, season)))
 
 
 def user_history_page(request, username: str):
@@ -301,25 +267,84 @@ def homepage(request):
     return render(request, "league/home.html")
 
 
+def user_predictions_payload(username: str, season: str) -> Dict:
+    player = Player.objects.filter(username=username).first()
+    if not player:
+        return {"username": username, "predictions": []}
+    preds = (
+        Prediction.objects.filter(player=player, season=season)
+        .only("team_id", "predicted_rank")
+        .order_by("predicted_rank")
+    )
+    payload = list(PredictionSerializer(preds, many=True).data)
+    return {"username": player.username, "season": season, "predictions": payload}
+
+
+@method_decorator(conditional_on_data, name="get")
 class UserPredictionsView(views.APIView):
     def get(self, request, username: str):
         season = request.GET.get("season", "2025/26")
-        player = Player.objects.filter(username=username).first()
-        if not player:
-            return Response({"username": username, "predictions": []})
-        preds = (
-            Prediction.objects.select_related("team")
-            .filter(player=player, season=season)
-            .order_by("predicted_rank")
-        )
-        payload = [
-            {
-                "team_id": p.team_id,
-                "team_name": p.team.name,
-                "predicted_rank": p.predicted_rank,
-            }
-            for p in preds
-        ]
-        return Response({"username": player.username, "season": season, "predictions": payload})
-
-# Create your views here.
+        # Team names come from the registry, so its version is part of the key
+        key = (username, season, team_registry().version)
+        return Response(predictions_cache.get_or_build(key, lambda: user_predictions_payload(username, season)))
+
+
+MAX_BATCH_USERNAMES = 20000
+
+
+def batch_usernames(request) -> Optional[List[str]]:
+    """
+    Usernames named by a batch request, or None for "all".
+
+    GET takes ?usernames=a,b,c (or repeated); POST takes a JSON body
+    {"usernames": [...] or "all"} for lists too long for a URL.
+
+    Raises:
+        ValueError: the request names no usernames or is malformed
+    """
+    if request.method == "POST":
+        try:
+            body = json.loads(request.body or b"{}")
+        except ValueError:
+            raise ValueError("Invalid JSON body")
+        names = body.get("usernames") if isinstance(body, dict) else None
+        if names == "all":
+            return None
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError('"usernames" must be a list of strings or "all"')
+    else:
+        names = [name for value in request.GET.getlist("usernames") for name in value.split(",")]
+        if names == ["all"]:
+            return None
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    if not names:
+        raise ValueError('Pass "usernames" as a list of usernames or "all"')
+    if len(names) > MAX_BATCH_USERNAMES:
+        raise ValueError(f"At most {MAX_BATCH_USERNAMES} usernames per request; use \"all\"")
+    return names
+
+
+def ndjson_response(rows: Iterable[Dict]) -> StreamingHttpResponse:
+    lines = (dumps(row) + b"\n" for row in rows)
+    return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+
+
+def batch_view(iter_rows):
+    """NDJSON view streaming iter_rows(season, usernames) for a batch request."""
+
+    @csrf_exempt
+    @require_http_methods(["GET", "POST"])
+    @conditional_on_data
+    def view(request):
+        try:
+            usernames = batch_usernames(request)
+        except ValueError as e:
+            return JsonResponse({"detail": str(e)}, status=400)
+        season = request.GET.get("season", "2025/26")
+        return ndjson_response(iter_rows(season, usernames))
+
+    return view
+
+
+user_histories = batch_view(iter_histories)
+user_predictions_batch = batch_view(iter_predictions)
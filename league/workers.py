@@ -0,0 +1,55 @@
+"""
+Helpers for work that runs beside the main flow: process pools shared by the
+prediction importer and season replay, and periodic background threads
+(job heartbeats, the scheduler's lease renewal).
+
+Imports nothing from the league app, so a worker can unpickle
+init_worker before Django is configured.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import django
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def init_worker() -> None:
+    """ProcessPoolExecutor initializer for pools that run league code."""
+    # Under the spawn start method workers need Django configured before
+    # unpickling functions from modules that import models.
+    django.setup()
+
+
+@contextmanager
+def periodic(interval: float, fn: Callable[[], bool], name: str) -> Iterator[None]:
+    """
+    Call fn every interval seconds from a daemon thread while the block runs.
+
+    fn returns False to stop early. An exception is logged and fn is tried
+    again on the next beat, e.g. when SQLite is locked by the block's own
+    transaction. The thread's database connection is closed when it ends.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                try:
+                    if not fn():
+                        return
+                except Exception as e:
+                    logger.warning(f"{name} failed, retrying next beat: {e}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=name, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
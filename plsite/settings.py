@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "league.metrics.MetricsMiddleware",
+    "league.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -128,6 +130,47 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # REST framework basic setup
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "league.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 25,
 }
+
+# Shared across worker processes, so UpstreamCache's refresh lock
+# (league/caching.py) is seen by every worker. The file backend's add() is
+# not strictly atomic across processes; use Redis, Memcached or the database
+# backend where a strict single flight matters.
+# "default" only holds a handful of keys (the refresh lock, the last good
+# upstream value and the team registry and data version stamps) and must
+# never cull them. The per-player VersionedCache entries live in "responses"
+# (RESPONSE_CACHE): once past MAX_ENTRIES the file backend deletes a random
+# 1/CULL_FREQUENCY of them, which only costs a rebuild on the next request.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+    },
+    "responses": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "responses",
+        "OPTIONS": {
+            # History and predictions for a few thousand active players
+            "MAX_ENTRIES": 20000,
+            "CULL_FREQUENCY": 4,
+        },
+    },
+}
+
+RESPONSE_CACHE = "responses"
+
+# Local store of FPL bootstrap-static snapshots (see league/fpl.py)
+FPL_SNAPSHOT_DIR = BASE_DIR / "snapshots"
+# Newest snapshots kept there (plus LATEST's); None keeps every one
+FPL_SNAPSHOT_KEEP = 1000
+
+# Per-request timing/SQL metrics served at /api/metrics/ (see league/metrics.py).
+# Readable by staff users and by requests sending "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_ENABLED = False
+METRICS_TOKEN = ""